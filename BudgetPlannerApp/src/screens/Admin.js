@@ -68,13 +68,22 @@ export default function Admin({ navigation }) {
         }));
       }
 
-      // Load pending shifts
-      const shiftsResponse = await employerShiftAPI.getPendingShifts(userId);
-      if (shiftsResponse.success) {
+      // Load pending shifts, following next_cursor through every page
+      const pending = [];
+      let cursor = null;
+      let loaded = false;
+      do {
+        const shiftsResponse = await employerShiftAPI.getPendingShifts(userId, { limit: 500, ...(cursor && { cursor }) });
+        if (!shiftsResponse.success) break;
+        loaded = true;
+        pending.push(...shiftsResponse.data);
+        cursor = shiftsResponse.next_cursor;
+      } while (cursor);
+      if (loaded) {
         setStats(prev => ({
           ...prev,
-          pendingShifts: shiftsResponse.data.length,
-          completedShifts: shiftsResponse.data.filter(s => s.status === 'approved').length,
+          pendingShifts: pending.length,
+          completedShifts: pending.filter(s => s.status === 'approved').length,
         }));
       }
     } catch (error) {
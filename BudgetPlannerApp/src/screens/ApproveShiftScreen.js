@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   StyleSheet,
   View,
@@ -18,6 +18,10 @@ export default function ApproveShiftScreen() {
   const [loading, setLoading] = useState(false);
   const [activeTab, setActiveTab] = useState('employer');
   const [userId, setUserId] = useState(null);
+  // next_cursor of each list (null once the last page is loaded) and the pages being fetched
+  const [shiftsCursor, setShiftsCursor] = useState(null);
+  const [employeeShiftsCursor, setEmployeeShiftsCursor] = useState(null);
+  const loadingPages = useRef({});
 
   useEffect(() => {
     loadUserId();
@@ -42,13 +46,15 @@ export default function ApproveShiftScreen() {
     }
   };
 
-  const fetchPendingShifts = async () => {
-    if (!userId) return;
-    
+  const fetchPendingShifts = async (cursor = null) => {
+    if (!userId || loadingPages.current[`employer:${cursor}`]) return;
+
+    loadingPages.current[`employer:${cursor}`] = true;
     try {
-      const response = await employerShiftAPI.getPendingShifts(userId);
+      const response = await employerShiftAPI.getPendingShifts(userId, cursor ? { cursor } : {});
       if (response.success) {
-        setShifts(response.data);
+        setShifts(prev => (cursor ? [...prev, ...response.data] : response.data));
+        setShiftsCursor(response.next_cursor || null);
       } else {
         Toast.show({
           type: 'error',
@@ -64,23 +70,29 @@ export default function ApproveShiftScreen() {
         text2: error.message || 'Failed to load pending shifts',
         visibilityTime: 3000,
       });
+    } finally {
+      loadingPages.current[`employer:${cursor}`] = false;
     }
   };
 
-  const fetchEmployeeSubmittedShifts = async () => {
-    if (!userId) return;
-    
+  const fetchEmployeeSubmittedShifts = async (cursor = null) => {
+    if (!userId || loadingPages.current[`employee:${cursor}`]) return;
+
+    loadingPages.current[`employee:${cursor}`] = true;
     try {
-      const response = await employerEmployeeShiftAPI.getPendingEmployeeShifts(userId);
+      const response = await employerEmployeeShiftAPI.getPendingEmployeeShifts(userId, cursor ? { cursor } : {});
       if (response.success) {
-        setEmployeeSubmittedShifts(response.data);
-      } else {
+        setEmployeeSubmittedShifts(prev => (cursor ? [...prev, ...response.data] : response.data));
+        setEmployeeShiftsCursor(response.next_cursor || null);
+      } else if (!cursor) {
         // Don't show error if endpoint returns nothing
         setEmployeeSubmittedShifts([]);
       }
     } catch (error) {
       console.error('Error loading employee submitted shifts:', error);
-      setEmployeeSubmittedShifts([]);
+      if (!cursor) setEmployeeSubmittedShifts([]);
+    } finally {
+      loadingPages.current[`employee:${cursor}`] = false;
     }
   };
 
@@ -278,7 +290,7 @@ export default function ApproveShiftScreen() {
           onPress={() => setActiveTab('employer')}
         >
           <Text style={[styles.tabText, activeTab === 'employer' && styles.activeTabText]}>
-            My Created Shifts ({shifts.length})
+            My Created Shifts ({shifts.length}{shiftsCursor ? '+' : ''})
           </Text>
         </TouchableOpacity>
         <TouchableOpacity
@@ -286,7 +298,7 @@ export default function ApproveShiftScreen() {
           onPress={() => setActiveTab('employee')}
         >
           <Text style={[styles.tabText, activeTab === 'employee' && styles.activeTabText]}>
-            Employee Requests ({employeeSubmittedShifts.length})
+            Employee Requests ({employeeSubmittedShifts.length}{employeeShiftsCursor ? '+' : ''})
           </Text>
         </TouchableOpacity>
       </View>
@@ -307,6 +319,8 @@ export default function ApproveShiftScreen() {
             renderItem={(props) => renderShiftCard(props, false)}
             keyExtractor={item => item.id.toString()}
             contentContainerStyle={styles.listContent}
+            onEndReached={() => shiftsCursor && fetchPendingShifts(shiftsCursor)}
+            onEndReachedThreshold={0.5}
           />
         )
       ) : employeeSubmittedShifts.length === 0 ? (
@@ -321,6 +335,8 @@ export default function ApproveShiftScreen() {
           renderItem={(props) => renderShiftCard(props, true)}
           keyExtractor={item => item.id.toString()}
           contentContainerStyle={styles.listContent}
+          onEndReached={() => employeeShiftsCursor && fetchEmployeeSubmittedShifts(employeeShiftsCursor)}
+          onEndReachedThreshold={0.5}
         />
       )}
     </View>
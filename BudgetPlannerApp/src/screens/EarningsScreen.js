@@ -6,6 +6,7 @@ import {
   ScrollView,
   RefreshControl,
   ActivityIndicator,
+  TouchableOpacity,
 } from 'react-native';
 import { salaryAPI } from '../services/api';
 import { authAPI } from '../services/api';
@@ -15,6 +16,8 @@ export default function EarningsScreen() {
   const [monthlySalary, setMonthlySalary] = useState(null);
   const [salaryAfterBills, setSalaryAfterBills] = useState(null);
   const [dailyHistory, setDailyHistory] = useState([]);
+  const [historyCursor, setHistoryCursor] = useState(null); // null once the last page is loaded
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
   const [user, setUser] = useState(null);
@@ -48,6 +51,7 @@ export default function EarningsScreen() {
       setMonthlySalary(monthlyData);
       setSalaryAfterBills(afterBillsData);
       setDailyHistory(historyData?.history || []);
+      setHistoryCursor(historyData?.next_cursor || null);
     } catch (error) {
       console.error('Error loading earnings data:', error);
     } finally {
@@ -56,6 +60,20 @@ export default function EarningsScreen() {
     }
   };
 
+  const loadMoreHistory = async () => {
+    if (!user || !historyCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const historyData = await salaryAPI.getDailySalaryHistory(user.user_id, { cursor: historyCursor });
+      setDailyHistory(prev => [...prev, ...(historyData?.history || [])]);
+      setHistoryCursor(historyData?.next_cursor || null);
+    } catch (error) {
+      console.error('Error loading more daily earnings:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const onRefresh = () => {
     setRefreshing(true);
     loadData();
@@ -147,6 +165,15 @@ export default function EarningsScreen() {
               </View>
             ))
           )}
+          {historyCursor && (
+            <TouchableOpacity style={styles.loadMoreButton} onPress={loadMoreHistory} disabled={loadingMore}>
+              {loadingMore ? (
+                <ActivityIndicator color="#007AFF" />
+              ) : (
+                <Text style={styles.loadMoreText}>Load more</Text>
+              )}
+            </TouchableOpacity>
+          )}
         </View>
       </View>
     </ScrollView>
@@ -246,5 +273,14 @@ const styles = StyleSheet.create({
     fontSize: 16,
     color: '#8E8E93',
   },
+  loadMoreButton: {
+    alignItems: 'center',
+    padding: 15,
+  },
+  loadMoreText: {
+    fontSize: 16,
+    fontWeight: '600',
+    color: '#007AFF',
+  },
 });
 
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   StyleSheet,
   View,
@@ -18,6 +18,8 @@ export default function MyShiftsScreen() {
   const [loading, setLoading] = useState(false);
   const [refreshing, setRefreshing] = useState(false);
   const [userId, setUserId] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null); // null once the last page is loaded
+  const loadingMore = useRef(false);
 
   useEffect(() => {
     loadUserId();
@@ -49,6 +51,7 @@ export default function MyShiftsScreen() {
       const response = await employeeShiftSubmissionAPI.getAllShifts(userId);
       if (response.success) {
         setShifts(response.data);
+        setNextCursor(response.next_cursor || null);
       } else {
         Toast.show({
           type: 'error',
@@ -69,6 +72,23 @@ export default function MyShiftsScreen() {
     }
   };
 
+  const fetchMoreShifts = async () => {
+    if (!userId || !nextCursor || loadingMore.current) return;
+
+    loadingMore.current = true;
+    try {
+      const response = await employeeShiftSubmissionAPI.getAllShifts(userId, { cursor: nextCursor });
+      if (response.success) {
+        setShifts(prev => [...prev, ...response.data]);
+        setNextCursor(response.next_cursor || null);
+      }
+    } catch (error) {
+      console.error('Error loading more shifts:', error);
+    } finally {
+      loadingMore.current = false;
+    }
+  };
+
   const onRefresh = async () => {
     setRefreshing(true);
     await fetchSubmittedShifts();
@@ -154,7 +174,7 @@ export default function MyShiftsScreen() {
     <View style={styles.container}>
       <View style={styles.header}>
         <Text style={styles.title}>My Shifts</Text>
-        <Text style={styles.subtitle}>Total: {shifts.length}</Text>
+        <Text style={styles.subtitle}>Total: {shifts.length}{nextCursor ? '+' : ''}</Text>
       </View>
 
       {loading && !refreshing ? (
@@ -174,6 +194,8 @@ export default function MyShiftsScreen() {
           renderItem={renderShiftCard}
           keyExtractor={item => item.id.toString()}
           contentContainerStyle={styles.listContent}
+          onEndReached={fetchMoreShifts}
+          onEndReachedThreshold={0.5}
           refreshControl={
             <RefreshControl
               refreshing={refreshing}
@@ -128,9 +128,44 @@ export const ChatAPI = {
       throw error;
     }
   },
-  getChatHistory: async (userId) => {
+  // Streams the answer: onToken(text) for each piece as it arrives; resolves with the final `done` payload.
+  // Uses XMLHttpRequest because fetch/axios in React Native do not expose a partial response body.
+  streamChatWithAssistant: (userId, message, onToken) =>
+    new Promise((resolve, reject) => {
+      const xhr = new XMLHttpRequest();
+      let seen = 0;
+      let buffer = '';
+      let result = null;
+      const consume = () => {
+        buffer += xhr.responseText.slice(seen);
+        seen = xhr.responseText.length;
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        events.forEach((raw) => {
+          const event = (raw.match(/^event: (.*)$/m) || [])[1];
+          const data = (raw.match(/^data: (.*)$/m) || [])[1];
+          if (!event || !data) return;
+          const payload = JSON.parse(data);
+          if (event === 'token') onToken && onToken(payload.text);
+          else result = { ...payload, event };
+        });
+      };
+      xhr.open('POST', `${API_BASE_URL}/api/assistant/user/${userId}/chat/stream`);
+      xhr.setRequestHeader('Content-Type', 'application/json');
+      xhr.onprogress = consume;
+      xhr.onload = () => {
+        consume();
+        if (xhr.status !== 200) reject(new Error(`Chat stream failed with status ${xhr.status}`));
+        else resolve(result);
+      };
+      xhr.onerror = () => reject(new Error('Chat stream failed'));
+      xhr.send(JSON.stringify({ message }));
+    }),
+  getChatHistory: async (userId, page = {}) => {
     try {
-      const response = await api.get(`/api/assistantchat/user/${userId}/message`);
+      const response = await api.get(`/api/assistantchat/user/${userId}/message`, {
+        params: page // { limit, before }: pass the previous response's next_before for older turns
+      });
       return response.data;
     } catch (error) {
       throw error;
@@ -186,9 +221,11 @@ export const salaryAPI = {
     }
   },
 
-  getDailySalaryHistory: async (userId) => {
+  getDailySalaryHistory: async (userId, page = {}) => {
     try {
-      const response = await api.get(`/api/user/${userId}/daily-salary-history`);
+      const response = await api.get(`/api/user/${userId}/daily-salary-history`, {
+        params: page // { limit, cursor }: pass the previous response's next_cursor for the next page
+      });
       return response.data;
     } catch (error) {
       throw error;
@@ -229,6 +266,21 @@ export const billsAPI = {
   },
 };
 
+// Search API
+export const searchAPI = {
+  // Searches the user's assistant history and bills, best match first; matches are marked [like this].
+  search: async (userId, q, page = {}) => {
+    try {
+      const response = await api.get(`/api/user/${userId}/search`, {
+        params: { q, ...page } // { kind: 'chat' | 'bill', limit, cursor }: pass next_cursor for the next page
+      });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+};
+
 // Employer Shift API
 export const employerShiftAPI = {
   createShift: async (shiftData) => {
@@ -240,10 +292,10 @@ export const employerShiftAPI = {
     }
   },
 
-  getPendingShifts: async (employerId) => {
+  getPendingShifts: async (employerId, page = {}) => {
     try {
       const response = await api.get('/api/employer/pending-shifts', {
-        params: { employer_id: employerId }
+        params: { employer_id: employerId, ...page }
       });
       return response.data;
     } catch (error) {
@@ -322,6 +374,20 @@ export const employeeNotificationAPI = {
     }
   },
 
+  // Long-poll: resolves with notifications newer than `since` as soon as one is
+  // dispatched, or with none after `timeout` seconds. Pass the returned `since` back in.
+  pollNotifications: async (employeeId, since = 0, timeout = 25) => {
+    try {
+      const response = await api.get('/api/employee/notifications/poll', {
+        params: { employee_id: employeeId, since, timeout },
+        timeout: (timeout + 10) * 1000,
+      });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
   markAsRead: async (notificationId) => {
     try {
       const response = await api.put(`/api/employee/notifications/${notificationId}/read`);
@@ -330,6 +396,28 @@ export const employeeNotificationAPI = {
       throw error;
     }
   },
+
+  getUnreadCount: async (employeeId) => {
+    try {
+      const response = await api.get('/api/employee/notifications/unread-count', {
+        params: { employee_id: employeeId }
+      });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
+  // Pass { ids: [...] } or { beforeId } (everything up to and including that id).
+  markManyAsRead: async (employeeId, { ids, beforeId } = {}) => {
+    try {
+      const body = ids ? { employee_id: employeeId, ids } : { employee_id: employeeId, before_id: beforeId };
+      const response = await api.put('/api/employee/notifications/read', body);
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
 };
 
 // Employee Shift Submission API
@@ -343,10 +431,10 @@ export const employeeShiftSubmissionAPI = {
     }
   },
 
-  getSubmittedShifts: async (employeeId) => {
+  getSubmittedShifts: async (employeeId, page = {}) => {
     try {
       const response = await api.get('/api/employee/submitted-shifts', {
-        params: { employee_id: employeeId }
+        params: { employee_id: employeeId, ...page }
       });
       return response.data;
     } catch (error) {
@@ -354,10 +442,10 @@ export const employeeShiftSubmissionAPI = {
     }
   },
 
-  getAllShifts: async (employeeId) => {
+  getAllShifts: async (employeeId, page = {}) => {
     try {
       const response = await api.get(`/api/employee/shifts`, {
-        params: { employee_id: employeeId }
+        params: { employee_id: employeeId, ...page }
       });
       return response.data;
     } catch (error) {
@@ -367,10 +455,10 @@ export const employeeShiftSubmissionAPI = {
 };
 // Employer Employee Shift Review API
 export const employerEmployeeShiftAPI = {
-  getPendingEmployeeShifts: async (employerId) => {
+  getPendingEmployeeShifts: async (employerId, page = {}) => {
     try {
       const response = await api.get('/api/employer/pending-employee-shifts', {
-        params: { employer_id: employerId }
+        params: { employer_id: employerId, ...page }
       });
       return response.data;
     } catch (error) {
@@ -1,64 +1,48 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import mysql.connector
+import io
+import json
 import os
+import time
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, date
-from budgetset import get_conn, add_user, save_daily_to_db
+from budgetset import db_cursor, add_user, save_daily_to_db
+from db_pool import pool_stats
+from database_and_table import init_db
+from storage import get_storage
+from rollups import refresh_bills, get_rollup, get_weekly, iso_week, year_to_date
+from periods import Period, period_total
+from roster import get_roster, invalidate_employer, invalidate_employee, roster_cache_stats
+from approvals import ACTIONS, MAX_BULK_SHIFTS, decide_shifts
+from payroll import monthly_tax, pay_run
+from tax_engine import paye_batch, tax_period_of_month
+from roster_import import detect_format, import_shifts, open_rows
+from payslips import get_payslip, list_payslips
+from pagination import keyset_page, page_args
+from export import FORMATS, stream_export
+from pending_queue import PENDING_CLAIM_TTL, claim_shifts, queue_counts, queue_page, release_shifts
+from retention import retention_stats
+from chat_store import chat_page, history_args, save_chat, save_chat_later, writer_stats
+from assistant_context import build_context, context_stats, invalidate_snapshot
+from llm_client import cache_key, get_llm, llm_configured
+from search import index_bill, search, search_args, unindex_bill
+from pubsub import (NOTIFY_HEARTBEAT_SECONDS, NOTIFY_POLL_TIMEOUT, NOTIFY_RETRY_MS, NOTIFY_STREAM_SECONDS,
+                    get_broker, user_topic)
+from outbox import outbox_stats, start_dispatcher, wake_dispatcher
 import openai
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React Native
 load_dotenv()
 OPEN_AI_API_KEY = os.getenv("OPEN_AI_KEY")
 openai.api_key = OPEN_AI_API_KEY
+MAX_MARK_READ = 1000  # ids per bulk mark-read request
 # --- Helper: Tax Calculation ---
 def calculate_tax(gross_salary):
     """Calculate UK income tax on monthly salary."""
-    low_tax_per = 0.20
-    mid_tax_per = 0.40
-    high_tax_per = 0.45
-    untaxed_limit = 12570
-    low_tax_limit = 37700
-    mid_tax_limit = 125140
-    
-    if gross_salary <= untaxed_limit / 12:
-        tax = 0
-    elif gross_salary <= (untaxed_limit + low_tax_limit) / 12:
-        tax = (gross_salary - (untaxed_limit / 12)) * low_tax_per
-    elif gross_salary <= (untaxed_limit + low_tax_limit + mid_tax_limit) / 12:
-        tax = ((low_tax_limit / 12) * low_tax_per) + ((gross_salary - ((untaxed_limit + low_tax_limit) / 12)) * mid_tax_per)
-    else:
-        tax = ((low_tax_limit / 12) * low_tax_per) + ((mid_tax_limit / 12) * mid_tax_per) + ((gross_salary - ((untaxed_limit + low_tax_limit + mid_tax_limit) / 12)) * high_tax_per)
-    
-    return round(tax, 2)
+    return monthly_tax(gross_salary)
 
 # --- Raw DB fetch helpers (return raw python data, not Flask responses) ---
-def _fetch_bills_raw(user_id):
-    conn = get_conn()
-    if not conn:
-        return []
-    cur = None
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT bill_id, bill_name, bill_amount FROM bills WHERE user_id=%s", (user_id,))
-        rows = cur.fetchall()
-        return [{"bill_id": r[0], "name": r[1], "amount": float(r[2])} for r in rows]
-    except Exception as e:
-        print(f"Error fetching bills: {e}")
-        return []
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
-
-
 #def _fetch_monthly_net_salary_raw(user_id):
  #   now = datetime.now()
  #   month = now.month
@@ -102,30 +86,28 @@ def _fetch_bills_raw(user_id):
             #    pass
 # --- Helper function to verify user credentials ---
 def verify_user(username, password):
-    conn = get_conn()
-    if not conn:
-        return None
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT user_id, password FROM users WHERE username=%s LIMIT 1", (username,))
-        row = cur.fetchone()
+        with db_cursor() as cur:
+            row = get_storage().get_credentials(cur, username)
         if row and row[1] == password:  # Simple password check (in production, use hashing)
             return row[0]
         return None
     except Exception as e:
         print(f"Error verifying user: {e}")
         return None
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
+
+def _export_response(dataset, scope, owner_id):
+    """Streamed NDJSON/CSV export; `format`, `from` and `to` (YYYY-MM-DD, inclusive) come from the query string."""
+    fmt = request.args.get('format', 'ndjson').lower()
+    try:
+        start = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else None
+        end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else None
+        chunks = stream_export(dataset, scope, owner_id, fmt, start, end)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    filename = f"{dataset}_{scope}_{owner_id}.{'csv' if fmt == 'csv' else 'ndjson'}"
+    return Response(chunks, mimetype=FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
 
 # --- Routes ---
 @app.route('/api/health', methods=['GET'])
@@ -133,6 +115,45 @@ def health():
     """Health check endpoint."""
     return jsonify({"status": "ok"}), 200
 
+@app.route('/api/health/db-pool', methods=['GET'])
+def db_pool_health():
+    """Connection pool stats for monitoring."""
+    return jsonify({"pools": pool_stats()}), 200
+
+@app.route('/api/health/roster-cache', methods=['GET'])
+def roster_cache_health():
+    """Employer roster cache size and hit/miss counters."""
+    return jsonify(roster_cache_stats()), 200
+
+@app.route('/api/health/outbox', methods=['GET'])
+def outbox_health():
+    """Notification outbox backlog, dispatcher counters and push broker stats."""
+    try:
+        with db_cursor() as cur:
+            stats = outbox_stats(cur)
+        stats['broker'] = get_broker().stats()
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/health/notification-retention', methods=['GET'])
+def notification_retention_health():
+    """Notification archive runs: totals and the latest runs."""
+    try:
+        with db_cursor() as cur:
+            return jsonify(retention_stats(cur)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/health/assistant', methods=['GET'])
+def assistant_health():
+    """Assistant prompt size, context build time, model client and chat writer counters since start-up."""
+    stats = context_stats()
+    stats['chat_writer'] = writer_stats()
+    if llm_configured():
+        stats['llm'] = get_llm().stats()
+    return jsonify(stats), 200
+
 @app.route('/api/register', methods=['POST'])
 def register():
     """Frontend sends username, password, hourly_rate."""
@@ -193,19 +214,14 @@ def login():
     if not username or not password:
         return jsonify({'success': False, 'message': 'Missing credentials'}), 400
     
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        # Check if user exists with matching password
-        cur.execute(
-            "SELECT user_id, username, hourly_rate FROM users WHERE username=%s AND password=%s",
-            (username, password)
-        )
-        row = cur.fetchone()
+        with db_cursor() as cur:
+            # Check if user exists with matching password
+            cur.execute(
+                "SELECT user_id, username, hourly_rate FROM users WHERE username=%s AND password=%s",
+                (username, password)
+            )
+            row = cur.fetchone()
         
         if row:
             # Login successful
@@ -219,33 +235,17 @@ def login():
             return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.route('/api/user/<int:user_id>/hourly-rate', methods=['GET'])
 def get_hourly_rate(user_id):
     """Get user's hourly rate."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({"error": "Database unavailable"}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT hourly_rate, date_of_birth FROM users WHERE user_id=%s LIMIT 1",
-            (user_id,)
-        )
-        row = cur.fetchone()
+        with db_cursor() as cur:
+            cur.execute(
+                "SELECT hourly_rate, date_of_birth FROM users WHERE user_id=%s LIMIT 1",
+                (user_id,)
+            )
+            row = cur.fetchone()
         if not row:
             return jsonify({"hourly_rate": None, "message": "Hourly rate not set"}), 200
 
@@ -281,17 +281,6 @@ def get_hourly_rate(user_id):
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.route('/api/user/<int:user_id>/hourly-rate', methods=['PUT'])
 def update_hourly_rate(user_id):
@@ -307,29 +296,14 @@ def update_hourly_rate(user_id):
             hourly_rate = float(hourly_rate)
         except:
             return jsonify({"error": "Invalid date of birth format"}), 400
-    conn = get_conn()
-    if not conn:
-        return jsonify({"error": "Database unavailable"}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute("UPDATE users SET hourly_rate=%s WHERE user_id=%s", (hourly_rate, user_id))
-        conn.commit()
+        with db_cursor(commit=True) as cur:
+            cur.execute("UPDATE users SET hourly_rate=%s WHERE user_id=%s", (hourly_rate, user_id))
+        invalidate_employee(user_id)
+        invalidate_snapshot(user_id)
         return jsonify({"hourly_rate": hourly_rate, "message": "Hourly rate updated"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.route('/api/user/<int:user_id>/daily-salary', methods=['POST'])
 def calculate_daily_salary(user_id):
@@ -360,6 +334,7 @@ def calculate_daily_salary(user_id):
         
         # Save to database
         save_daily_to_db(daily_salary, daily_hours, user_id)
+        invalidate_snapshot(user_id)
         
         #get_salary_after_bills(user_id)
         
@@ -375,23 +350,9 @@ def calculate_daily_salary(user_id):
 @app.route('/api/user/<int:user_id>/daily-salary', methods=['GET'])
 def calc_daily_salary(user_id):
     """Get latest daily salary and hours for user."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({"error": "Database unavailable"}), 500
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT daily_keep_amount, daily_hours_worked
-            FROM daily_keep
-            WHERE user_id = %s
-            ORDER BY daily_keep_date DESC
-            LIMIT 1
-            """,
-            (user_id,)
-        )
-        row = cur.fetchone()
+        with db_cursor() as cur:
+            row = get_storage().latest_daily_keep(cur, user_id)
         if not row:
             return jsonify({
                 "daily_salary": 0.0,
@@ -404,220 +365,158 @@ def calc_daily_salary(user_id):
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
 
 @app.route('/api/user/<int:user_id>/daily-salary-history', methods=['GET'])
 def get_daily_salaries(user_id):
-    """Get all daily salaries for user."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({"error": "Database unavailable"}), 500
-    
-    cur = None
+    """Get daily salaries for user, newest first, one page at a time (limit, cursor)."""
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT daily_keep_date, daily_keep_amount FROM daily_keep "
-            "WHERE user_id=%s ORDER BY daily_keep_date DESC",
-            (user_id,)
-        )
-        rows = cur.fetchall()
-        daily_salaries = [
-            {"date": r[0].strftime("%Y-%m-%d"), "amount": float(r[1])} for r in rows
-        ]
-        return jsonify({"history": daily_salaries}), 200
+        limit, cursor = page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        with db_cursor() as cur:
+            rows, next_cursor = keyset_page(
+                cur,
+                "SELECT daily_keep_date, daily_keep_amount, daily_keep_id FROM daily_keep WHERE user_id=%s",
+                (user_id,), "daily_keep_date", "daily_keep_id", limit, cursor, key=(0, 2)
+            )
+            daily_salaries = [
+                {"date": r[0].strftime("%Y-%m-%d"), "amount": float(r[1])} for r in rows
+            ]
+            return jsonify({"history": daily_salaries, "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 @app.route('/api/user/<int:user_id>/weekly-earnings', methods=['GET'])
 def get_weekly_earnings(user_id):
     """Get total weekly earnings for user."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({"error": "Database unavailable"}), 500
-    
-    cur = None
+    iso_year, week_number = iso_week()
     try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(weekly_earning),0),
-                                WEEK(CURDATE(),1),
-                                YEAR(CURDATE())
-            FROM shifts
-            WHERE employee_id=%s
-                AND YEARWEEK(shift_date,1) = YEARWEEK(CURDATE(),1)
-            """,
-            (user_id,)
-        )
-        row = cur.fetchone()
-        total_weekly = float(row[0]) if row and row[0] is not None else 0.0
-        week_num = row[1] if row else None
-        year = row[2] if row else None
+        with db_cursor() as cur:
+            # Primary-key lookup on the weekly ledger
+            total_weekly, _ = get_weekly(cur, user_id, iso_year, week_number)
         return jsonify({
             "total_earnings": round(total_weekly, 2),
-            "week_number": week_num,
-            "year": year
+            "week_number": week_number,
+            "year": iso_year
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
+def _assistant_unconfigured_reply(snapshot):
+    return (
+        f"I can't access AI services right now. Based on your monthly net {snapshot['net']:.2f} "
+        f"and {len(snapshot['bills'])} bills, consider reviewing recurring expenses and prioritising high-value bills."
+    )
+
+def _assistant_fallback_reply(snapshot):
+    return (
+        f"Sorry, I couldn't reach the AI service. Based on your monthly net {snapshot['net']:.2f} and hourly pay "
+        f"{snapshot['hourly_rate']:.2f} and {len(snapshot['bills'])} bills, consider checking subscription services "
+        "and utilities first."
+    )
+
 @app.route('/api/assistant/user/<int:user_id>/chat', methods=['POST'])
 def chat_with_assistant(user_id):
     """Chat with budget assistant (uses OpenAI if available, falls back to canned reply)."""
-    log_path = os.path.join(os.path.dirname(__file__), "budget_assistant.txt")
     data = request.json or {}
     message = data.get('message')
     if not message:
         return jsonify({"error": "Message required"}), 400
-    #with open(log_path,"r") as txt:
-    #    log_contents = txt.read()
-     #   if log_contents.count("User") > 1000:
-    #        log_contents = log_contents[-5000:]  # Keep last 5000 chars {log_contents}
-    # Fetch raw data to use in prompt
-    user_bills = _fetch_bills_raw(user_id)
-   # user_monthly_salary = _fetch_monthly_net_salary_raw(user_id)
-    hour_pay = update_hourly_rate(user_id)
-    with open(log_path,"r") as txt:
-        old_chats = txt.read()
-    assistant_prompt = (
-        f"You are a helpful budget assistant. Use the user's available balance and monthly net salary {user_monthly_salary} and hourly pay {hour_pay}"
-        f"you can remember previous interactions in this conversation by reviewing the chat history {old_chats}."
-        "to provide budgeting advice. Consider their bills ,and help them manage their finances effectively. "
-        "avoid giving generic advice; focus on the user's specific financial data, give investment tips, "
-        f"and their bills {user_bills} to provide concise, actionable budgeting advice."
-        " If you cannot access real-time data, inform the user accordingly."
-        "try to keep responses under 150 words,and remove unnesessary information."
-    )
-    prompt_text = f"User {user_id} says: {message}\nAssistant:\n{assistant_prompt}"
-
-    # If OpenAI key is not configured, return a simple fallback response
-    if not OPEN_AI_API_KEY:
-        fallback = (
-            f"I can't access AI services right now. Based on your monthly net {user_monthly_salary} "
-            f"and {len(user_bills)} bills, consider reviewing recurring expenses and prioritising high-value bills."
-        )
-        return jsonify({"response": fallback}), 200
-
+    # The user's financial snapshot, rolling summary and latest turns, within the token budget
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": assistant_prompt},
-                {"role": "user", "content": message}
-            ],
-            temperature=0.7,
-            max_tokens=250,
-            n=1,
-            stop=None,
-        )
-        answer = response["choices"][0]["message"]["content"].strip()
-        with open(log_path, "a") as txt:
-            txt.write(
-            "\n==chat entry==\n"
-            f"User ID: {user_id}\n"
-            "User Message:\n"
-            f"{message}\n"
-            "Response:\n"
-            f"{answer}\n"
-            "Timestamp:\n"
-            f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            "==chat entry end==\n"
-        )
-        return jsonify({"response": answer}), 200
+        with db_cursor(commit=True) as cur:
+            messages, snapshot, context = build_context(cur, user_id, message)
     except Exception as e:
-        print(f"OpenAI error: {e}")
-        fallback = (
-            f"Sorry, I couldn't reach the AI service. Based on your monthly net {user_monthly_salary} and hourly pay {hour_pay} "
-            f"and {len(user_bills)} bills, consider checking subscription services and utilities first."
-        )
-        return jsonify({"response": fallback, "error": str(e)}), 200
-@app.route('/api/assistantchat/user/<int:user_id>/message', methods=['GET'])
-def get_replies(user_id):
-    log_path = os.path.join(os.path.dirname(__file__), "budget_assistant.txt")
+        return jsonify({"error": str(e)}), 500
 
-    try:
-        with open(log_path, "r", encoding="utf-8") as txt:
-            log_contents = txt.read()
+    # If no model is configured, return a simple fallback response
+    if not llm_configured():
+        return jsonify({"response": _assistant_unconfigured_reply(snapshot), "context": context}), 200
 
-        chat_history = []
+    try:
+        # Bounded by LLM_TIMEOUT; repeat questions on an unchanged snapshot come from the cache
+        answer, llm = get_llm().complete(messages, key=cache_key(message, snapshot))
+        with db_cursor(commit=True) as cur:
+            save_chat(cur, user_id, message, answer)
+        return jsonify({"response": answer, "context": context, "llm": llm}), 200
+    except Exception as e:
+        print(f"Assistant model error: {e}")
+        return jsonify({"response": _assistant_fallback_reply(snapshot), "error": str(e), "context": context}), 200
 
-        for entry in log_contents.split("==chat entry=="):
-            if f"User ID: {user_id}" not in entry:
-                continue
+@app.route('/api/assistant/user/<int:user_id>/chat/stream', methods=['POST'])
+def stream_chat_with_assistant(user_id):
+    """Chat with the budget assistant, the answer sent as Server-Sent Events while the model writes it.
 
-            if "User Message:\n" not in entry or "Response:\n" not in entry or "Timestamp:\n" not in entry:
-                continue
+    Events: `token` ({"text"}) for each piece of the answer, then `done`
+    ({"response", "context", "llm"}) or `error` ({"error", "response": fallback}).
+    The turn is stored on the background chat writer once the stream has ended.
+    """
+    data = request.json or {}
+    message = data.get('message')
+    if not message:
+        return jsonify({"error": "Message required"}), 400
+    try:
+        with db_cursor(commit=True) as cur:
+            messages, snapshot, context = build_context(cur, user_id, message)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-            user_msg = entry.split("User Message:\n", 1)[1] \
-                            .split("\nResponse:\n", 1)[0].strip()
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
-            assistant_msg = entry.split("Response:\n", 1)[1] \
-                                 .split("\nTimestamp:\n", 1)[0].strip()
-            timer_stp = entry.split("Timestamp:\n", 1)[1] \
-                                 .split("\n==chat entry end==", 1)[0].strip()
-            chat_history.append({
-                "user_message": user_msg,
-                "assistant_response": assistant_msg,
-                "timestamp": timer_stp
-            })
+    def events():
+        if not llm_configured():
+            yield sse('done', {"response": _assistant_unconfigured_reply(snapshot), "context": context})
+            return
+        stream = get_llm().stream(messages, key=cache_key(message, snapshot))
+        try:
+            for delta in stream:
+                yield sse('token', {"text": delta})
+        except Exception as e:
+            print(f"Assistant model error: {e}")
+            yield sse('error', {"error": str(e), "response": _assistant_fallback_reply(snapshot)})
+            return
+        save_chat_later(user_id, message, stream.text)
+        yield sse('done', {"response": stream.text, "context": context, "llm": stream.info})
 
-        return jsonify({"chat_history": chat_history}), 200
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+@app.route('/api/assistantchat/user/<int:user_id>/message', methods=['GET'])
+def get_replies(user_id):
+    """The user's assistant history, one page at a time (limit, before), oldest first within a page."""
+    try:
+        limit, before = history_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        with db_cursor() as cur:
+            chat_history, next_before = chat_page(cur, user_id, limit, before)
+        return jsonify({"chat_history": chat_history, "next_before": next_before}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
+@app.route('/api/user/<int:user_id>/search', methods=['GET'])
+def search_user_history(user_id):
+    """Search the user's assistant history and bill names (q, kind, limit, cursor); best matches first."""
+    try:
+        terms, kind, limit, cursor = search_args(request.args, get_storage().dialect)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        with db_cursor() as cur:
+            results, next_cursor = search(cur, user_id, terms, kind, limit, cursor)
+        return jsonify({"results": results, "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/user/<int:user_id>/bills', methods=['GET'])
 def get_bills(user_id):
     """Get all bills for user."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({"error": "Database unavailable"}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT bill_id, bill_name, bill_amount FROM bills WHERE user_id=%s", (user_id,))
-        rows = cur.fetchall()
-        bills = [{"bill_id": r[0], "name": r[1], "amount": float(r[2])} for r in rows]
+        with db_cursor() as cur:
+            bills = get_storage().list_bills(cur, user_id)
         return jsonify({"bills": bills}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.route('/api/user/<int:user_id>/bills', methods=['POST'])
 def add_bill(user_id):
@@ -634,19 +533,13 @@ def add_bill(user_id):
     except:
         return jsonify({"error": "Invalid amount"}), 400
     
-    conn = get_conn()
-    if not conn:
-        return jsonify({"error": "Database unavailable"}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute("INSERT INTO bills (bill_name, bill_amount, user_id) VALUES (%s,%s,%s)", (name, amount, user_id))
-        conn.commit()
-        bill_id = cur.lastrowid
-        
-        # Auto-update salary after bills when a bill is added
-        get_salary_after_bills(user_id)
+        with db_cursor(commit=True) as cur:
+            bill_id = get_storage().add_bill(cur, user_id, name, amount)
+            index_bill(cur, user_id, bill_id, name)
+            # Auto-update salary after bills when a bill is added
+            refresh_bills(cur, user_id)
+        invalidate_snapshot(user_id)
         
         return jsonify({
             "bill_id": bill_id,
@@ -656,49 +549,24 @@ def add_bill(user_id):
         }), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.route('/api/user/<int:user_id>/bills/<int:bill_id>', methods=['DELETE'])
 def delete_bill(user_id, bill_id):
     """Delete a bill."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({"error": "Database unavailable"}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM bills WHERE bill_id=%s AND user_id=%s", (bill_id, user_id))
-        conn.commit()
-        if cur.rowcount > 0:
-            # Auto-update salary after bills when a bill is deleted
-            get_salary_after_bills(user_id)
+        with db_cursor(commit=True) as cur:
+            deleted = get_storage().delete_bill(cur, user_id, bill_id)
+            if deleted:
+                unindex_bill(cur, bill_id)
+                # Auto-update salary after bills when a bill is deleted
+                refresh_bills(cur, user_id)
+        if deleted:
+            invalidate_snapshot(user_id)
             return jsonify({"message": "Bill deleted successfully"}), 200
         else:
             return jsonify({"error": "Bill not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 ##reconstruct monthly salary to remodel it as payslips
 @app.route('/api/user/<int:user_id>/monthly-salary', methods=['GET'])
 def get_monthly_salary(user_id):
@@ -707,63 +575,27 @@ def get_monthly_salary(user_id):
     month = now.month
     year = now.year
     
-    
-    conn = get_conn()
-    if not conn:
-        return jsonify({"error": "Database unavailable"}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        # Get monthly salary from table
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(weekly_earning),0),
-                            WEEK(CURDATE(),1), 
-                            MONTH(CURDATE()),
-                            YEAR(CURDATE())
-            FROM shifts 
-            WHERE employee_id = %s
-                  AND YEAR(shift_date) = YEAR(CURDATE()) AND MONTH(shift_date) = MONTH(CURDATE())
-            """,
-            (user_id,)
-        )
-        row = cur.fetchone()
-        net_salary = float(row[0]) if row and row[0] is not None else 0.0
-        month = row[2] if row else month
-        year = row[3] if row else year
-        # Calculate gross from daily_keep
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(daily_keep_amount),0)
-            FROM daily_keep 
-            WHERE MONTH(daily_keep_date) = %s AND YEAR(daily_keep_date) = %s AND user_id = %s
-            """,
-            (month, year, user_id)
-        )
-        gross_salary = float(cur.fetchone()[0] or 0.0)
-        tax = gross_salary - net_salary
+        with db_cursor() as cur:
+            # Gross (daily_keep) from the monthly rollup; earlier months of the tax year for cumulative PAYE
+            rollup = get_rollup(cur, user_id, year, month)
+            ytd_before = year_to_date(cur, year, month, user_id=user_id).get(user_id, 0.0)
+        gross_salary = rollup["gross"] if rollup else 0.0
+        tax_year, tax_period = tax_period_of_month(year, month)
+        tax = paye_batch(ytd_before, gross_salary, tax_period, tax_year)
+        net_salary = gross_salary - tax
         
         return jsonify({
             "month": month,
             "year": year,
+            "tax_year": tax_year,
+            "tax_period": tax_period,
             "gross_salary": round(gross_salary, 2),
             "tax": round(tax, 2),
             "net_salary": round(net_salary, 2)
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 @app.route('/api/user/<int:user_id>/salary-after-bills', methods=['GET'])
 def get_salary_after_bills(user_id):
     """Get salary after bills percentage for current month."""
@@ -771,41 +603,19 @@ def get_salary_after_bills(user_id):
     month = now.month
     year = now.year
     
-    
-    conn = get_conn()
-    if not conn:
-        return jsonify({"error": "Database unavailable"}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        # Get monthly salary
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(weekly_earning),0),
-                            WEEK(CURDATE(),1),
-                            MONTH(CURDATE()),
-                            YEAR(CURDATE())
-            FROM shifts 
-            WHERE MONTH(shift_date)=MONTH(CURDATE()) AND YEAR(shift_date)=YEAR(CURDATE()) AND employee_id=%s
-            """,
-            (user_id,)
-        )
-        row = cur.fetchone()
-        monthly_salary = float(row[0]) if row and row[0] is not None else 0.0
-        month = row[2] if row else month
-        year = row[3] if row else year
+        with db_cursor() as cur:
+            rollup = get_rollup(cur, user_id, year, month)
+            # No activity this month yet: nothing earned, bills still count
+            total_bills = rollup["bill_total"] if rollup else get_storage().bills_total(cur, user_id)
         
-        # Get total bills
-        cur.execute("SELECT IFNULL(SUM(bill_amount),0) FROM bills WHERE user_id=%s", (user_id,))
-        total_bills = float(cur.fetchone()[0] or 0.0)
-        
-        # Calculate net and percentage
-        net_after_bills = monthly_salary - total_bills
-        net_after_bills = round(net_after_bills, 0)
-        if monthly_salary and monthly_salary != 0:
-            percent_after_bills = round((net_after_bills / monthly_salary) * 100, 2)
+        if rollup:
+            monthly_salary = rollup["net"]
+            net_after_bills = rollup["net_after_bills"]
+            percent_after_bills = rollup["percentage_after_bills"]
         else:
+            monthly_salary = 0.0
+            net_after_bills = round(-total_bills, 0)
             percent_after_bills = 0.0
         
         return jsonify({
@@ -818,17 +628,34 @@ def get_salary_after_bills(user_id):
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
+
+@app.route('/api/user/<int:user_id>/export/<dataset>', methods=['GET'])
+def export_user_history(user_id, dataset):
+    """Stream the user's full `earnings` (daily_keep) or `shifts` history as NDJSON or CSV."""
+    return _export_response(dataset, 'user', user_id)
+
+@app.route('/api/user/<int:user_id>/payslips', methods=['GET'])
+def get_payslips(user_id):
+    """The user's most recent payslips from closed months, newest first."""
+    limit = request.args.get('limit', 12, type=int)
+    try:
+        with db_cursor() as cur:
+            slips = list_payslips(cur, user_id, max(1, min(limit, 120)))
+        return jsonify({"payslips": slips}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/user/<int:user_id>/payslips/<int:year>/<int:month>', methods=['GET'])
+def get_payslip_for_month(user_id, year, month):
+    """One closed month's payslip; 404 until the month-close job has run for it."""
+    try:
+        with db_cursor() as cur:
+            slip = get_payslip(cur, user_id, year, month)
+        if not slip:
+            return jsonify({"error": "No payslip for this month"}), 404
+        return jsonify(slip), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 # --- SHIFT MANAGEMENT ENDPOINTS (EMPLOYER) ---
 @app.route('/api/employer/shifts', methods=['POST'])
@@ -846,26 +673,23 @@ def create_shift():
     if not all([shift_name, shift_date, start_time, end_time, employee_id, created_by]):
         return jsonify({'success': False, 'message': 'Missing required fields'}), 400
     
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        # Calculate hours worked
-        start = datetime.strptime(start_time, '%H:%M')
-        end = datetime.strptime(end_time, '%H:%M')
-        hours = (end - start).total_seconds() / 3600.0
-        
-        cur.execute(
-            "INSERT INTO shifts (shift_name, shift_date, start_time, end_time, description,"
-            "employee_id, created_by, shift_type, hours_worked)"#, status) 
-            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
-            (shift_name, shift_date, start_time, end_time, description, employee_id, created_by, 'employer_created', hours)#, 'pending'
-        )
-        conn.commit()
-        shift_id = cur.lastrowid
+        with db_cursor(commit=True) as cur:
+            # Calculate hours worked
+            start = datetime.strptime(start_time, '%H:%M')
+            end = datetime.strptime(end_time, '%H:%M')
+            hours = (end - start).total_seconds() / 3600.0
+
+            cur.execute(
+                "INSERT INTO shifts (shift_name, shift_date, start_time, end_time, description,"
+                "employee_id, created_by, shift_type, hours_worked)"#, status) 
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (shift_name, shift_date, start_time, end_time, description, employee_id, created_by, 'employer_created', hours)#, 'pending'
+            )
+            shift_id = cur.lastrowid
+        invalidate_employer(created_by)
+        invalidate_employee(employee_id)
+        invalidate_snapshot(employee_id)
         
         return jsonify({
             'success': True,
@@ -874,361 +698,196 @@ def create_shift():
         }), 201
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.route('/api/employer/pending-shifts', methods=['GET'])
 def get_pending_shifts():
-    """Get all pending shifts for approval."""
+    """Get pending shifts for approval, newest first, one page at a time (limit, cursor)."""
     employer_id = request.args.get('employer_id')
     
     if not employer_id:
         return jsonify({'success': False, 'message': 'Missing employer_id'}), 400
+    try:
+        limit, cursor = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT s.shift_id, s.shift_name, s.shift_date, s.start_time, s.end_time, "
-            "s.hours_worked, s.status, u.username, u.user_id "
-            "FROM shifts s "
-            "JOIN users u ON s.employee_id = u.user_id "
-            "WHERE s.created_by = %s AND s.status = 'pending' "
-            "ORDER BY s.shift_date DESC",
-            (employer_id,)
-        )
-        shifts = cur.fetchall()
-        
-        result = []
-        for shift in shifts:
-            result.append({
-                'id': shift[0],
-                'shiftName': shift[1],
-                'date': str(shift[2]),
-                'startTime': shift[3].strftime('%H:%M') if hasattr(shift[3], 'strftime') else str(shift[3]),
-                'endTime': shift[4].strftime('%H:%M') if hasattr(shift[4], 'strftime') else str(shift[4]),
-                'hoursWorked': float(shift[5]) if shift[5] else 0,
-                'status': shift[6],
-                'employeeName': shift[7],
-                'employeeId': shift[8]
-            })
-        
-        return jsonify({'success': True, 'data': result}), 200
+        with db_cursor() as cur:
+            shifts, next_cursor = keyset_page(
+                cur,
+                "SELECT s.shift_id, s.shift_name, s.shift_date, s.start_time, s.end_time, "
+                "s.hours_worked, s.status, u.username, u.user_id "
+                "FROM shifts s "
+                "JOIN users u ON s.employee_id = u.user_id "
+                "WHERE s.created_by = %s AND s.status = 'pending'",
+                (employer_id,), "s.shift_date", "s.shift_id", limit, cursor, key=(2, 0)
+            )
+
+            result = []
+            for shift in shifts:
+                result.append({
+                    'id': shift[0],
+                    'shiftName': shift[1],
+                    'date': str(shift[2]),
+                    'startTime': shift[3].strftime('%H:%M') if hasattr(shift[3], 'strftime') else str(shift[3]),
+                    'endTime': shift[4].strftime('%H:%M') if hasattr(shift[4], 'strftime') else str(shift[4]),
+                    'hoursWorked': float(shift[5]) if shift[5] else 0,
+                    'status': shift[6],
+                    'employeeName': shift[7],
+                    'employeeId': shift[8]
+                })
+
+            return jsonify({'success': True, 'data': result, 'next_cursor': next_cursor}), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
-@app.route('/api/employer/shifts/<int:shift_id>/approve', methods=['PUT'])
-def approve_shift(shift_id):
-    """Approve a shift and update employee salary."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
+def _decide_shift(shift_id, action, message):
+    """Apply `action` to one shift through approvals.decide_shifts.
+
+    Only a pending shift is decided, so a repeated request cannot pay twice, and a
+    shift claimed from the pending queue by anyone but the caller is left alone. The
+    manager is `manager_id` from the body or query string, else the X-User-ID header;
+    without either, any live claim blocks the decision.
+    """
+    manager_id = ((request.get_json(silent=True) or {}).get('manager_id')
+                  or request.args.get('manager_id') or request.headers.get('X-User-ID'))
+    try:
+        manager_id = int(manager_id) if manager_id is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'manager_id must be an integer'}), 400
     
-    cur = None
     try:
-        cur = conn.cursor()
-        
-        # Get shift and employee details
-        cur.execute(
-            "SELECT s.employee_id, s.shift_date, s.hours_worked, u.hourly_rate "
-            "FROM shifts s "
-            "JOIN users u ON s.employee_id = u.user_id "
-            "WHERE s.shift_id = %s",
-            (shift_id,)
-        )
-        shift = cur.fetchone()
-        
-        if not shift:
-            return jsonify({'success': False, 'message': 'Shift not found'}), 404
-        
-        employee_id, shift_date, hours_worked, hourly_rate = shift
-        rounded_hours = round(float(hours_worked), 2)
-        if rounded_hours >= 8.0:
-            break_time = 0.5  # 1 hour break for shifts 8 hours or longer
-        elif rounded_hours >= 6.0:
-            break_time = 0.25  # 30 minutes break for shifts 6 hours or longer
-        else:
-            break_time = 0.0  # No break for shorter shifts
-        
-        # Calculate earnings for this shift
-        hours_worked_adjusted = float(hours_worked) - break_time
-        shift_earnings = round(hours_worked_adjusted * float(hourly_rate), 2) if hourly_rate else 0.0
-        
-        # Update shift status
-        cur.execute(
-            "UPDATE shifts SET status = 'approved', approved_at = NOW() WHERE shift_id = %s",
-            (shift_id,)
-        )
-        
-        # Create notification for employee
-        cur.execute(
-            "INSERT INTO notifications (user_id, shift_id, notification_type, message) "
-            "VALUES (%s, %s, %s, %s)",
-            (employee_id, shift_id, 'shift_approved', f'Your shift on {shift_date} has been approved! Earned: £{shift_earnings:.2f}')
-        )
-        
-        # Add to daily_keep for salary tracking with calculated amount
-        cur.execute(
-            
-            "INSERT INTO daily_keep (daily_keep_date, daily_hours_worked, daily_keep_amount, user_id) "
-            "VALUES (%s, %s, %s, %s)",
-            (shift_date, hours_worked, shift_earnings, employee_id)
-        )
-        # Persist shift earnings for weekly rollups
-        cur.execute(
-            "UPDATE shifts SET weekly_earning = %s WHERE shift_id = %s",
-            (shift_earnings, shift_id)
-        )
-        year_num = shift_date.year if hasattr(shift_date, 'year') else int(str(shift_date).split('-')[0])
-        # shift_date is a datetime.date object, so use .year and .month attributes
-        month_num = shift_date.month if hasattr(shift_date, 'month') else int(str(shift_date).split('-')[1])
-        
-        cur.execute(
-            "SELECT IFNULL(SUM(daily_keep_amount), 0) FROM daily_keep "
-            "WHERE YEAR(daily_keep_date) = %s AND MONTH(daily_keep_date) = %s AND user_id = %s",
-            (year_num, month_num, employee_id)
-        )
-        result = cur.fetchone()
-        monthly_total = float(result[0]) if result and result[0] else 0.0
-        # Update weekly earnings by recalculating from daily_keep
-        # Check if monthly record exists
-        
-        return jsonify({
-            'success': True,
-            'message': 'Shift approved, salary updated, and notification sent',
-            'earnings': shift_earnings
-        }), 200
+        with db_cursor(commit=True) as cur:
+            result = decide_shifts(cur, [shift_id], action, manager_id)[0]
+        if not result['success']:
+            code = 404 if 'status' not in result else 409
+            return jsonify(result), code
+        invalidate_employee(result['employee_id'])
+        invalidate_snapshot(result['employee_id'])
+        wake_dispatcher()
+        response = {'success': True, 'message': message}
+        if 'earnings' in result:
+            response['earnings'] = result['earnings']
+        return jsonify(response), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
+
+@app.route('/api/employer/shifts/<int:shift_id>/approve', methods=['PUT'])
+def approve_shift(shift_id):
+    """Approve a pending shift and update employee salary."""
+    return _decide_shift(shift_id, "approve", 'Shift approved, salary updated, and notification sent')
+
 @app.route('/api/employer/shifts/<int:shift_id>/overtime', methods=['PUT'])
 def approve_overtime_shift(shift_id):
-    """Approve an overtime shift and update employee salary."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
+    """Approve a pending shift at the overtime rate and update employee salary."""
+    return _decide_shift(shift_id, "overtime", 'Overtime shift approved, salary updated, and notification sent')
+
+@app.route('/api/employer/shifts/<int:shift_id>/reject', methods=['PUT'])
+def reject_shift(shift_id):
+    """Reject a pending shift."""
+    return _decide_shift(shift_id, "reject", 'Shift rejected and notification sent')
+
+@app.route('/api/employer/shifts/import', methods=['POST'])
+def import_roster():
+    """Import a roster of shifts streamed as CSV or a JSON array (raw body or a 'file' upload)."""
+    employer_id = request.args.get('employer_id')
+    if not employer_id or not employer_id.isdigit():
+        return jsonify({'success': False, 'message': 'Missing or invalid employer_id'}), 400
+    batch_size = request.args.get('batch_size', type=int)
+    
+    upload = request.files.get('file')
+    if upload:
+        raw, fmt = upload.stream, detect_format(upload.filename, upload.mimetype, request.args.get('format'))
+    else:
+        raw, fmt = request.stream, detect_format(None, request.mimetype, request.args.get('format'))
+    if fmt not in ('csv', 'json'):
+        return jsonify({'success': False, 'message': 'format must be csv or json'}), 400
     
-    cur = None
     try:
-        cur = conn.cursor()
-        
-        # Get shift and employee details
-        cur.execute(
-            "SELECT s.employee_id, s.shift_date, s.hours_worked, u.hourly_rate "
-            "FROM shifts s "
-            "JOIN users u ON s.employee_id = u.user_id "
-            "WHERE s.shift_id = %s",
-            (shift_id,)
-        )
-        shift = cur.fetchone()
-        
-        if not shift:
-            return jsonify({'success': False, 'message': 'Shift not found'}), 404
-        
-        employee_id, shift_date, hours_worked, hourly_rate = shift
-        
-        # Calculate earnings for this shift
-        rounded_hours = round(float(hours_worked), 2)
-        if rounded_hours >= 8.0:
-            break_time = 0.5  # 1 hour break for shifts 8 hours or longer
-        elif rounded_hours >= 6.0:
-            break_time = 0.25  # 30 minutes break for shifts 6 hours or longer
-        else:
-            break_time = 0.0  # No break for shorter shifts
-        
-        # Calculate earnings for this shift
-        hours_worked_adjusted = float(hours_worked) - break_time
-        shift_earnings = round(hours_worked_adjusted * float(hourly_rate) * 1.5, 2) if hourly_rate else 0.0
-        
-        # Update shift status
-        cur.execute(
-            "UPDATE shifts SET status = 'approved', approved_at = NOW() WHERE shift_id = %s",
-            (shift_id,)
-        )
-        
-        # Create notification for employee
-        cur.execute(
-            "INSERT INTO notifications (user_id, shift_id, notification_type, message) "
-            "VALUES (%s, %s, %s, %s)",
-            (employee_id, shift_id, 'shift_approved', f'Your shift on {shift_date} has been approved! Earned: £{shift_earnings:.2f}')
-        )
-        
-        # Add to daily_keep for salary tracking with calculated amount
-        cur.execute(
-            
-            "INSERT INTO daily_keep (daily_keep_date, daily_hours_worked, daily_keep_amount, user_id) "
-            "VALUES (%s, %s, %s, %s)",
-            (shift_date, hours_worked, shift_earnings, employee_id)
-        )
-        # Persist shift earnings for weekly rollups
-        cur.execute(
-            "UPDATE shifts SET weekly_earning = %s WHERE shift_id = %s",
-            (shift_earnings, shift_id)
-        )
-        year_num = shift_date.year if hasattr(shift_date, 'year') else int(str(shift_date).split('-')[0])
-        # shift_date is a datetime.date object, so use .year and .month attributes
-        month_num = shift_date.month if hasattr(shift_date, 'month') else int(str(shift_date).split('-')[1])
-        
-        cur.execute(
-            "SELECT IFNULL(SUM(daily_keep_amount), 0) FROM daily_keep "
-            "WHERE YEAR(daily_keep_date) = %s AND MONTH(daily_keep_date) = %s AND user_id = %s",
-            (year_num, month_num, employee_id)
-        )
-        result = cur.fetchone()
-        monthly_total = float(result[0]) if result and result[0] else 0.0
-        # Update weekly earnings by recalculating from daily_keep
-        # Check if monthly record exists
-        
-        return jsonify({
-            'success': True,
-            'message': 'Overtime shift approved, salary updated, and notification sent',
-            'earnings': shift_earnings
-        }), 200
+        stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        report = import_shifts(open_rows(stream, fmt), int(employer_id), batch_size)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
-@app.route('/api/employer/shifts/<int:shift_id>/reject', methods=['PUT'])
-def reject_shift(shift_id):
-    """Reject a shift."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
+    if 'error' in report:
+        # the rows before the error are committed: report them so a retry can skip them
+        return jsonify({'success': False, 'message': f"Invalid roster file: {report['error']}", **report}), 400
+    return jsonify({'success': True, **report}), 200
+
+@app.route('/api/employer/shifts/bulk', methods=['POST'])
+def bulk_decide_shifts():
+    """Approve, overtime-approve or reject many shifts in one transaction.
+
+    Shifts claimed from the pending queue by anyone but `manager_id` are skipped.
+    """
+    data = request.json or {}
+    action = data.get('action')
+    shift_ids = data.get('shift_ids')
+    manager_id = data.get('manager_id')
     
-    cur = None
+    if action not in ACTIONS:
+        return jsonify({'success': False, 'message': f"action must be one of {', '.join(ACTIONS)}"}), 400
+    if not isinstance(shift_ids, list) or not shift_ids:
+        return jsonify({'success': False, 'message': 'shift_ids must be a non-empty list'}), 400
+    if len(shift_ids) > MAX_BULK_SHIFTS:
+        return jsonify({'success': False, 'message': f'At most {MAX_BULK_SHIFTS} shifts per request'}), 400
     try:
-        cur = conn.cursor()
-        
-        # Get shift and employee details
-        cur.execute(
-            "SELECT employee_id, shift_date FROM shifts WHERE shift_id = %s",
-            (shift_id,)
-        )
-        shift = cur.fetchone()
-        
-        if not shift:
-            return jsonify({'success': False, 'message': 'Shift not found'}), 404
-        
-        employee_id, shift_date = shift
-        
-        # Update shift status
-        cur.execute(
-            "UPDATE shifts SET status = 'rejected' WHERE shift_id = %s",
-            (shift_id,)
-        )
-        
-        # Create notification for employee
-        cur.execute(
-            "INSERT INTO notifications (user_id, shift_id, notification_type, message) "
-            "VALUES (%s, %s, %s, %s)",
-            (employee_id, shift_id, 'shift_rejected', f'Your shift on {shift_date} has been rejected.')
-        )
-        
-        conn.commit()
-        
+        shift_ids = [int(shift_id) for shift_id in shift_ids]
+        manager_id = int(manager_id) if manager_id is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'shift_ids and manager_id must be integers'}), 400
+    
+    try:
+        with db_cursor(commit=True) as cur:
+            results = decide_shifts(cur, shift_ids, action, manager_id)
+        for employee_id in {r['employee_id'] for r in results if r['success']}:
+            invalidate_employee(employee_id)
+            invalidate_snapshot(employee_id)
+        updated = sum(1 for r in results if r['success'])
+        if updated:
+            wake_dispatcher()
         return jsonify({
             'success': True,
-            'message': 'Shift rejected and notification sent'
+            'updated': updated,
+            'skipped': len(results) - updated,
+            'results': results
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
+
 @app.route('/api/employee/shifts', methods=['GET'])
 def get_shifts():
     employee_id = request.args.get('employee_id')
     if not employee_id:
         return jsonify({'success': False, 'message': 'Missing employee_id'}), 400
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT shift_id, shift_name, shift_type, shift_date, start_time, end_time, "
-                    "hours_worked, status, created_at "
-                    "FROM shifts WHERE employee_id = %s ORDER BY shift_date DESC", (employee_id,)
-        )
-        shifts = cur.fetchall()
-        result = []
-        for shift in shifts:
-            result.append({
-                'id': shift[0],
-                'shiftName': shift[1],
-                'date': str(shift[3]),
-                'startTime': shift[4].strftime('%H:%M') if hasattr(shift[4], 'strftime') else str(shift[4]),
-                'endTime': shift[5].strftime('%H:%M') if hasattr(shift[5], 'strftime') else str(shift[5]),
-                'hoursWorked': float(shift[6]) if shift[6] else 0,
-                'status': shift[7],
-                'createdAt': str(shift[8]),
-                'shiftType': shift[2]
-            })
-        return jsonify({'success': True, 'data': result}), 200
+        limit, cursor = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    try:
+        with db_cursor() as cur:
+            shifts, next_cursor = keyset_page(
+                cur,
+                "SELECT shift_id, shift_name, shift_type, shift_date, start_time, end_time, "
+                "hours_worked, status, created_at "
+                "FROM shifts WHERE employee_id = %s",
+                (employee_id,), "shift_date", "shift_id", limit, cursor, key=(3, 0)
+            )
+            result = []
+            for shift in shifts:
+                result.append({
+                    'id': shift[0],
+                    'shiftName': shift[1],
+                    'date': str(shift[3]),
+                    'startTime': shift[4].strftime('%H:%M') if hasattr(shift[4], 'strftime') else str(shift[4]),
+                    'endTime': shift[5].strftime('%H:%M') if hasattr(shift[5], 'strftime') else str(shift[5]),
+                    'hoursWorked': float(shift[6]) if shift[6] else 0,
+                    'status': shift[7],
+                    'createdAt': str(shift[8]),
+                    'shiftType': shift[2]
+                })
+            return jsonify({'success': True, 'data': result, 'next_cursor': next_cursor}), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.route('/api/employer/employees', methods=['GET'])
 def get_employees():
@@ -1237,161 +896,105 @@ def get_employees():
     
     if not employer_id:
         return jsonify({'success': False, 'message': 'Missing employer_id'}), 400
+    if not employer_id.isdigit():
+        return jsonify({'success': False, 'message': 'Invalid employer_id'}), 400
     
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
+    try:
+        with db_cursor() as cur:
+            result = get_roster(cur, employer_id)
+        return jsonify({'success': True, 'data': result}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/employer/export/<dataset>', methods=['GET'])
+def export_employer_history(dataset):
+    """Stream `earnings` or `shifts` history for every employee of an employer as NDJSON or CSV."""
+    employer_id = request.args.get('employer_id')
+    if not employer_id or not employer_id.isdigit():
+        return jsonify({'success': False, 'message': 'Missing or invalid employer_id'}), 400
+    return _export_response(dataset, 'employer', int(employer_id))
+
+@app.route('/api/employer/payroll', methods=['GET'])
+def get_pay_run():
+    """Gross, tax and net for every employee of an employer over a month of approved shifts."""
+    employer_id = request.args.get('employer_id')
+    month = request.args.get('month')  # YYYY-MM, default current month
     
-    cur = None
+    if not employer_id or not employer_id.isdigit():
+        return jsonify({'success': False, 'message': 'Missing or invalid employer_id'}), 400
     try:
-        cur = conn.cursor()
-        # Get current month and year
-        from datetime import datetime
-        now = datetime.now()
-        
-        # Get all employees with current month salary data
-        cur.execute(
-            """
-            SELECT u.user_id, u.username, u.hourly_rate,
-                   (SELECT COUNT(*) FROM shifts WHERE employee_id = u.user_id AND MONTH(shift_date) = MONTH(CURDATE()) AND YEAR(shift_date) = YEAR(CURDATE())) AS total_shifts,
-                   (SELECT IFNULL(SUM(hours_worked), 0) FROM shifts WHERE employee_id = u.user_id AND MONTH(shift_date) = MONTH(CURDATE()) AND YEAR(shift_date) = YEAR(CURDATE())) AS total_hours,
-                   (SELECT COALESCE(SUM(weekly_earning), 0) FROM shifts WHERE employee_id = u.user_id AND MONTH(shift_date) = MONTH(CURDATE()) AND YEAR(shift_date) = YEAR(CURDATE())) AS monthly_salary
-            FROM users u
-            WHERE u.role = 'employee'AND u.created_by = %s
-            ORDER BY u.username
-            """,
-            (employer_id,)
-        )
-        employees = cur.fetchall()
-        
-        result = []
-        for emp in employees:
-            total_hours = float(emp[4]) if emp[4] else 0
-            hourly_rate = float(emp[2]) if emp[2] else 0
-            gross_salary = float(emp[5]) if emp[5] is not None else (total_hours * hourly_rate)
-
-            
-            result.append({
-                'id': emp[0],
-                'name': emp[1],
-                'email': f"{emp[1]}@company.com",
-                'status': 'active',
-                'department': 'Operations',
-                'hoursWorked': total_hours,
-                'joinDate': '2025-06-15',
-                'totalShifts': emp[3],
-                'hourlyRate': hourly_rate,
-                'monthlySalary': gross_salary,
-                'calculatedSalary': total_hours * hourly_rate
-            })
-        
+        period = Period.month(*map(int, month.split('-'))) if month else Period.month()
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'month must be YYYY-MM'}), 400
+    
+    try:
+        with db_cursor() as cur:
+            result = pay_run(cur, int(employer_id), period)
         return jsonify({'success': True, 'data': result}), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.route('/api/employer/employees/<int:employee_id>/salary', methods=['GET'])
 def get_employee_salary_details(employee_id):
     """Get detailed salary information for a specific employee."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        
-        # Get employee basic info
-        cur.execute(
-            "SELECT user_id, username, hourly_rate FROM users WHERE user_id = %s AND role = 'employee'",
-            (employee_id,)
-        )
-        emp = cur.fetchone()
-        if not emp:
-            return jsonify({'success': False, 'message': 'Employee not found'}), 404
-        
-        # Get current month salary
-        from datetime import datetime
-        now = datetime.now()
-        current_month = now.month
-        current_year = now.year
-        
-        cur.execute(
-            "SELECT IFNULL(SUM(daily_keep_amount), 0) FROM daily_keep WHERE user_id = %s AND MONTH(daily_keep_date) = %s AND YEAR(daily_keep_date) = %s",
-            (employee_id, current_month, current_year)
-        )
-        result = cur.fetchone()
-        monthly_total = float(result[0]) if result else 0
-        
-        # Get this week salary
-        cur.execute(
-            "SELECT IFNULL(earnings_amount, 0) FROM weekly_earnings WHERE user_id = %s AND week_number = WEEK(NOW(), 1) AND year_num = %s ORDER BY weekly_earnings_id DESC LIMIT 1",
-            (employee_id, current_year)
-        )
-        weekly_result = cur.fetchone()
-        weekly_total = float(weekly_result[0]) if weekly_result else 0
-        
-        # Get total hours this month
-        cur.execute(
-            "SELECT IFNULL(SUM(hours_worked), 0) FROM shifts WHERE employee_id = %s AND status = 'approved' AND MONTH(shift_date) = %s AND YEAR(shift_date) = %s",
-            (employee_id, current_month, current_year)
-        )
-        result = cur.fetchone()
-        monthly_hours = float(result[0]) if result else 0
-        
-        # Get recent shifts (last 10)
-        cur.execute(
-            "SELECT shift_id, shift_date, hours_worked, status, created_at FROM shifts WHERE employee_id = %s ORDER BY shift_date DESC LIMIT 10",
-            (employee_id,)
-        )
-        shifts = cur.fetchall()
-        
-        shift_list = []
-        for shift in shifts:
-            shift_list.append({
-                'id': shift[0],
-                'date': str(shift[1]),
-                'hours': float(shift[2]),
-                'status': shift[3],
-                'createdAt': str(shift[4]),
-                'earnings': float(shift[2]) * float(emp[2])
-            })
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'employeeId': emp[0],
-                'employeeName': emp[1],
-                'hourlyRate': float(emp[2]),
-                'monthlyTotal': float(monthly_total),
-                'weeklyTotal': float(weekly_total),
-                'monthlyHours': float(monthly_hours),
-                'recentShifts': shift_list
-            }
-        }), 200
+        with db_cursor() as cur:
+
+            # Get employee basic info
+            cur.execute(
+                "SELECT user_id, username, hourly_rate FROM users WHERE user_id = %s AND role = 'employee'",
+                (employee_id,)
+            )
+            emp = cur.fetchone()
+            if not emp:
+                return jsonify({'success': False, 'message': 'Employee not found'}), 404
+
+            # Get current month salary
+            now = datetime.now()
+            current_month_period = Period.month(now)
+
+            monthly_total = period_total(cur, "daily_keep", "daily_keep_amount", "daily_keep_date",
+                                         current_month_period, "user_id = %s", (employee_id,))
+
+            # Get this week salary
+            weekly_total, _ = get_weekly(cur, employee_id, *iso_week(now))
+
+            # Get total hours this month
+            monthly_hours = period_total(cur, "shifts", "hours_worked", "shift_date", current_month_period,
+                                         "employee_id = %s AND status = 'approved'", (employee_id,))
+
+            # Get recent shifts (last 10)
+            cur.execute(
+                "SELECT shift_id, shift_date, hours_worked, status, created_at FROM shifts WHERE employee_id = %s ORDER BY shift_date DESC LIMIT 10",
+                (employee_id,)
+            )
+            shifts = cur.fetchall()
+
+            shift_list = []
+            for shift in shifts:
+                shift_list.append({
+                    'id': shift[0],
+                    'date': str(shift[1]),
+                    'hours': float(shift[2]),
+                    'status': shift[3],
+                    'createdAt': str(shift[4]),
+                    'earnings': float(shift[2]) * float(emp[2])
+                })
+
+            return jsonify({
+                'success': True,
+                'data': {
+                    'employeeId': emp[0],
+                    'employeeName': emp[1],
+                    'hourlyRate': float(emp[2]),
+                    'monthlyTotal': float(monthly_total),
+                    'weeklyTotal': float(weekly_total),
+                    'monthlyHours': float(monthly_hours),
+                    'recentShifts': shift_list
+                }
+            }), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 # --- EMPLOYEE NOTIFICATION ENDPOINTS ---
 @app.route('/api/employee/notifications', methods=['GET'])
@@ -1402,48 +1005,91 @@ def get_notifications():
     if not employee_id:
         return jsonify({'success': False, 'message': 'Missing employee_id'}), 400
     
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT notification_id, shift_id, notification_type, message, is_read, created_at "
-            "FROM notifications "
-            "WHERE user_id = %s "
-            "ORDER BY created_at DESC "
-            "LIMIT 20",
-            (employee_id,)
-        )
-        notifications = cur.fetchall()
+        with db_cursor() as cur:
+            notifications = get_storage().list_notifications(cur, employee_id, limit=20)
         
-        result = []
-        for notif in notifications:
-            result.append({
-                'id': notif[0],
-                'shiftId': notif[1],
-                'type': notif[2],
-                'message': notif[3],
-                'isRead': notif[4],
-                'createdAt': str(notif[5])
-            })
+        result = [_notification_item(notif) for notif in notifications]
         
         return jsonify({'success': True, 'data': result}), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
+
+def _notification_item(notif):
+    return {
+        'id': notif[0],
+        'shiftId': notif[1],
+        'type': notif[2],
+        'message': notif[3],
+        'isRead': notif[4],
+        'createdAt': str(notif[5])
+    }
+
+def _notifications_since(employee_id, since_id):
+    with db_cursor() as cur:
+        return [_notification_item(n) for n in get_storage().list_notifications_since(cur, employee_id, since_id)]
+
+def _since_args():
+    """(employee_id, since_id) from the query string; since also comes from an SSE Last-Event-ID header."""
+    employee_id = int(request.args['employee_id'])
+    since_id = request.headers.get('Last-Event-ID') or request.args.get('since', 0)
+    return employee_id, max(0, int(since_id))
+
+@app.route('/api/employee/notifications/poll', methods=['GET'])
+def poll_notifications():
+    """Long-poll: notifications newer than `since`, waiting up to `timeout` seconds for the first one."""
+    try:
+        employee_id, since_id = _since_args()
+        timeout = min(float(request.args.get('timeout', NOTIFY_POLL_TIMEOUT)), NOTIFY_POLL_TIMEOUT)
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'message': 'employee_id, since and timeout must be numbers'}), 400
+    
+    # subscribe before reading so a notification committed in between still wakes us
+    sub = get_broker().subscribe(user_topic(employee_id))
+    try:
+        result = _notifications_since(employee_id, since_id)
+        if not result and sub.wait(max(0.0, timeout)):
+            result = _notifications_since(employee_id, since_id)
+        return jsonify({
+            'success': True,
+            'data': result,
+            'since': result[-1]['id'] if result else since_id
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
     finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
+        sub.close()
+
+@app.route('/api/employee/notifications/stream', methods=['GET'])
+def stream_notifications():
+    """Server-Sent Events: one `notification` event per new row, sent as it is dispatched."""
+    try:
+        employee_id, since_id = _since_args()
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'message': 'employee_id and since must be numbers'}), 400
+    
+    def events(since_id):
+        sub = get_broker().subscribe(user_topic(employee_id))
+        try:
+            yield f"retry: {NOTIFY_RETRY_MS}\n\n"
+            deadline = time.monotonic() + NOTIFY_STREAM_SECONDS
+            woken = True  # read once up front for rows committed before we subscribed
+            while True:
+                if woken:
+                    for item in _notifications_since(employee_id, since_id):
+                        since_id = item['id']
+                        yield f"event: notification\nid: {since_id}\ndata: {json.dumps(item)}\n\n"
+                else:
+                    yield ": keep-alive\n\n"
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break  # the client reconnects with Last-Event-ID
+                woken = sub.wait(min(NOTIFY_HEARTBEAT_SECONDS, remaining))
+        finally:
+            sub.close()
+    
+    return Response(events(since_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # --- EMPLOYEE SHIFT SUBMISSION ENDPOINTS ---
 @app.route('/api/employee/shifts', methods=['POST'])
@@ -1460,26 +1106,22 @@ def submit_shift():
     if not all([shift_name, shift_date, start_time, end_time, employee_id]):
         return jsonify({'success': False, 'message': 'Missing required fields'}), 400
     
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        # Calculate hours worked
-        start = datetime.strptime(start_time, '%H:%M')
-        end = datetime.strptime(end_time, '%H:%M')
-        hours = (end - start).total_seconds() / 3600.0
-        
-        cur.execute(
-            "INSERT INTO shifts (shift_name, shift_date, start_time, end_time, description, "
-            "employee_id, created_by, shift_type, hours_worked) "
-            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
-            (shift_name, shift_date, start_time, end_time, description, employee_id, employee_id, 'employee_submitted', hours)
-        )
-        conn.commit()
-        shift_id = cur.lastrowid
+        with db_cursor(commit=True) as cur:
+            # Calculate hours worked
+            start = datetime.strptime(start_time, '%H:%M')
+            end = datetime.strptime(end_time, '%H:%M')
+            hours = (end - start).total_seconds() / 3600.0
+
+            cur.execute(
+                "INSERT INTO shifts (shift_name, shift_date, start_time, end_time, description, "
+                "employee_id, created_by, shift_type, hours_worked) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (shift_name, shift_date, start_time, end_time, description, employee_id, employee_id, 'employee_submitted', hours)
+            )
+            shift_id = cur.lastrowid
+        invalidate_employee(employee_id)
+        invalidate_snapshot(employee_id)
         
         return jsonify({
             'success': True,
@@ -1488,157 +1130,203 @@ def submit_shift():
         }), 201
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.route('/api/employee/submitted-shifts', methods=['GET'])
 def get_employee_submitted_shifts():
-    """Get all shifts submitted by an employee."""
+    """Get shifts submitted by an employee, newest first, one page at a time (limit, cursor)."""
     employee_id = request.args.get('employee_id')
     
     if not employee_id:
         return jsonify({'success': False, 'message': 'Missing employee_id'}), 400
+    try:
+        limit, cursor = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT shift_id, shift_name, shift_date, start_time, end_time, "
-            "hours_worked, status, created_at "
-            "FROM shifts "
-            "WHERE employee_id = %s AND shift_type = 'employee_submitted' "
-            "ORDER BY shift_date DESC",
-            (employee_id,)
-        )
-        shifts = cur.fetchall()
-        
-        result = []
-        for shift in shifts:
-            result.append({
-                'id': shift[0],
-                'shiftName': shift[1],
-                'date': str(shift[2]),
-                'startTime': shift[3].strftime('%H:%M') if hasattr(shift[3], 'strftime') else str(shift[3]),
-                'endTime': shift[4].strftime('%H:%M') if hasattr(shift[4], 'strftime') else str(shift[4]),
-                'hoursWorked': float(shift[5]) if shift[5] else 0,
-                'status': shift[6],
-                'createdAt': str(shift[7])
-            })
-        
-        return jsonify({'success': True, 'data': result}), 200
+        with db_cursor() as cur:
+            shifts, next_cursor = keyset_page(
+                cur,
+                "SELECT shift_id, shift_name, shift_date, start_time, end_time, "
+                "hours_worked, status, created_at "
+                "FROM shifts "
+                "WHERE employee_id = %s AND shift_type = 'employee_submitted'",
+                (employee_id,), "shift_date", "shift_id", limit, cursor, key=(2, 0)
+            )
+
+            result = []
+            for shift in shifts:
+                result.append({
+                    'id': shift[0],
+                    'shiftName': shift[1],
+                    'date': str(shift[2]),
+                    'startTime': shift[3].strftime('%H:%M') if hasattr(shift[3], 'strftime') else str(shift[3]),
+                    'endTime': shift[4].strftime('%H:%M') if hasattr(shift[4], 'strftime') else str(shift[4]),
+                    'hoursWorked': float(shift[5]) if shift[5] else 0,
+                    'status': shift[6],
+                    'createdAt': str(shift[7])
+                })
+
+            return jsonify({'success': True, 'data': result, 'next_cursor': next_cursor}), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
+
+def _queue_item(shift):
+    """JSON shape of a pending_queue row."""
+    return {
+        'id': shift[0],
+        'shiftName': shift[1],
+        'date': str(shift[2]),
+        'startTime': shift[3].strftime('%H:%M') if hasattr(shift[3], 'strftime') else str(shift[3]),
+        'endTime': shift[4].strftime('%H:%M') if hasattr(shift[4], 'strftime') else str(shift[4]),
+        'hoursWorked': float(shift[5]) if shift[5] else 0,
+        'status': shift[6],
+        'employeeName': shift[7],
+        'employeeId': shift[8],
+        'shiftType': 'employee_submitted',
+        'claimedBy': shift[9],
+        'claimedAt': str(shift[10]) if shift[10] else None
+    }
 
 @app.route('/api/employer/pending-employee-shifts', methods=['GET'])
 def get_pending_employee_shifts():
-    """Get all pending shifts submitted by employees (for employer approval)."""
+    """Get pending shifts submitted by the employer's employees, one page at a time (limit, cursor).
+
+    `unclaimed=1` leaves out shifts another manager is working on.
+    """
     employer_id = request.args.get('employer_id')
     
-    if not employer_id:
+    if not employer_id or not employer_id.isdigit():
+        return jsonify({'success': False, 'message': 'Missing or invalid employer_id'}), 400
+    try:
+        limit, cursor = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    unclaimed_only = request.args.get('unclaimed') in ('1', 'true')
+    
+    try:
+        with db_cursor() as cur:
+            shifts, next_cursor = queue_page(cur, int(employer_id), limit, cursor, unclaimed_only)
+        result = [_queue_item(shift) for shift in shifts]
+        return jsonify({'success': True, 'data': result, 'next_cursor': next_cursor}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/employer/pending-employee-shifts/count', methods=['GET'])
+def get_pending_employee_shift_count():
+    """Number of pending employee-submitted shifts for the employer, and how many are unclaimed."""
+    employer_id = request.args.get('employer_id')
+    if not employer_id or not employer_id.isdigit():
+        return jsonify({'success': False, 'message': 'Missing or invalid employer_id'}), 400
+    try:
+        with db_cursor() as cur:
+            counts = queue_counts(cur, int(employer_id))
+        return jsonify({'success': True, 'data': counts}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/employer/pending-employee-shifts/claim', methods=['POST'])
+def claim_pending_employee_shifts():
+    """Claim the oldest unclaimed pending shifts for a manager: {employer_id, manager_id, limit}."""
+    data = request.json or {}
+    employer_id = data.get('employer_id')
+    manager_id = data.get('manager_id', employer_id)
+    if not employer_id or not manager_id:
         return jsonify({'success': False, 'message': 'Missing employer_id'}), 400
+    try:
+        limit = int(data.get('limit', 10))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'limit must be a number'}), 400
     
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
+    try:
+        with db_cursor(commit=True) as cur:
+            shifts = claim_shifts(cur, int(employer_id), int(manager_id), limit)
+        return jsonify({
+            'success': True,
+            'data': [_queue_item(shift) for shift in shifts],
+            'claim_ttl_seconds': PENDING_CLAIM_TTL
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/employer/pending-employee-shifts/release', methods=['POST'])
+def release_pending_employee_shifts():
+    """Give back a manager's claims: {manager_id, shift_ids}."""
+    data = request.json or {}
+    manager_id = data.get('manager_id')
+    shift_ids = data.get('shift_ids')
+    if not manager_id or not isinstance(shift_ids, list):
+        return jsonify({'success': False, 'message': 'manager_id and a shift_ids list are required'}), 400
     
-    cur = None
     try:
-        cur = conn.cursor()
-        # Get all pending employee-submitted shifts
-        cur.execute(
-            "SELECT s.shift_id, s.shift_name, s.shift_date, s.start_time, s.end_time, "
-            "s.hours_worked, s.status, u.username, u.user_id "
-            "FROM shifts s "
-            "JOIN users u ON s.employee_id = u.user_id "
-            "WHERE s.shift_type = 'employee_submitted' AND s.status = 'pending' "
-            "ORDER BY s.shift_date DESC"
-        )
-        shifts = cur.fetchall()
-        
-        result = []
-        for shift in shifts:
-            result.append({
-                'id': shift[0],
-                'shiftName': shift[1],
-                'date': str(shift[2]),
-                'startTime': shift[3].strftime('%H:%M') if hasattr(shift[3], 'strftime') else str(shift[3]),
-                'endTime': shift[4].strftime('%H:%M') if hasattr(shift[4], 'strftime') else str(shift[4]),
-                'hoursWorked': float(shift[5]) if shift[5] else 0,
-                'status': shift[6],
-                'employeeName': shift[7],
-                'employeeId': shift[8],
-                'shiftType': 'employee_submitted'
-            })
-        
-        return jsonify({'success': True, 'data': result}), 200
+        with db_cursor(commit=True) as cur:
+            released = release_shifts(cur, int(manager_id), shift_ids)
+        return jsonify({'success': True, 'released': released}), 200
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'shift_ids must be numbers'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/employee/notifications/unread-count', methods=['GET'])
+def get_unread_count():
+    """Unread notifications for the badge, from the maintained per-user counter."""
+    try:
+        employee_id = int(request.args['employee_id'])
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'message': 'employee_id must be a number'}), 400
+    
+    try:
+        with db_cursor() as cur:
+            unread = get_storage().unread_count(cur, employee_id)
+        return jsonify({'success': True, 'unread': unread}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/employee/notifications/read', methods=['PUT'])
+def mark_notifications_read():
+    """Mark many notifications read: {"employee_id", "ids": [...]} or {"employee_id", "before_id"}."""
+    data = request.json or {}
+    ids = data.get('ids')
+    before_id = data.get('before_id')
+    if (ids is None) == (before_id is None) or (ids is not None and not isinstance(ids, list)):
+        return jsonify({'success': False, 'message': 'Send either ids (a list) or before_id'}), 400
+    if ids is not None and len(ids) > MAX_MARK_READ:
+        return jsonify({'success': False, 'message': f'At most {MAX_MARK_READ} ids per request'}), 400
+    try:
+        employee_id = int(data.get('employee_id'))
+        ids = [int(i) for i in ids] if ids is not None else None
+        before_id = int(before_id) if before_id is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'employee_id, ids and before_id must be integers'}), 400
+    
+    try:
+        storage = get_storage()
+        with db_cursor(commit=True) as cur:
+            updated = storage.mark_notifications_read(cur, employee_id, ids=ids, before_id=before_id)
+            unread = storage.unread_count(cur, employee_id)
+        return jsonify({'success': True, 'updated': updated, 'unread': unread}), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.route('/api/employee/notifications/<int:notification_id>/read', methods=['PUT'])
 def mark_notification_read(notification_id):
     """Mark a notification as read."""
-    conn = get_conn()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database unavailable'}), 500
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "UPDATE notifications SET is_read = TRUE WHERE notification_id = %s",
-            (notification_id,)
-        )
-        conn.commit()
+        with db_cursor(commit=True) as cur:
+            get_storage().mark_notification_read(cur, notification_id)
         
         return jsonify({'success': True, 'message': 'Notification marked as read'}), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    debug = os.getenv("FLASK_DEBUG", "0") == "1"
+    # the debug reloader runs this block in a watching parent and again in the serving child;
+    # only the child (or a non-debug run) sets up the database and starts the dispatcher
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        if os.getenv("MIGRATE_ON_STARTUP", "1") != "0":
+            init_db()
+        start_dispatcher()
+    # the debugger runs arbitrary code, so a debug server listens on localhost unless API_HOST says otherwise
+    host = os.getenv("API_HOST", "127.0.0.1" if debug else "0.0.0.0")
+    app.run(host=host, port=int(os.getenv("API_PORT", "5001")), debug=debug)
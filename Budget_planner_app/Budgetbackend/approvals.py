@@ -0,0 +1,101 @@
+"""Batch shift decisions: approve, overtime-approve or reject many shifts at once.
+
+`decide_shifts()` loads every requested shift in one query, prices the batch with
+payroll.shift_earnings_array() and writes status updates, daily_keep rows,
+notification outbox events and rollups with executemany inside the caller's
+transaction. Wake the outbox dispatcher after committing.
+"""
+from datetime import datetime
+from outbox import enqueue_events, shift_approved, shift_rejected
+from payroll import shift_earnings_array
+from pending_queue import is_claimed_by_other
+from rollups import record_earnings_many
+
+ACTIONS = ("approve", "overtime", "reject")
+MAX_BULK_SHIFTS = 500
+
+
+def _load_shifts(cur, shift_ids):
+    cur.execute(
+        "SELECT s.shift_id, s.employee_id, s.shift_date, s.hours_worked, s.status, u.hourly_rate, "
+        "s.claimed_by, s.claimed_at "
+        "FROM shifts s JOIN users u ON s.employee_id = u.user_id "
+        f"WHERE s.shift_id IN ({', '.join(['%s'] * len(shift_ids))}) FOR UPDATE",
+        tuple(shift_ids)
+    )
+    return {row[0]: row[1:] for row in cur.fetchall()}
+
+
+def decide_shifts(cur, shift_ids, action, manager_id=None):
+    """Apply `action` to every pending shift in `shift_ids`; returns one result dict per id, in order.
+
+    Shifts that do not exist, are no longer pending or are claimed in the pending queue
+    by anyone but `manager_id` (by anyone at all when it is None) are reported and left
+    untouched. The caller commits.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown action: {action}")
+    shift_ids = list(dict.fromkeys(int(i) for i in shift_ids))
+    if not shift_ids:
+        return []
+    shifts = _load_shifts(cur, shift_ids)
+    now = datetime.now()
+    held = {
+        shift_id for shift_id, shift in shifts.items()
+        if is_claimed_by_other(shift[5], shift[6], manager_id, now)
+    }
+
+    pending = [shift_id for shift_id in shift_ids
+               if shifts.get(shift_id) and shifts[shift_id][3] == 'pending' and shift_id not in held]
+    pay = {}
+    if action != "reject" and pending:
+        amounts = shift_earnings_array([float(shifts[i][2]) for i in pending],
+                                       [float(shifts[i][4] or 0) for i in pending],
+                                       [action == "overtime"] * len(pending))
+        pay = dict(zip(pending, amounts.tolist()))
+
+    results, updates, ledger, events, earnings = [], [], [], [], []
+    for shift_id in shift_ids:
+        shift = shifts.get(shift_id)
+        if not shift:
+            results.append({'shift_id': shift_id, 'success': False, 'message': 'Shift not found'})
+            continue
+        employee_id, shift_date, hours_worked, status, hourly_rate, claimed_by, _ = shift
+        if status != 'pending':
+            results.append({'shift_id': shift_id, 'success': False, 'status': status,
+                            'message': f'Shift already {status}'})
+            continue
+        if shift_id in held:
+            results.append({'shift_id': shift_id, 'success': False, 'status': status, 'claimed_by': claimed_by,
+                            'message': 'Shift claimed by another manager'})
+            continue
+        if action == "reject":
+            updates.append((shift_id,))
+            events.append(shift_rejected(employee_id, shift_id, shift_date))
+            results.append({'shift_id': shift_id, 'success': True, 'status': 'rejected',
+                            'employee_id': employee_id})
+            continue
+        amount = pay[shift_id]
+        updates.append((amount, 1 if action == "overtime" else 0, shift_id))
+        ledger.append((shift_date, hours_worked, amount, employee_id))
+        events.append(shift_approved(employee_id, shift_id, shift_date, amount))
+        earnings.append((employee_id, shift_date, amount, amount, hours_worked))
+        results.append({'shift_id': shift_id, 'success': True, 'status': 'approved',
+                        'employee_id': employee_id, 'earnings': amount})
+
+    if action == "reject" and updates:
+        cur.executemany("UPDATE shifts SET status = 'rejected' WHERE shift_id = %s", updates)
+    elif updates:
+        cur.executemany(
+            "UPDATE shifts SET status = 'approved', approved_at = NOW(), weekly_earning = %s, is_overtime = %s "
+            "WHERE shift_id = %s",
+            updates
+        )
+        cur.executemany(
+            "INSERT INTO daily_keep (daily_keep_date, daily_hours_worked, daily_keep_amount, user_id) "
+            "VALUES (%s, %s, %s, %s)",
+            ledger
+        )
+        record_earnings_many(cur, earnings)
+    enqueue_events(cur, events)
+    return results
@@ -0,0 +1,249 @@
+"""Prompt context for the budget assistant, bounded by a token budget.
+
+`build_context()` assembles the messages sent to the model for one user:
+
+- a system prompt with the user's financial snapshot (hourly rate, bills, this
+  month's gross/tax/net), cached per user for ASSISTANT_SNAPSHOT_TTL seconds and
+  dropped by `invalidate_snapshot()` wherever the user's bills, hourly rate,
+  shifts or earnings change (next to roster.invalidate_employee());
+- a rolling summary of the user's older turns (`chat_summaries`), extended only
+  with turns that have left the recent window since it was last updated;
+- as many of the user's latest turns, verbatim, as fit in ASSISTANT_CONTEXT_TOKENS.
+
+Token counts are estimated at ~4 characters per token; the budget is a ceiling
+on prompt growth, not an exact model tokenizer count.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from chat_store import chat_page, turns_between
+from periods import Period
+from rollups import get_rollup, year_to_date
+from storage import get_storage
+from tax_engine import paye_batch, tax_period_of_month
+
+ASSISTANT_CONTEXT_TOKENS = int(os.getenv("ASSISTANT_CONTEXT_TOKENS", "1500"))
+ASSISTANT_SUMMARY_TOKENS = int(os.getenv("ASSISTANT_SUMMARY_TOKENS", "300"))
+ASSISTANT_SNAPSHOT_TTL = int(os.getenv("ASSISTANT_SNAPSHOT_TTL", "300"))
+TURN_PAGE = 20
+
+INSTRUCTIONS = (
+    "You are a helpful budget assistant. Use the user's monthly net salary, hourly pay and bills below "
+    "to provide concise, actionable budgeting advice. Avoid generic advice; focus on the user's specific "
+    "financial data and give investment tips where they can afford it. If you cannot access real-time data, "
+    "inform the user accordingly. Try to keep responses under 150 words and remove unnecessary information."
+)
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4 if text else 0
+
+
+# --- Financial snapshot ---
+def fetch_snapshot(cur, user_id):
+    """{'hourly_rate', 'bills': [(name, amount)], 'bill_total', 'gross', 'tax', 'net'} for this month."""
+    storage = get_storage()
+    user = storage.get_user(cur, user_id)
+    bills = [(bill['name'], bill['amount']) for bill in storage.list_bills(cur, user_id)]
+    month = Period.month()
+    rollup = get_rollup(cur, user_id, month.start.year, month.start.month)
+    ytd_before = year_to_date(cur, month.start.year, month.start.month, user_id=user_id).get(user_id, 0.0)
+    gross = rollup["gross"] if rollup else 0.0
+    tax_year, tax_period = tax_period_of_month(month.start.year, month.start.month)
+    tax = float(paye_batch(ytd_before, gross, tax_period, tax_year))
+    return {
+        'hourly_rate': float(user[2] or 0) if user else 0.0,
+        'bills': bills,
+        'bill_total': round(sum(amount for _, amount in bills), 2),
+        'gross': round(gross, 2),
+        'tax': round(tax, 2),
+        'net': round(gross - tax, 2),
+    }
+
+
+class SnapshotCache:
+    """Financial snapshots keyed by user, each kept for `ttl` seconds."""
+
+    def __init__(self, ttl=ASSISTANT_SNAPSHOT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # user_id -> (expires_at, snapshot)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, snapshot):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, snapshot)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+_snapshots = SnapshotCache()
+
+
+def get_snapshot(cur, user_id):
+    """Cached snapshot for `user_id`; returns (snapshot, was_cached)."""
+    user_id = int(user_id)
+    snapshot = _snapshots.get(user_id)
+    if snapshot is not None:
+        return snapshot, True
+    snapshot = fetch_snapshot(cur, user_id)
+    _snapshots.put(user_id, snapshot)
+    return snapshot, False
+
+
+def invalidate_snapshot(user_id):
+    """Drop the user's cached snapshot (call after committing a bill, pay, shift or earnings change)."""
+    if user_id is not None:
+        _snapshots.invalidate(int(user_id))
+
+
+def snapshot_text(snapshot):
+    bills = ", ".join(f"{name} £{amount:.2f}" for name, amount in snapshot['bills']) or "none"
+    return (
+        f"Monthly net salary so far this month: £{snapshot['net']:.2f} "
+        f"(gross £{snapshot['gross']:.2f}, tax £{snapshot['tax']:.2f}). "
+        f"Hourly pay: £{snapshot['hourly_rate']:.2f}. "
+        f"Bills (£{snapshot['bill_total']:.2f} a month): {bills}."
+    )
+
+
+# --- Rolling summary of older turns ---
+def _summary_line(turn):
+    question = " ".join(turn['user_message'].split())[:80]
+    answer = " ".join(turn['assistant_response'].split())
+    advice = answer.split(". ")[0][:120]
+    return f"- {turn['timestamp'][:10]}: asked \"{question}\"; advised: {advice}"
+
+
+def _trim_lines(lines, budget):
+    """The newest lines whose estimated tokens fit in `budget`."""
+    kept, used = [], 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return kept[::-1]
+
+
+def rolling_summary(cur, user_id, before_id):
+    """The summary of the user's turns before message `before_id`, folding in any not summarized yet.
+
+    Writes chat_summaries in the caller's transaction when it changes.
+    """
+    cur.execute("SELECT through_id, summary FROM chat_summaries WHERE user_id = %s", (user_id,))
+    row = cur.fetchone()
+    through_id, summary = (row[0], row[1]) if row else (0, "")
+    lines = summary.split("\n") if summary else []
+    folded = through_id
+    while True:
+        turns = turns_between(cur, user_id, folded, before_id, TURN_PAGE * 10)
+        if not turns:
+            break
+        lines = _trim_lines(lines + [_summary_line(turn) for turn in turns], ASSISTANT_SUMMARY_TOKENS)
+        folded = turns[-1]['id']
+    if folded != through_id:
+        summary = "\n".join(lines)
+        cur.execute(
+            get_storage().upsert_sql("chat_summaries", ("user_id",), ("through_id", "summary", "updated_at")),
+            (user_id, folded, summary, datetime.now().replace(microsecond=0))
+        )
+    return summary
+
+
+# --- Builder ---
+def build_context(cur, user_id, message, token_budget=None):
+    """(messages, snapshot, stats) for the model: system prompt, summary, the recent turns that fit, then `message`.
+
+    `stats` reports prompt_tokens, turns, summary_tokens, snapshot_cached and build_ms.
+    Run it in a committing transaction; it may update the user's rolling summary.
+    """
+    started = time.perf_counter()
+    budget = int(token_budget or ASSISTANT_CONTEXT_TOKENS)
+    snapshot, cached = get_snapshot(cur, user_id)
+    system = f"{INSTRUCTIONS}\n\n{snapshot_text(snapshot)}"
+    fixed = estimate_tokens(system) + estimate_tokens(message) + ASSISTANT_SUMMARY_TOKENS
+
+    # newest turns first, until the next one would overrun the budget
+    recent, used, before, full = [], fixed, None, False
+    while not full:
+        turns, before = chat_page(cur, user_id, TURN_PAGE, before)
+        for turn in reversed(turns):
+            cost = estimate_tokens(turn['user_message']) + estimate_tokens(turn['assistant_response'])
+            if used + cost > budget:
+                full = True
+                break
+            recent.append(turn)
+            used += cost
+        if before is None:
+            break
+    recent.reverse()
+
+    summary = ""
+    if full:
+        summary = rolling_summary(cur, user_id, recent[0]['id'] if recent else 2 ** 31 - 1)
+    if summary:
+        system += f"\n\nEarlier conversations with this user (summary):\n{summary}"
+
+    messages = [{"role": "system", "content": system}]
+    for turn in recent:
+        messages.append({"role": "user", "content": turn['user_message']})
+        messages.append({"role": "assistant", "content": turn['assistant_response']})
+    messages.append({"role": "user", "content": message})
+    stats = {
+        'prompt_tokens': sum(estimate_tokens(m['content']) for m in messages),
+        'turns': len(recent),
+        'summary_tokens': estimate_tokens(summary),
+        'snapshot_cached': cached,
+        'build_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+    _record(stats)
+    return messages, snapshot, stats
+
+
+# --- Per-request reporting ---
+_totals = {'requests': 0, 'prompt_tokens': 0, 'max_prompt_tokens': 0, 'build_ms': 0.0, 'max_build_ms': 0.0}
+_totals_lock = threading.Lock()
+
+
+def _record(stats):
+    with _totals_lock:
+        _totals['requests'] += 1
+        _totals['prompt_tokens'] += stats['prompt_tokens']
+        _totals['max_prompt_tokens'] = max(_totals['max_prompt_tokens'], stats['prompt_tokens'])
+        _totals['build_ms'] += stats['build_ms']
+        _totals['max_build_ms'] = max(_totals['max_build_ms'], stats['build_ms'])
+
+
+def context_stats():
+    """Prompt size and build time across requests since start-up, plus snapshot cache counters."""
+    with _totals_lock:
+        n = _totals['requests']
+        stats = {
+            'requests': n,
+            'avg_prompt_tokens': round(_totals['prompt_tokens'] / n, 1) if n else 0,
+            'max_prompt_tokens': _totals['max_prompt_tokens'],
+            'avg_build_ms': round(_totals['build_ms'] / n, 2) if n else 0,
+            'max_build_ms': _totals['max_build_ms'],
+            'token_budget': ASSISTANT_CONTEXT_TOKENS,
+        }
+    stats['snapshot_cache'] = _snapshots.stats()
+    return stats
@@ -0,0 +1,100 @@
+"""Benchmark: N single shift approvals vs one bulk approval request.
+
+Drives the Flask app in-process (test client) against a throwaway SQLite file, so each
+single approval pays its own request, connection checkout and commit, as in production.
+Seeds two identical sets of pending shifts, approves the first with
+`PUT /api/employer/shifts/<id>/approve` one at a time and the second with one
+`POST /api/employer/shifts/bulk`, then checks both produced the same earnings.
+Exits 1 when the bulk request is less than `--min-speedup` times faster.
+
+    python benchmarks/bench_bulk_approval.py                 # 200 shifts
+    python benchmarks/bench_bulk_approval.py --shifts 500
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("DB_BACKEND", "sqlite")
+if os.environ["DB_BACKEND"] == "sqlite":
+    os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_bulk_"), "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import api_server  # noqa: E402
+from budgetset import db_cursor  # noqa: E402
+
+PREFIX = "bench_bulk_"
+
+
+def _seed(employees, shifts, tag):
+    rnd = random.Random(42)
+    with db_cursor(commit=True) as cur:
+        user_ids = []
+        for i in range(employees):
+            cur.execute("INSERT INTO users (username, password, hourly_rate, role) VALUES (%s, %s, %s, %s)",
+                        (f"{PREFIX}{tag}_{i}", "x", round(rnd.uniform(10.5, 20), 2), "employee"))
+            user_ids.append(cur.lastrowid)
+        first = date.today().replace(day=1)
+        shift_ids = []
+        for i in range(shifts):
+            hours = rnd.choice((4.0, 6.5, 8.0, 10.0))
+            cur.execute(
+                "INSERT INTO shifts (shift_name, shift_date, start_time, end_time, employee_id, created_by, "
+                "hours_worked) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                ("Shift", first + timedelta(days=i % 28), "09:00", "17:00", user_ids[i % employees],
+                 user_ids[0], hours)
+            )
+            shift_ids.append(cur.lastrowid)
+    return shift_ids
+
+
+def _totals(tag):
+    """(shift earnings, rollup net, weekly ledger) summed over the `tag` employees."""
+    with db_cursor() as cur:
+        totals = []
+        for sql in ("SELECT SUM(s.weekly_earning) FROM shifts s JOIN users u ON s.employee_id = u.user_id",
+                    "SELECT SUM(r.net_earnings) FROM monthly_rollups r JOIN users u ON r.user_id = u.user_id",
+                    "SELECT SUM(w.earnings_amount) FROM weekly_earnings w JOIN users u ON w.user_id = u.user_id"):
+            cur.execute(sql + " WHERE u.username LIKE %s", (f"{PREFIX}{tag}_%",))
+            totals.append(round(float(cur.fetchone()[0] or 0), 2))
+        return tuple(totals)
+
+
+def run(employees, shifts, min_speedup):
+    client = api_server.app.test_client()
+    single_ids = _seed(employees, shifts, "single")
+    bulk_ids = _seed(employees, shifts, "bulk")
+
+    started = time.perf_counter()
+    for shift_id in single_ids:
+        response = client.put(f"/api/employer/shifts/{shift_id}/approve")
+        assert response.status_code == 200, response.get_json()
+    single_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response = client.post("/api/employer/shifts/bulk", json={"action": "approve", "shift_ids": bulk_ids})
+    bulk_s = time.perf_counter() - started
+    body = response.get_json()
+    assert response.status_code == 200 and body["updated"] == shifts, body
+
+    single_totals, bulk_totals = _totals("single"), _totals("bulk")
+    assert single_totals == bulk_totals, (single_totals, bulk_totals)
+
+    speedup = single_s / bulk_s
+    print(f"Approving {shifts} shifts for {employees} employees ({os.environ['DB_BACKEND']}):")
+    print(f"  one PUT .../approve each : {single_s * 1000:9.1f} ms")
+    print(f"  one POST .../bulk        : {bulk_s * 1000:9.1f} ms")
+    print(f"  speed-up                 : {speedup:9.1f}x (required {min_speedup:.0f}x)")
+    print(f"  total earnings           : {single_totals[0]:.2f} both ways (shifts, rollups, weekly ledger agree)")
+    return 0 if speedup >= min_speedup else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=20)
+    parser.add_argument("--shifts", type=int, default=200)
+    parser.add_argument("--min-speedup", type=float, default=10.0)
+    args = parser.parse_args()
+    sys.exit(run(args.employees, args.shifts, args.min_speedup))
@@ -0,0 +1,148 @@
+"""Benchmark: employer roster as correlated subqueries vs one grouped join vs the roster cache.
+
+Seeds employers with `--employees` employees each and a month of shifts plus history,
+then times GET /api/employer/employees' query three ways for one employer. Exits 1
+when the uncached grouped join misses `--budget-ms`.
+
+    python benchmarks/bench_employee_roster.py                      # SQLite, 5,000 employees
+    python benchmarks/bench_employee_roster.py --employees 20000 --budget-ms 500
+    python benchmarks/bench_employee_roster.py --backend mysql      # uses the configured MySQL database
+
+The MySQL run inserts into the real users/shifts tables under a `bench_roster_` username
+prefix and deletes those rows afterwards.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from periods import Period  # noqa: E402
+from roster import fetch_roster, get_roster, _cache  # noqa: E402
+from storage import configure_storage  # noqa: E402
+
+PREFIX = "bench_roster_"
+
+# The query get_employees ran before the roster module
+CORRELATED_SQL = (
+    "SELECT u.user_id, u.username, u.hourly_rate, "
+    "(SELECT COUNT(*) FROM shifts WHERE employee_id = u.user_id AND {month}) AS total_shifts, "
+    "(SELECT IFNULL(SUM(hours_worked), 0) FROM shifts WHERE employee_id = u.user_id AND {month}) AS total_hours, "
+    "(SELECT COALESCE(SUM(weekly_earning), 0) FROM shifts WHERE employee_id = u.user_id AND {month}) AS monthly_salary "
+    "FROM users u WHERE u.role = 'employee' AND u.created_by = %s ORDER BY u.username"
+)
+
+
+def _seed(conn, employers, employees, shifts_per_month, months):
+    cur = conn.cursor()
+    rnd = random.Random(42)
+    employer_ids = []
+    for e in range(employers):
+        cur.execute("INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
+                    (f"{PREFIX}employer_{e}", "x", "employer"))
+        employer_ids.append(cur.lastrowid)
+    cur.executemany(
+        "INSERT INTO users (username, password, hourly_rate, role, created_by) VALUES (%s, %s, %s, %s, %s)",
+        [(f"{PREFIX}emp_{e}_{i}", "x", round(rnd.uniform(10.5, 20), 2), "employee", employer_id)
+         for e, employer_id in enumerate(employer_ids) for i in range(employees)]
+    )
+    cur.execute("SELECT user_id, created_by FROM users WHERE username LIKE %s AND role = 'employee'",
+                (PREFIX + "emp_%",))
+    staff = cur.fetchall()
+    month = Period.month()
+    history_start = month.start - timedelta(days=30 * months)
+    span = (month.end - history_start).days
+    sql = ("INSERT INTO shifts (shift_name, shift_date, start_time, end_time, employee_id, created_by, "
+           "status, hours_worked, weekly_earning) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)")
+    batch = []
+    for user_id, employer_id in staff:
+        for _ in range(shifts_per_month * (months + 1)):
+            day = history_start + timedelta(days=rnd.randrange(span))
+            approved = rnd.random() < 0.8
+            batch.append(("Shift", day, "09:00", "17:00", user_id, employer_id,
+                          "approved" if approved else "pending", 8.0, 90.0 if approved else 0.0))
+            if len(batch) == 20000:
+                cur.executemany(sql, batch)
+                batch = []
+    if batch:
+        cur.executemany(sql, batch)
+    conn.commit()
+    cur.close()
+    return employer_ids
+
+
+def _cleanup(conn):
+    cur = conn.cursor()
+    cur.execute("DELETE FROM shifts WHERE employee_id IN (SELECT user_id FROM users WHERE username LIKE %s)",
+                (PREFIX + "%",))
+    cur.execute("DELETE FROM users WHERE username LIKE %s", (PREFIX + "%",))
+    conn.commit()
+    cur.close()
+
+
+def _time(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(backend, employers, employees, shifts_per_month, months, repeat, budget_ms):
+    storage = configure_storage(backend, ":memory:" if backend == "sqlite" else None)
+    conn = storage.connect()
+    print(f"Seeding {employers} employers x {employees:,} employees, "
+          f"{shifts_per_month} shifts/month over {months + 1} months ({backend})...")
+    started = time.perf_counter()
+    employer_ids = _seed(conn, employers, employees, shifts_per_month, months)
+    print(f"  seeded in {time.perf_counter() - started:.1f}s")
+    employer_id = employer_ids[0]
+    period = Period.month()
+    month_sql, month_params = period.clause("shift_date")
+    cur = conn.cursor()
+
+    def correlated():
+        cur.execute(CORRELATED_SQL.format(month=month_sql), month_params * 3 + (employer_id,))
+        return cur.fetchall()
+
+    def grouped():
+        return fetch_roster(cur, employer_id, period)
+
+    try:
+        old = correlated()
+        new = grouped()
+        assert [(r[0], r[3], float(r[4]), float(r[5])) for r in old] == \
+               [(r['id'], r['totalShifts'], r['hoursWorked'], r['monthlySalary']) for r in new], "results differ"
+
+        correlated_ms = _time(correlated, max(1, repeat // 5))
+        grouped_ms = _time(grouped, repeat)
+        _cache.clear()
+        get_roster(cur, employer_id, period)
+        cached_ms = _time(lambda: get_roster(cur, employer_id, period), repeat * 100)
+    finally:
+        cur.close()
+        if backend == "mysql":
+            _cleanup(conn)
+        conn.close()
+
+    print(f"\nRoster for one employer ({len(new):,} employees), mean per request:")
+    print(f"  correlated subqueries : {correlated_ms:9.3f} ms")
+    print(f"  grouped LEFT JOIN     : {grouped_ms:9.3f} ms")
+    print(f"  cached                : {cached_ms:9.3f} ms")
+    print(f"  budget (grouped)      : {budget_ms:9.3f} ms -> {'OK' if grouped_ms <= budget_ms else 'OVER'}")
+    return 0 if grouped_ms <= budget_ms else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--employers", type=int, default=3)
+    parser.add_argument("--employees", type=int, default=5_000)
+    parser.add_argument("--shifts-per-month", type=int, default=12)
+    parser.add_argument("--months", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=250.0)
+    args = parser.parse_args()
+    sys.exit(run(args.backend, args.employers, args.employees, args.shifts_per_month, args.months,
+                 args.repeat, args.budget_ms))
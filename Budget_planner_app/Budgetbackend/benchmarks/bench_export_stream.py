@@ -0,0 +1,140 @@
+"""Benchmark: memory of a streamed export (export.stream_export) vs building the whole list.
+
+Seeds one employer's employees with `--rows` daily_keep rows in a temporary SQLite file
+(or the configured MySQL database), streams the employer's earnings export to /dev/null
+and samples the process RSS as it goes, then loads `--compare-rows` rows the old way
+(fetchall into a list of dicts) for contrast. Exits 1 when RSS grows by more than
+`--max-growth-mb` during the streamed export.
+
+    python benchmarks/bench_export_stream.py                        # 10,000,000 rows, NDJSON
+    python benchmarks/bench_export_stream.py --rows 1000000 --format csv
+    python benchmarks/bench_export_stream.py --backend mysql        # uses the configured MySQL database
+
+The MySQL run inserts under a `bench_export_` username prefix and deletes those rows afterwards.
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from export import export_query, stream_export  # noqa: E402
+from storage import configure_storage  # noqa: E402
+
+PREFIX = "bench_export_"
+EMPLOYEES = 50
+
+
+def rss_mb():
+    """Current resident set size; falls back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def _seed(conn, rows):
+    cur = conn.cursor()
+    cur.execute("INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
+                (f"{PREFIX}employer", "x", "employer"))
+    employer_id = cur.lastrowid
+    cur.executemany(
+        "INSERT INTO users (username, password, hourly_rate, role, created_by) VALUES (%s, %s, %s, %s, %s)",
+        [(f"{PREFIX}emp_{i}", "x", 12.0, "employee", employer_id) for i in range(EMPLOYEES)]
+    )
+    cur.execute("SELECT user_id FROM users WHERE created_by = %s", (employer_id,))
+    staff = [row[0] for row in cur.fetchall()]
+    start = date.today() - timedelta(days=rows // EMPLOYEES)
+    batch = []
+    for i in range(rows):
+        batch.append((start + timedelta(days=i // EMPLOYEES), 8.0, 96.0, staff[i % EMPLOYEES]))
+        if len(batch) == 50000:
+            cur.executemany("INSERT INTO daily_keep (daily_keep_date, daily_hours_worked, daily_keep_amount, "
+                            "user_id) VALUES (%s, %s, %s, %s)", batch)
+            batch = []
+            conn.commit()
+    if batch:
+        cur.executemany("INSERT INTO daily_keep (daily_keep_date, daily_hours_worked, daily_keep_amount, "
+                        "user_id) VALUES (%s, %s, %s, %s)", batch)
+    conn.commit()
+    cur.close()
+    return employer_id
+
+
+def _cleanup(conn):
+    cur = conn.cursor()
+    cur.execute("DELETE FROM daily_keep WHERE user_id IN (SELECT user_id FROM users WHERE username LIKE %s)",
+                (PREFIX + "%",))
+    cur.execute("DELETE FROM users WHERE username LIKE %s", (PREFIX + "%",))
+    conn.commit()
+    cur.close()
+
+
+def run(backend, rows, compare_rows, fmt, max_growth_mb):
+    tmpdir = tempfile.TemporaryDirectory() if backend == "sqlite" else None
+    # a file, not :memory:, so the seeded rows do not count towards this process's RSS
+    storage = configure_storage(backend, os.path.join(tmpdir.name, "export.db") if tmpdir else None)
+    conn = storage.connect()
+    try:
+        print(f"Seeding {rows:,} daily_keep rows for {EMPLOYEES} employees ({backend})...")
+        started = time.perf_counter()
+        employer_id = _seed(conn, rows)
+        conn.close()
+        print(f"  seeded in {time.perf_counter() - started:.1f}s")
+
+        samples, exported, size = [], 0, 0
+        every = max(1, rows // 10)
+        started = time.perf_counter()
+        with open(os.devnull, "w") as sink:
+            for chunk in stream_export("earnings", "employer", employer_id, fmt):
+                sink.write(chunk)
+                size += len(chunk)
+                exported += chunk.count("\n")
+                if not samples or exported >= len(samples) * every:
+                    samples.append((exported, rss_mb()))
+        stream_s = time.perf_counter() - started
+        if samples[-1][0] != exported:
+            samples.append((exported, rss_mb()))
+        growth = max(mb for _, mb in samples) - samples[0][1]
+
+        sql, params, columns = export_query("earnings", "employer", employer_id)
+        conn = storage.connect()
+        cur = conn.cursor()
+        before = rss_mb()
+        cur.execute(sql + " LIMIT %s", params + (compare_rows,))
+        materialized = [dict(zip(columns, row)) for row in cur.fetchall()]
+        list_growth = rss_mb() - before
+        cur.close()
+        del materialized
+    finally:
+        if backend == "mysql":
+            conn = storage.connect()
+            _cleanup(conn)
+        conn.close()
+        if tmpdir:
+            tmpdir.cleanup()
+
+    print(f"\nStreamed {exported - (1 if fmt == 'csv' else 0):,} rows ({size / 2 ** 20:,.0f} MB of {fmt}) "
+          f"in {stream_s:.1f}s:")
+    for count, mb in samples:
+        print(f"  after {count:>12,} rows  RSS {mb:8.1f} MB")
+    print(f"  RSS growth while streaming : {growth:8.1f} MB "
+          f"({'OK' if growth <= max_growth_mb else 'OVER'} against {max_growth_mb} MB)")
+    print(f"  fetchall of {compare_rows:,} rows into a list: +{list_growth:.1f} MB")
+    return 0 if growth <= max_growth_mb else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--compare-rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--max-growth-mb", type=float, default=32.0)
+    args = parser.parse_args()
+    sys.exit(run(args.backend, args.rows, args.compare_rows, args.format, args.max_growth_mb))
@@ -0,0 +1,119 @@
+"""Benchmark: daily salary history as one unbounded list vs OFFSET pages vs keyset pages.
+
+Seeds one user with `--rows` daily_keep rows, then times GET /api/user/<id>/daily-salary-history's
+query the old way (everything), as a LIMIT/OFFSET page near the end of the history and as
+keyset pages (pagination.keyset_page) at the start and at the same depth. Exits 1 when the
+deep keyset page costs more than `--max-ratio` times the first one.
+
+    python benchmarks/bench_keyset_pages.py                  # SQLite, 200,000 rows
+    python benchmarks/bench_keyset_pages.py --rows 1000000 --limit 100
+    python benchmarks/bench_keyset_pages.py --backend mysql  # uses the configured MySQL database
+
+The MySQL run inserts under a `bench_pages_` username and deletes those rows afterwards.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pagination import keyset_page  # noqa: E402
+from storage import configure_storage  # noqa: E402
+
+USERNAME = "bench_pages_user"
+SELECT_SQL = "SELECT daily_keep_date, daily_keep_amount, daily_keep_id FROM daily_keep WHERE user_id=%s"
+
+
+def _seed(conn, rows):
+    cur = conn.cursor()
+    cur.execute("INSERT INTO users (username, password, hourly_rate) VALUES (%s, %s, %s)", (USERNAME, "x", 12))
+    user_id = cur.lastrowid
+    start = date.today() - timedelta(days=rows // 3)
+    batch = []
+    for i in range(rows):
+        # a few rows per day, so pages break inside a date as well as between dates
+        batch.append((start + timedelta(days=i // 3), 8.0, 96.0, user_id))
+        if len(batch) == 20000:
+            cur.executemany("INSERT INTO daily_keep (daily_keep_date, daily_hours_worked, daily_keep_amount, user_id) "
+                            "VALUES (%s, %s, %s, %s)", batch)
+            batch = []
+    if batch:
+        cur.executemany("INSERT INTO daily_keep (daily_keep_date, daily_hours_worked, daily_keep_amount, user_id) "
+                        "VALUES (%s, %s, %s, %s)", batch)
+    conn.commit()
+    cur.close()
+    return user_id
+
+
+def _cleanup(conn, user_id):
+    cur = conn.cursor()
+    cur.execute("DELETE FROM daily_keep WHERE user_id = %s", (user_id,))
+    cur.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+    conn.commit()
+    cur.close()
+
+
+def _time(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(backend, rows, limit, repeat, max_ratio):
+    storage = configure_storage(backend, ":memory:" if backend == "sqlite" else None)
+    conn = storage.connect()
+    print(f"Seeding {rows:,} daily_keep rows for one user ({backend})...")
+    user_id = _seed(conn, rows)
+    cur = conn.cursor()
+    depth = rows - 2 * limit
+
+    def unbounded():
+        cur.execute(SELECT_SQL + " ORDER BY daily_keep_date DESC, daily_keep_id DESC", (user_id,))
+        return cur.fetchall()
+
+    def offset_page():
+        cur.execute(SELECT_SQL + " ORDER BY daily_keep_date DESC, daily_keep_id DESC LIMIT %s OFFSET %s",
+                    (user_id, limit, depth))
+        return cur.fetchall()
+
+    try:
+        everything = unbounded()
+        anchor = everything[depth - 1]
+        deep_cursor = (anchor[0], anchor[2])
+        page, _ = keyset_page(cur, SELECT_SQL, (user_id,), "daily_keep_date", "daily_keep_id", limit,
+                              deep_cursor, key=(0, 2))
+        assert [r[2] for r in page] == [r[2] for r in everything[depth:depth + limit]], "pages differ"
+
+        unbounded_ms = _time(unbounded, max(1, repeat // 10))
+        offset_ms = _time(offset_page, repeat)
+        first_ms = _time(lambda: keyset_page(cur, SELECT_SQL, (user_id,), "daily_keep_date", "daily_keep_id",
+                                             limit, None, key=(0, 2)), repeat)
+        deep_ms = _time(lambda: keyset_page(cur, SELECT_SQL, (user_id,), "daily_keep_date", "daily_keep_id",
+                                            limit, deep_cursor, key=(0, 2)), repeat)
+    finally:
+        cur.close()
+        if backend == "mysql":
+            _cleanup(conn, user_id)
+        conn.close()
+
+    ratio = deep_ms / first_ms if first_ms else 0.0
+    print(f"\nHistory of {rows:,} rows, pages of {limit}, mean per request:")
+    print(f"  unbounded list          : {unbounded_ms:9.3f} ms")
+    print(f"  OFFSET page at row {depth:<6,}: {offset_ms:9.3f} ms")
+    print(f"  keyset first page       : {first_ms:9.3f} ms")
+    print(f"  keyset page at row {depth:<6,}: {deep_ms:9.3f} ms  ({ratio:.2f}x first page, "
+          f"{'OK' if ratio <= max_ratio else 'OVER'} against {max_ratio}x)")
+    return 0 if ratio <= max_ratio else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--max-ratio", type=float, default=3.0)
+    args = parser.parse_args()
+    sys.exit(run(args.backend, args.rows, args.limit, args.repeat, args.max_ratio))
@@ -0,0 +1,121 @@
+"""Benchmark: llm_client.LLMClient against the local stub model (benchmarks/llm_stub_server.py).
+
+Simulates `--workers` Flask threads each asking the assistant questions, with the
+client limited to `--concurrency` upstream calls, and reports throughput and
+latency percentiles for five phases, each on a fresh stub:
+
+- distinct questions (every call goes upstream);
+- `--repeat-rate` of questions repeated for the same snapshot (cache hits);
+- a stub slower than the deadline (callers get LLMTimeout at `--timeout`);
+- `--error-rate` upstream 503s (absorbed by retries with jitter);
+- streamed answers (`LLMClient.stream()`), reporting time to first token next to
+  the time to the whole answer.
+
+Exits 1 if the client ever had more than `--concurrency` upstream calls open. The
+stub's own peak can be higher in the slow phase: it keeps working on calls the
+client abandoned at their deadline, as a real upstream would.
+
+    python benchmarks/bench_llm_client.py
+    python benchmarks/bench_llm_client.py --requests 2000 --workers 64 --concurrency 16 --latency-ms 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from llm_client import LLMClient, LLMError, LLMTimeout, ResponseCache, cache_key, http_transport  # noqa: E402
+from llm_stub_server import start_stub  # noqa: E402
+
+SNAPSHOTS = [{"hourly_rate": 12.0 + i, "bills": [("Rent", 650.0)], "net": 1500.0 + 10 * i} for i in range(20)]
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def run_phase(name, args, latency_ms, timeout, error_rate=0.0, repeat_rate=0.0, stream=False):
+    server, base_url = start_stub(latency_ms=latency_ms, jitter_ms=args.jitter_ms, error_rate=error_rate,
+                                  token_ms=args.token_ms)
+    client = LLMClient(http_transport(base_url), max_concurrency=args.concurrency, timeout=timeout,
+                       retries=args.retries, cache=ResponseCache(size=10_000, ttl=3600))
+    asked, ttfts = [], []
+
+    def ask(i):
+        if asked and random.random() < repeat_rate:
+            message, snapshot = random.choice(asked)
+        else:
+            message, snapshot = f"How can I save more this month? ({i})", random.choice(SNAPSHOTS)
+            asked.append((message, snapshot))
+        messages = [{"role": "system", "content": str(snapshot)}, {"role": "user", "content": message}]
+        started = time.perf_counter()
+        try:
+            if stream:
+                first = None
+                for _ in client.stream(messages, key=cache_key(message, snapshot)):
+                    if first is None:
+                        first = (time.perf_counter() - started) * 1000
+                ttfts.append(first)
+            else:
+                client.complete(messages, key=cache_key(message, snapshot))
+            outcome = "ok"
+        except LLMTimeout:
+            outcome = "timeout"
+        except LLMError:
+            outcome = "error"
+        return outcome, (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as workers:
+        results = list(workers.map(ask, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    latencies = [ms for _, ms in results]
+    outcomes = {o: sum(1 for r, _ in results if r == o) for o in ("ok", "timeout", "error")}
+    stats = client.stats()
+    print(f"\n{name}  (stub {latency_ms:.0f}±{args.jitter_ms:.0f} ms, deadline {timeout:.1f}s, "
+          f"{error_rate:.0%} errors, {repeat_rate:.0%} repeats)")
+    print(f"  {args.requests:,} requests in {elapsed:.2f}s = {args.requests / elapsed:,.1f} req/s "
+          f"(ok {outcomes['ok']}, timeout {outcomes['timeout']}, error {outcomes['error']})")
+    print(f"  latency ms  p50 {_percentile(latencies, 50):8.1f}  p95 {_percentile(latencies, 95):8.1f}  "
+          f"p99 {_percentile(latencies, 99):8.1f}  max {max(latencies):8.1f}  mean {statistics.mean(latencies):8.1f}")
+    if ttfts:
+        print(f"  first token  p50 {_percentile(ttfts, 50):8.1f}  p95 {_percentile(ttfts, 95):8.1f}  "
+              f"p99 {_percentile(ttfts, 99):8.1f}  max {max(ttfts):8.1f}  mean {statistics.mean(ttfts):8.1f}")
+    print(f"  upstream calls {server.requests:,} (retries {stats['retries']}), cache hits {stats['cached']}, "
+          f"peak open calls {stats['peak_in_flight']} / limit {args.concurrency} "
+          f"(stub peak {server.peak}, counting calls abandoned at the deadline)")
+    return stats['peak_in_flight'] <= args.concurrency
+
+
+def run(args):
+    slow = args.timeout * 1000 * 2
+    ok = run_phase("Distinct questions", args, args.latency_ms, args.timeout)
+    ok &= run_phase("Repeated questions", args, args.latency_ms, args.timeout, repeat_rate=args.repeat_rate)
+    ok &= run_phase("Upstream slower than the deadline", args, slow, args.timeout)
+    ok &= run_phase("Flaky upstream", args, args.latency_ms, args.timeout, error_rate=args.error_rate)
+    ok &= run_phase("Streamed answers", args, args.latency_ms, args.timeout, stream=True)
+    print(f"\nConcurrency limit {'held' if ok else 'EXCEEDED'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=32, help="simulated Flask worker threads")
+    parser.add_argument("--concurrency", type=int, default=8, help="client's upstream concurrency limit")
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--token-ms", type=float, default=10, help="stub's gap between streamed words")
+    parser.add_argument("--timeout", type=float, default=2.0, help="per-call deadline in seconds")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--repeat-rate", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    args = parser.parse_args()
+    sys.exit(run(args))
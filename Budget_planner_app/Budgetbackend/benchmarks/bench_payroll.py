@@ -0,0 +1,103 @@
+"""Benchmark: per-shift Python payroll vs the vectorised payroll engine.
+
+Generates `--shifts` approved shifts (hours, hourly rate, overtime flag) spread over
+`--employees` employees and prices them two ways:
+
+  per-shift  the loop the approve routes used to run for every shift (break deduction,
+             overtime multiplier, round()), summed per employee, then calculate_tax()
+  vectorised payroll.compute_payroll() over NumPy arrays
+
+    python benchmarks/bench_payroll.py                  # 1,000,000 shifts
+    python benchmarks/bench_payroll.py --shifts 5000000 --employees 20000
+
+Both paths must agree on every employee's gross to within a penny per shift
+(the engine rounds halves up; the old path used round()).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from payroll import compute_payroll  # noqa: E402
+
+
+def _per_shift_earnings(hours_worked, hourly_rate, overtime):
+    """The approve / overtime route arithmetic before payroll.py."""
+    rounded_hours = round(float(hours_worked), 2)
+    if rounded_hours >= 8.0:
+        break_time = 0.5
+    elif rounded_hours >= 6.0:
+        break_time = 0.25
+    else:
+        break_time = 0.0
+    multiplier = 1.5 if overtime else 1.0
+    return round((float(hours_worked) - break_time) * float(hourly_rate) * multiplier, 2) if hourly_rate else 0.0
+
+
+def _calculate_tax(gross_salary):
+    """api_server.calculate_tax before payroll.py."""
+    untaxed_limit, low_tax_limit, mid_tax_limit = 12570, 37700, 125140
+    if gross_salary <= untaxed_limit / 12:
+        tax = 0
+    elif gross_salary <= (untaxed_limit + low_tax_limit) / 12:
+        tax = (gross_salary - (untaxed_limit / 12)) * 0.20
+    elif gross_salary <= (untaxed_limit + low_tax_limit + mid_tax_limit) / 12:
+        tax = ((low_tax_limit / 12) * 0.20) + ((gross_salary - ((untaxed_limit + low_tax_limit) / 12)) * 0.40)
+    else:
+        tax = ((low_tax_limit / 12) * 0.20) + ((mid_tax_limit / 12) * 0.40) + \
+              ((gross_salary - ((untaxed_limit + low_tax_limit + mid_tax_limit) / 12)) * 0.45)
+    return round(tax, 2)
+
+
+def per_shift(employee_ids, hours, rates, overtime):
+    gross, total_hours = {}, {}
+    for employee_id, h, rate, ot in zip(employee_ids, hours, rates, overtime):
+        gross[employee_id] = gross.get(employee_id, 0.0) + _per_shift_earnings(h, rate, ot)
+        total_hours[employee_id] = total_hours.get(employee_id, 0.0) + h
+    result = {}
+    for employee_id, g in gross.items():
+        tax = _calculate_tax(g)
+        result[employee_id] = (round(g, 2), tax, round(g - tax, 2), round(total_hours[employee_id], 2))
+    return result
+
+
+def run(shifts, employees, seed):
+    rnd = np.random.default_rng(seed)
+    employee_ids = rnd.integers(1, employees + 1, shifts)
+    hours = rnd.integers(8, 49, shifts) / 4.0  # 2h to 12h in quarter hours
+    rates = np.round(rnd.uniform(10.5, 30.0, shifts), 2)
+    overtime = rnd.random(shifts) < 0.1
+    # the per-shift path sees plain Python values, as it did row by row from the cursor
+    rows = (employee_ids.tolist(), hours.tolist(), rates.tolist(), overtime.tolist())
+
+    started = time.perf_counter()
+    slow = per_shift(*rows)
+    per_shift_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fast = compute_payroll(employee_ids, hours, rates, overtime)
+    vectorised_s = time.perf_counter() - started
+
+    counts = dict(zip(fast["employee_id"].tolist(), fast["shifts"].tolist()))
+    worst = max(abs(slow[e][0] - g) / (counts[e] * 0.01 + 0.01)
+                for e, g in zip(fast["employee_id"].tolist(), fast["gross"].tolist()))
+    assert len(slow) == len(counts) and worst <= 1.0, f"gross differs by {worst:.2f}x the rounding allowance"
+
+    print(f"Pay run over {shifts:,} shifts for {len(counts):,} employees:")
+    print(f"  per-shift Python : {per_shift_s * 1000:10.1f} ms")
+    print(f"  vectorised NumPy : {vectorised_s * 1000:10.1f} ms")
+    print(f"  speed-up         : {per_shift_s / vectorised_s:10.1f}x")
+    print(f"  total gross      : {float(fast['gross'].sum()):,.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shifts", type=int, default=1_000_000)
+    parser.add_argument("--employees", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    sys.exit(run(args.shifts, args.employees, args.seed))
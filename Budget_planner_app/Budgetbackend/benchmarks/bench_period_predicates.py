@@ -0,0 +1,122 @@
+"""Benchmark: MONTH()/YEAR() predicates vs half-open date ranges on daily_keep.
+
+Seeds a daily_keep-shaped table with an index on (user_id, daily_keep_date) and
+times the monthly-gross query both ways for a sample of users.
+
+    python benchmarks/bench_period_predicates.py                    # SQLite, 2M rows
+    python benchmarks/bench_period_predicates.py --rows 5000000
+    python benchmarks/bench_period_predicates.py --backend mysql    # uses budgetset.get_conn()
+
+The MySQL run creates and drops a scratch table `bench_daily_keep`.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from periods import Period  # noqa: E402
+
+TABLE = "bench_daily_keep"
+
+
+def _seed(conn, placeholder, rows, users, days):
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cur.execute(
+        f"CREATE TABLE {TABLE} ("
+        "  daily_keep_id INTEGER PRIMARY KEY,"
+        "  daily_keep_date DATE NOT NULL,"
+        "  daily_hours_worked DECIMAL(5,2) NOT NULL,"
+        "  daily_keep_amount DECIMAL(10,2) NOT NULL,"
+        "  user_id INT)"
+    )
+    start = date.today() - timedelta(days=days)
+    rnd = random.Random(42)
+    sql = (f"INSERT INTO {TABLE} (daily_keep_id, daily_keep_date, daily_hours_worked, daily_keep_amount, user_id) "
+           f"VALUES ({', '.join([placeholder] * 5)})")
+    batch = []
+    for i in range(1, rows + 1):
+        batch.append((i, start + timedelta(days=rnd.randrange(days)), 8.0, round(rnd.uniform(40, 120), 2),
+                      rnd.randrange(1, users + 1)))
+        if len(batch) == 50000:
+            cur.executemany(sql, batch)
+            batch = []
+    if batch:
+        cur.executemany(sql, batch)
+    cur.execute(f"CREATE INDEX idx_bench_user_date ON {TABLE} (user_id, daily_keep_date)")
+    conn.commit()
+    cur.close()
+
+
+def _time(conn, sql, param_sets):
+    cur = conn.cursor()
+    started = time.perf_counter()
+    for params in param_sets:
+        cur.execute(sql, params)
+        cur.fetchall()
+    elapsed = time.perf_counter() - started
+    cur.close()
+    return elapsed / len(param_sets) * 1000
+
+
+def run(backend, rows, users, days, samples):
+    if backend == "mysql":
+        from budgetset import get_conn
+        conn = get_conn()
+        if not conn:
+            print("DB unavailable")
+            return 1
+        placeholder = "%s"
+        by_function = (f"SELECT COALESCE(SUM(daily_keep_amount),0) FROM {TABLE} "
+                       "WHERE MONTH(daily_keep_date) = %s AND YEAR(daily_keep_date) = %s AND user_id = %s")
+    else:
+        conn = sqlite3.connect(":memory:")
+        placeholder = "?"
+        # SQLite's equivalent of MONTH()/YEAR(): a function of the column, so no range seek
+        by_function = (f"SELECT COALESCE(SUM(daily_keep_amount),0) FROM {TABLE} "
+                       "WHERE CAST(strftime('%m', daily_keep_date) AS INTEGER) = ? "
+                       "AND CAST(strftime('%Y', daily_keep_date) AS INTEGER) = ? AND user_id = ?")
+    range_sql, _ = Period.month().clause("daily_keep_date")
+    by_range = (f"SELECT COALESCE(SUM(daily_keep_amount),0) FROM {TABLE} "
+                f"WHERE {range_sql} AND user_id = %s").replace("%s", placeholder)
+
+    print(f"Seeding {rows:,} rows for {users:,} users over {days} days ({backend})...")
+    started = time.perf_counter()
+    _seed(conn, placeholder, rows, users, days)
+    print(f"  seeded in {time.perf_counter() - started:.1f}s")
+
+    rnd = random.Random(7)
+    sample_users = [rnd.randrange(1, users + 1) for _ in range(samples)]
+    month = Period.month()
+    function_params = [(month.start.month, month.start.year, u) for u in sample_users]
+    range_params = [(month.start.isoformat(), month.end.isoformat(), u) if backend == "sqlite"
+                    else (month.start, month.end, u) for u in sample_users]
+
+    function_ms = _time(conn, by_function, function_params)
+    range_ms = _time(conn, by_range, range_params)
+    print(f"\nMonthly gross for {samples} users, mean per query:")
+    print(f"  MONTH()/YEAR() predicate : {function_ms:8.3f} ms")
+    print(f"  [start, end) range       : {range_ms:8.3f} ms")
+    print(f"  speed-up                 : {function_ms / range_ms:8.1f}x")
+
+    if backend == "mysql":
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cur.close()
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--days", type=int, default=5 * 365)
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+    sys.exit(run(args.backend, args.rows, args.users, args.days, args.samples))
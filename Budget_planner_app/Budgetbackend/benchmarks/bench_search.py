@@ -0,0 +1,223 @@
+"""Benchmark: per-user full-text search (search.py) over a large assistant history.
+
+Seeds `--messages` chat turns spread over `--users` users (one of them, the heavy
+user, holds `--heavy-share` of all turns) plus a few bills each, builds the search
+index the way migration 18 backfills it, and then reports latency percentiles of
+GET /api/user/<id>/search's query for:
+
+- a common term, a rare term, two terms and a prefix, for random users;
+- the same searches for the heavy user, the page after a cursor there and a page
+  of the older matches past the rank window (search.SEARCH_RANK_WINDOW);
+- the old way of finding a phrase: the user's whole history through the
+  (user_id, message_id) index, filtered with LIKE;
+- storing a turn with and without its index write (chat_store.save_chat).
+
+bm25 weighs each term by how rare it is across the whole index, so a term found
+in a large share of all documents (every seeded turn mentions a few of the same
+27 topics) costs a scan of its document list on every search: that, not the
+user's history, is what a common-term search pays for. Exits 1 when a typical
+user's common-term search is over `--max-p95-ms` at p95, or the heavy user's over
+`--max-ratio` times that (ranking is bounded by search.SEARCH_RANK_WINDOW).
+
+    python benchmarks/bench_search.py                     # SQLite FTS5, 1,000,000 messages
+    python benchmarks/bench_search.py --messages 200000 --users 2000
+    python benchmarks/bench_search.py --backend mysql     # FULLTEXT, on the configured MySQL database
+
+The MySQL run inserts under `bench_search_` usernames and deletes those rows afterwards.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import configure_storage  # noqa: E402
+
+USER_PREFIX = "bench_search_"
+TOPICS = ["rent", "groceries", "savings", "holiday", "car", "insurance", "electricity", "phone", "gym",
+          "subscriptions", "mortgage", "childcare", "transport", "pension", "overtime", "tax", "emergency",
+          "fund", "budget", "debt", "loan", "credit", "card", "interest", "wedding", "gift", "council"]
+FILLER = ["how", "can", "i", "my", "the", "this", "month", "week", "cut", "spend", "less", "more", "pay",
+          "should", "keep", "money", "plan", "every", "each", "first", "bill", "cost", "save", "about", "help"]
+RARE = "zeppelin"  # appears in one turn in 5,000
+
+
+def _sentence(rng, words):
+    picked = rng.choices(FILLER, k=words) + rng.choices(TOPICS, k=max(1, words // 4))
+    rng.shuffle(picked)
+    return " ".join(picked).capitalize() + "?"
+
+
+def _seed(conn, dialect, args):
+    import search
+    rng = random.Random(7)
+    cur = conn.cursor()
+    user_ids = []
+    for i in range(args.users):
+        cur.execute("INSERT INTO users (username, password, hourly_rate) VALUES (%s, %s, %s)",
+                    (f"{USER_PREFIX}{i}", "x", 12))
+        user_ids.append(cur.lastrowid)
+    heavy = user_ids[0]
+    started, batch = datetime.now() - timedelta(days=365), []
+    for n in range(args.messages):
+        user_id = heavy if rng.random() < args.heavy_share else rng.choice(user_ids)
+        message = _sentence(rng, 8) + (f" {RARE}" if rng.random() < 1 / 5000 else "")
+        batch.append((user_id, message, _sentence(rng, 30), started + timedelta(seconds=30 * n)))
+        if len(batch) == 20000:
+            cur.executemany("INSERT INTO chat_messages (user_id, user_message, assistant_response, created_at) "
+                            "VALUES (%s, %s, %s, %s)", batch)
+            batch = []
+            print(f"  {n + 1:,} messages", end="\r", flush=True)
+    if batch:
+        cur.executemany("INSERT INTO chat_messages (user_id, user_message, assistant_response, created_at) "
+                        "VALUES (%s, %s, %s, %s)", batch)
+    cur.executemany("INSERT INTO bills (bill_name, bill_amount, user_id) VALUES (%s, %s, %s)",
+                    [(f"{rng.choice(TOPICS).capitalize()} bill", 50, u) for u in user_ids for _ in range(3)])
+    conn.commit()
+    cur.execute("DELETE FROM search_index")  # migration 18 already indexed the empty tables
+    index_started = time.perf_counter()
+    cur.execute(search.backfill_sql(dialect, "chat"))
+    cur.execute(search.backfill_sql(dialect, "bill"))
+    conn.commit()
+    index_s = time.perf_counter() - index_started
+    cur.close()
+    return user_ids, heavy, index_s
+
+
+def _cleanup(conn, user_ids):
+    cur = conn.cursor()
+    for i in range(0, len(user_ids), 500):
+        chunk = user_ids[i:i + 500]
+        marks = ", ".join(["%s"] * len(chunk))
+        cur.execute(f"DELETE FROM search_index WHERE user_id IN ({marks})", chunk)
+        cur.execute(f"DELETE FROM chat_messages WHERE user_id IN ({marks})", chunk)
+        cur.execute(f"DELETE FROM bills WHERE user_id IN ({marks})", chunk)
+        cur.execute(f"DELETE FROM users WHERE user_id IN ({marks})", chunk)
+    conn.commit()
+    cur.close()
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def _report(name, fn, users, repeat):
+    times, hits = [], 0
+    for i in range(repeat):
+        started = time.perf_counter()
+        hits += fn(users[i % len(users)])
+        times.append((time.perf_counter() - started) * 1000)
+    print(f"  {name:<34} p50 {_percentile(times, 50):8.3f}  p95 {_percentile(times, 95):8.3f}  "
+          f"p99 {_percentile(times, 99):8.3f}  mean {statistics.mean(times):8.3f} ms  ({hits / repeat:.1f} results)")
+    return _percentile(times, 95)
+
+
+def run(args):
+    import search
+    import chat_store
+    path = ":memory:"
+    if args.backend == "sqlite" and not args.in_memory:
+        path = os.path.join(tempfile.mkdtemp(prefix="bench_search_"), "search.db")
+    storage = configure_storage(args.backend, path if args.backend == "sqlite" else None)
+    conn = storage.connect()
+    print(f"Seeding {args.messages:,} chat turns for {args.users:,} users ({args.backend})...")
+    started = time.perf_counter()
+    user_ids, heavy, index_s = _seed(conn, storage.dialect, args)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s; built the index in {index_s:.1f}s "
+          f"({args.messages / index_s:,.0f} turns/s)")
+    cur = conn.cursor()
+    dialect = storage.dialect
+    rng = random.Random(11)
+    sample = rng.sample(user_ids[1:], min(len(user_ids) - 1, args.repeat))
+
+    def searcher(q, limit=args.limit, kind=None):
+        terms = search.query_terms(q, dialect)
+        return lambda user_id: len(search.search(cur, user_id, terms, kind, limit)[0])
+
+    try:
+        cur.execute("SELECT COUNT(*) FROM chat_messages WHERE user_id = %s", (heavy,))
+        heavy_turns = cur.fetchone()[0]
+        terms = search.query_terms("rent", dialect)
+        heavy_cursor = search.decode_search_cursor(search.search(cur, heavy, terms, None, args.limit)[1])
+
+        # the first page of the heavy user's matches older than the ranked window
+        past_window = (None, heavy_cursor[2], heavy_cursor[2])
+
+        def deep_page(user_id):
+            return len(search.search(cur, user_id, terms, None, args.limit, heavy_cursor)[0])
+
+        def older_page(user_id):
+            return len(search.search(cur, user_id, terms, None, args.limit, past_window)[0])
+
+        def like_scan(user_id):
+            cur.execute("SELECT message_id FROM chat_messages WHERE user_id = %s "
+                        "AND (user_message LIKE %s OR assistant_response LIKE %s) ORDER BY message_id DESC LIMIT %s",
+                        (user_id, f"%{RARE}%", f"%{RARE}%", args.limit))
+            return len(cur.fetchall())
+
+        print(f"\nTypical user (~{args.messages * (1 - args.heavy_share) / args.users:,.0f} turns), "
+              f"pages of {args.limit}, {args.repeat} searches each:")
+        p95 = _report("common term 'rent'", searcher("rent"), sample, args.repeat)
+        _report(f"rare term '{RARE}'", searcher(RARE), sample, args.repeat)
+        _report("two terms 'car insurance'", searcher("car insurance"), sample, args.repeat)
+        _report("prefix 'subscr*'", searcher("subscr*"), sample, args.repeat)
+        _report("bills only 'rent'", searcher("rent", kind="bill"), sample, args.repeat)
+        _report(f"LIKE scan for '{RARE}'", like_scan, sample, args.repeat)
+
+        print(f"\nHeavy user ({heavy_turns:,} turns):")
+        heavy_p95 = _report("common term 'rent'", searcher("rent"), [heavy], args.repeat)
+        _report(f"rare term '{RARE}'", searcher(RARE), [heavy], args.repeat)
+        _report("two terms 'car insurance'", searcher("car insurance"), [heavy], args.repeat)
+        _report("second page of 'rent'", deep_page, [heavy], args.repeat)
+        if past_window[2]:
+            _report("'rent' past the rank window", older_page, [heavy], args.repeat)
+        _report(f"LIKE scan for '{RARE}'", like_scan, [heavy], max(1, args.repeat // 10))
+
+        print("\nStoring a turn (one commit each):")
+        for label, indexed in (("without the index write", False), ("with the index write", True)):
+            times = []
+            for i in range(args.repeat):
+                started = time.perf_counter()
+                if indexed:
+                    chat_store.save_chat(cur, sample[i % len(sample)], _sentence(rng, 8), _sentence(rng, 30))
+                else:
+                    cur.execute("INSERT INTO chat_messages (user_id, user_message, assistant_response, created_at) "
+                                "VALUES (%s, %s, %s, %s)",
+                                (sample[i % len(sample)], _sentence(rng, 8), _sentence(rng, 30), datetime.now()))
+                conn.commit()
+                times.append((time.perf_counter() - started) * 1000)
+            print(f"  {label:<34} p50 {_percentile(times, 50):8.3f}  p95 {_percentile(times, 95):8.3f} ms")
+    finally:
+        cur.close()
+        if args.backend == "mysql":
+            _cleanup(conn, user_ids)
+        conn.close()
+        if path != ":memory:":
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    ratio = heavy_p95 / p95 if p95 else 0.0
+    ok = p95 <= args.max_p95_ms and ratio <= args.max_ratio
+    print(f"\nCommon-term search p95: typical user {p95:.2f} ms (budget {args.max_p95_ms} ms), heavy user "
+          f"{heavy_p95:.2f} ms ({ratio:.2f}x typical, budget {args.max_ratio}x): {'OK' if ok else 'OVER'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--heavy-share", type=float, default=0.05, help="share of all turns owned by one user")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--max-p95-ms", type=float, default=50.0, help="budget for a typical user's search")
+    parser.add_argument("--max-ratio", type=float, default=3.0, help="heavy user's p95 against a typical user's")
+    parser.add_argument("--in-memory", action="store_true", help="SQLite in memory instead of a temporary file")
+    args = parser.parse_args()
+    sys.exit(run(args))
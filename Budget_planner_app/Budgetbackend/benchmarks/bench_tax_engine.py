@@ -0,0 +1,81 @@
+"""Microbenchmark: taxing many employees one call at a time vs one batch call.
+
+Times, for `--employees` monthly gross amounts:
+  the old calculate_tax() formula in a Python loop
+  tax_engine.month1_tax() one employee at a time, and over the whole array
+  tax_engine.paye_batch() (cumulative PAYE) one employee at a time, and over the whole array
+
+    python benchmarks/bench_tax_engine.py
+    python benchmarks/bench_tax_engine.py --employees 1000000
+
+Also runs the golden-value check first and exits 1 if it fails.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tax_engine import check_golden, month1_tax, paye_batch  # noqa: E402
+
+TAX_YEAR = 2025
+
+
+def _calculate_tax(gross_salary):
+    """api_server.calculate_tax before tax_engine.py."""
+    untaxed_limit, low_tax_limit, mid_tax_limit = 12570, 37700, 125140
+    if gross_salary <= untaxed_limit / 12:
+        tax = 0
+    elif gross_salary <= (untaxed_limit + low_tax_limit) / 12:
+        tax = (gross_salary - (untaxed_limit / 12)) * 0.20
+    elif gross_salary <= (untaxed_limit + low_tax_limit + mid_tax_limit) / 12:
+        tax = ((low_tax_limit / 12) * 0.20) + ((gross_salary - ((untaxed_limit + low_tax_limit) / 12)) * 0.40)
+    else:
+        tax = ((low_tax_limit / 12) * 0.20) + ((mid_tax_limit / 12) * 0.40) + \
+              ((gross_salary - ((untaxed_limit + low_tax_limit + mid_tax_limit) / 12)) * 0.45)
+    return round(tax, 2)
+
+
+def _time(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def run(employees, seed):
+    failures = check_golden()
+    if failures:
+        print(f"{len(failures)} golden tax cases fail; run python tax_engine.py check")
+        return 1
+
+    rnd = np.random.default_rng(seed)
+    gross = np.round(rnd.lognormal(7.8, 0.6, employees), 2)
+    period = rnd.integers(1, 13, employees)
+    ytd_before = np.round(gross * (period - 1) * rnd.uniform(0.8, 1.2, employees), 2)
+    gross_list, period_list, before_list = gross.tolist(), period.tolist(), ytd_before.tolist()
+
+    rows = [
+        ("calculate_tax() loop", _time(lambda: [_calculate_tax(g) for g in gross_list])),
+        ("month1_tax() per employee", _time(lambda: [month1_tax(g, TAX_YEAR) for g in gross_list])),
+        ("month1_tax() batch", _time(lambda: month1_tax(gross, TAX_YEAR))),
+        ("paye_batch() per employee", _time(lambda: [paye_batch(b, g, p, TAX_YEAR) for b, g, p
+                                                     in zip(before_list, gross_list, period_list)])),
+        ("paye_batch() batch", _time(lambda: paye_batch(ytd_before, gross, period, TAX_YEAR))),
+    ]
+    assert np.allclose(rows[1][1][1], rows[2][1][1]) and np.allclose(rows[3][1][1], rows[4][1][1]), \
+        "batch and per-employee results differ"
+
+    print(f"Taxing {employees:,} employees' monthly pay:")
+    for label, (ms, _) in rows:
+        print(f"  {label:<27}: {ms:10.2f} ms  ({ms * 1000 / employees:7.3f} us/employee)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    sys.exit(run(args.employees, args.seed))
@@ -0,0 +1,125 @@
+"""Offline stand-in for the assistant's model: an OpenAI-compatible `POST /v1/chat/completions`.
+
+Answers after `--latency-ms` (plus up to `--jitter-ms`), fails `--error-rate` of
+requests with HTTP 503 so retries can be exercised, and never touches the network
+beyond localhost. Requests with `"stream": true` get the answer as server-sent
+`chat.completion.chunk` events, one word every `--token-ms`, then `data: [DONE]`. Point the API server or the benchmarks at it:
+
+    python benchmarks/llm_stub_server.py --port 8089 --latency-ms 400
+    LLM_BASE_URL=http://127.0.0.1:8089/v1 python api_server.py
+
+`start_stub()` runs the same server on a background thread for in-process benchmarks.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # the default backlog of 5 drops connections under benchmark load
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._reply(404, {"error": {"message": "Not found"}})
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        config = self.server.config
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.active += 1
+            self.server.peak = max(self.server.peak, self.server.active)
+        try:
+            time.sleep((config["latency_ms"] + random.uniform(0, config["jitter_ms"])) / 1000)
+            if random.random() < config["error_rate"]:
+                return self._reply(503, {"error": {"message": "Stub overloaded"}})
+            question = next((m["content"] for m in reversed(body.get("messages", [])) if m.get("role") == "user"), "")
+            answer = f"Stub advice for: {question[:80]}. Review your largest bill first and keep a small buffer."
+            if body.get("stream"):
+                return self._stream(answer, body.get("model", "stub"))
+            self._reply(200, {
+                "object": "chat.completion",
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            })
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def _stream(self, answer, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        words = answer.split(" ")
+        try:
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(self.server.config["token_ms"] / 1000)
+                chunk = {"object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": word + (" " if i < len(words) - 1 else "")}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up (deadline passed) before the answer was ready
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port=0, latency_ms=300, jitter_ms=100, error_rate=0.0, token_ms=20):
+    server = StubServer(("127.0.0.1", port), StubHandler)
+    server.config = {"latency_ms": latency_ms, "jitter_ms": jitter_ms, "error_rate": error_rate, "token_ms": token_ms}
+    server.lock = threading.Lock()
+    server.requests = server.active = server.peak = 0  # peak: most requests in progress at once
+    return server
+
+
+def start_stub(**config):
+    """Serve the stub on a daemon thread; returns (server, base_url). Stop it with server.shutdown()."""
+    server = make_server(**config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Local stub of the assistant's chat completion API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--token-ms", type=float, default=20, help="gap between streamed words")
+    args = parser.parse_args(argv[1:])
+
+    server = make_server(args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.token_ms)
+    print(f"Stub model on http://127.0.0.1:{server.server_address[1]}/v1 "
+          f"({args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, {args.error_rate:.0%} errors)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
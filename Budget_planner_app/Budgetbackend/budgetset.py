@@ -1,31 +1,58 @@
 import os
-import mysql.connector
-from mysql.connector import Error
+from contextlib import contextmanager
 from datetime import datetime
+from storage import get_storage
+from rollups import record_earnings
 
 # config
 DATA_DIR = os.path.join(os.path.dirname(__file__), "daily_keep")
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(os.path.join(DATA_DIR, "weekly"), exist_ok=True)
 
-DB_NAME = "salary_management"
-DB_CONFIG = {
-    "user": "root",
-    "password": "",
-    "host": "localhost",
-    "raise_on_warnings": True
-}
+# DB name/credentials live in database_and_table.py; DB_BACKEND picks MySQL or SQLite (storage.py)
 
 # --- DB Connection ---
 def get_conn():
-    """Get database connection."""
+    """Get a connection from the configured storage backend; close() returns it to the pool."""
     try:
-        conn = mysql.connector.connect(database=DB_NAME, **DB_CONFIG)
-        return conn
-    except Error as e:
+        return get_storage().connect()
+    except Exception as e:
         print("Error connecting to database:", e)
         return None
 
+class DatabaseUnavailable(Exception):
+    """Raised by db_cursor() when no connection can be obtained."""
+
+@contextmanager
+def db_cursor(commit=False):
+    """Yield a cursor on a pooled connection.
+
+    Commits on a clean exit when `commit` is set, rolls back on error and
+    always hands the connection back to the pool.
+    """
+    conn = get_conn()
+    if not conn:
+        raise DatabaseUnavailable("Database unavailable")
+    cur = None
+    try:
+        cur = conn.cursor()
+        yield cur
+        if commit:
+            conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        if cur:
+            try:
+                cur.close()
+            except Exception:
+                pass
+        conn.close()
+
 # --- Utility ---
 def calendar():
     """Get current month name."""
@@ -39,74 +66,33 @@ def calendar():
 # --- User Management ---
 def add_user(username, password, hourly_rate, date_of_birth=None):
     """Add user to database. Returns user_id if successful, None otherwise."""
-    conn = get_conn()
-    if not conn:
+    try:
+        with db_cursor(commit=True) as cur:
+            return get_storage().add_user(cur, username, password, hourly_rate, date_of_birth)
+    except DatabaseUnavailable:
         print("DB unavailable — cannot add user")
         return None
-    
-    cur = None
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT IGNORE INTO users (username, password, hourly_rate, date_of_birth) VALUES (%s, %s, %s, %s)",
-            (username, password, float(hourly_rate), date_of_birth)
-        )
-        conn.commit()
-        
-        # Fetch the user_id
-        cur.execute("SELECT user_id FROM users WHERE username=%s LIMIT 1", (username,))
-        row = cur.fetchone()
-        user_id = int(row[0]) if row else None
-        return user_id
     except Exception as e:
         print("Error adding user:", e)
         return None
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 def save_daily_to_db(amount, hours_worked, user_id):
     """Save daily salary to database."""
     if not user_id:
         print("No user_id provided — skipping daily salary save")
         return False
-    
-    conn = get_conn()
-    if not conn:
-        print("DB unavailable — cannot save daily salary")
-        return False
-    
-    cur = None
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO daily_keep (daily_keep_date, daily_keep_amount, daily_hours_worked, user_id) VALUES (%s, %s, %s, %s)",
-            (datetime.now().date(), float(amount), float(hours_worked), user_id)
-        )
-        conn.commit()
+        with db_cursor(commit=True) as cur:
+            today = datetime.now().date()
+            get_storage().add_daily_keep(cur, user_id, today, hours_worked, amount)
+            record_earnings(cur, user_id, today, gross=amount, hours=hours_worked)
         return True
+    except DatabaseUnavailable:
+        print("DB unavailable — cannot save daily salary")
+        return False
     except Exception as e:
         print("Error saving daily salary:", e)
         return False
-    finally:
-        if cur:
-            try:
-                cur.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 # --- Legacy CLI Functions (deprecated - use api_server.py instead) ---
 # Removed: salary_calc(), weekly_earnings(), add_bills(), view_bills(), 
@@ -0,0 +1,259 @@
+"""Budget assistant chat history in the `chat_messages` table.
+
+Each assistant turn is one row (the user's message and the reply), read back per
+user through the (user_id, message_id) index a page at a time, newest first, so a
+history request costs the page it returns rather than the whole chat volume.
+Streamed answers are stored by `save_chat_later()` on a single background writer
+once the stream has ended.
+
+Each turn is indexed for search (search.py) in the same transaction as its
+row, so the history and the index commit or roll back together.
+
+`budget_assistant.txt`, the old shared log, is imported once with
+
+    python chat_store.py migrate                      # budget_assistant.txt next to this file
+    python chat_store.py migrate --path old_log.txt
+    python chat_store.py status
+"""
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from budgetset import db_cursor
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from search import index_chat, index_chats_after
+from storage import get_storage
+
+CHAT_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "budget_assistant.txt")
+CHAT_COLUMNS = "message_id, user_message, assistant_response, created_at"
+MIGRATE_BATCH_SIZE = 1000
+LOG_SECTIONS = ("User Message", "Response", "Timestamp")
+
+
+# --- Writes ---
+def save_chat(cur, user_id, message, response, created_at=None):
+    """Store one assistant turn and add it to the search index; returns its message_id. The caller commits."""
+    created_at = created_at or datetime.now().replace(microsecond=0)
+    cur.execute(
+        "INSERT INTO chat_messages (user_id, user_message, assistant_response, created_at) "
+        "VALUES (%s, %s, %s, %s)",
+        (user_id, message, response, created_at)
+    )
+    message_id = cur.lastrowid
+    index_chat(cur, user_id, message_id, message, response, created_at)
+    return message_id
+
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-writer")
+_writes = {"queued": 0, "saved": 0, "failed": 0}
+_writes_lock = threading.Lock()
+
+
+def save_chat_later(user_id, message, response):
+    """Queue one turn to be stored off the request thread; returns a Future of its message_id."""
+    created_at = datetime.now().replace(microsecond=0)
+    with _writes_lock:
+        _writes["queued"] += 1
+    return _writer.submit(_save_queued, user_id, message, response, created_at)
+
+
+def _save_queued(user_id, message, response, created_at):
+    try:
+        with db_cursor(commit=True) as cur:
+            message_id = save_chat(cur, user_id, message, response, created_at)
+    except Exception as e:
+        print(f"Error saving chat turn for user {user_id}: {e}")
+        with _writes_lock:
+            _writes["queued"] -= 1
+            _writes["failed"] += 1
+        raise
+    with _writes_lock:
+        _writes["queued"] -= 1
+        _writes["saved"] += 1
+    return message_id
+
+
+def writer_stats():
+    """Background chat writes waiting, stored and failed since start-up."""
+    with _writes_lock:
+        return dict(_writes)
+
+
+# --- Reads ---
+def history_args(args):
+    """(limit, before) from request args `limit` and `before` (a message_id); raises ValueError on bad values."""
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        before = int(args['before']) if args.get('before') else None
+    except (TypeError, ValueError):
+        raise ValueError("limit and before must be numbers") from None
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    return min(limit, MAX_PAGE_SIZE), before
+
+
+def chat_page(cur, user_id, limit=DEFAULT_PAGE_SIZE, before=None):
+    """The user's `limit` turns before message `before` (or the latest), oldest first.
+
+    Returns (turns, next_before); pass next_before back for the page before this
+    one. It is None once the start of the history is reached.
+    """
+    sql, params = f"SELECT {CHAT_COLUMNS} FROM chat_messages WHERE user_id = %s", (user_id,)
+    if before:
+        sql, params = sql + " AND message_id < %s", params + (before,)
+    cur.execute(sql + " ORDER BY message_id DESC LIMIT %s", params + (limit + 1,))
+    rows = cur.fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    turns = [turn_from_row(row) for row in reversed(rows)]
+    return turns, (rows[-1][0] if more else None)
+
+
+def turns_between(cur, user_id, after_id, before_id, limit):
+    """Up to `limit` of the user's turns with after_id < message_id < before_id, oldest first."""
+    cur.execute(
+        f"SELECT {CHAT_COLUMNS} FROM chat_messages WHERE user_id = %s AND message_id > %s AND message_id < %s "
+        "ORDER BY message_id LIMIT %s",
+        (user_id, after_id, before_id, limit)
+    )
+    return [turn_from_row(row) for row in cur.fetchall()]
+
+
+def turn_from_row(row):
+    """A chat_messages row (CHAT_COLUMNS) as the dict the history API returns."""
+    return {
+        "id": row[0],
+        "user_message": row[1],
+        "assistant_response": row[2],
+        "timestamp": str(row[3])[:19],
+    }
+
+
+# --- Import of budget_assistant.txt ---
+def parse_log(lines):
+    """Yield (user_id, message, response, created_at) for each complete entry of the old text log.
+
+    Reads line by line, so the file is never held in memory. Entries missing a part
+    are skipped, as the old reader skipped them.
+    """
+    entry, section = None, None
+    for line in lines:
+        line = line.rstrip("\n")
+        if line == "==chat entry==":
+            entry, section = {name: [] for name in LOG_SECTIONS}, None
+        elif entry is None:
+            continue
+        elif line == "==chat entry end==":
+            parsed = _parse_entry(entry)
+            if parsed:
+                yield parsed
+            entry = None
+        elif section is None and line.startswith("User ID:"):
+            entry["User ID"] = line.split(":", 1)[1].strip()
+        elif _next_section(section) and line == _next_section(section) + ":":
+            # headers come in a fixed order, so "Response:" inside a reply is just text
+            section = _next_section(section)
+        elif section:
+            entry[section].append(line)
+
+
+def _next_section(section):
+    index = LOG_SECTIONS.index(section) + 1 if section else 0
+    return LOG_SECTIONS[index] if index < len(LOG_SECTIONS) else None
+
+
+def _parse_entry(entry):
+    try:
+        user_id = int(entry["User ID"])
+        created_at = datetime.strptime("\n".join(entry["Timestamp"]).strip(), "%Y-%m-%d %H:%M:%S")
+    except (KeyError, ValueError):
+        return None
+    message = "\n".join(entry["User Message"]).strip()
+    response = "\n".join(entry["Response"]).strip()
+    if not message or not response:
+        return None
+    return user_id, message, response, created_at
+
+
+def migrate_log(path=CHAT_LOG_PATH, force=False, batch_size=MIGRATE_BATCH_SIZE):
+    """Import the old text log into chat_messages; returns the number of turns imported.
+
+    Refuses to run twice (rows with source 'log' already exist) unless `force`.
+    """
+    conn = get_storage().connect()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COUNT(*) FROM chat_messages WHERE source = 'log'")
+        if cur.fetchone()[0] and not force:
+            raise RuntimeError("Chat log already imported; pass force=True to import it again")
+        cur.execute("SELECT COALESCE(MAX(message_id), 0) FROM chat_messages")
+        last_id = cur.fetchone()[0]
+        imported = sum(_insert_batch(cur, batch) for batch in _batches(path, batch_size))
+        index_chats_after(cur, last_id)
+        conn.commit()
+        return imported
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _batches(path, batch_size):
+    with open(path, "r", encoding="utf-8") as txt:
+        batch = []
+        for turn in parse_log(txt):
+            batch.append(turn)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _insert_batch(cur, batch):
+    if batch:
+        cur.executemany(
+            "INSERT INTO chat_messages (user_id, user_message, assistant_response, created_at, source) "
+            "VALUES (%s, %s, %s, %s, 'log')",
+            batch
+        )
+    return len(batch)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Budget assistant chat history")
+    parser.add_argument("command", choices=("migrate", "status"))
+    parser.add_argument("--path", default=CHAT_LOG_PATH, help="old chat log to import")
+    parser.add_argument("--force", action="store_true", help="import even if a log was imported before")
+    args = parser.parse_args(argv[1:])
+
+    if args.command == "status":
+        conn = get_storage().connect()
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT source, COUNT(*), COUNT(DISTINCT user_id) FROM chat_messages GROUP BY source")
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+        for source, turns, users in rows:
+            print(f"{source}: {turns} turns from {users} users")
+        if not rows:
+            print("No chat history stored")
+        return 0
+
+    try:
+        imported = migrate_log(args.path, args.force)
+    except (OSError, RuntimeError) as e:
+        print(e)
+        return 1
+    print(f"Imported {imported} chat turns from {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
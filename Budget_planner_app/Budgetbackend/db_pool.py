@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from collections import deque
+import mysql.connector
+
+# --- Pool config (override with environment variables) ---
+POOL_CONFIG = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),              # idle connections kept open
+    "max_overflow": int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")),  # extra connections allowed under burst load
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "5")),           # seconds to wait for a free connection
+    "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),  # recycle connections older than this
+    "health_check": os.getenv("DB_POOL_HEALTH_CHECK", "1") != "0",  # ping connections on checkout
+}
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+class PooledConnection:
+    """Wraps a raw connection so close() hands it back to the pool instead of disconnecting."""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise AttributeError(f"connection already returned to pool ({name})")
+        return getattr(raw, name)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool with overflow, checkout health checks and lifetime recycling."""
+
+    def __init__(self, connect_args, pool_size=5, max_overflow=10, timeout=5.0,
+                 max_lifetime=1800.0, health_check=True, connect=None):
+        self._connect_args = dict(connect_args)
+        self._connect = connect or mysql.connector.connect
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check = health_check
+        self._idle = deque()  # (raw_conn, created_at), most recently returned on the right
+        self._open = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "connects": 0,
+            "reuses": 0,
+            "timeouts": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+            "overflow_closes": 0,
+            "wait_seconds": 0.0,
+        }
+
+    # --- Checkout / return ---
+    def connect(self):
+        """Check out a connection, waiting up to `timeout` seconds when the pool is exhausted."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            candidate = None
+            with self._cond:
+                while True:
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        break
+                    if self._open < self.pool_size + self.max_overflow:
+                        self._open += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available within {self.timeout:.1f}s "
+                            f"({self._open} open)"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+            # health checks and new handshakes happen outside the lock so other threads keep moving
+            if candidate is not None:
+                raw, created_at = candidate
+                problem = self._check(raw, created_at)
+                with self._cond:
+                    if problem is None:
+                        self._stats["reuses"] += 1
+                        self._checked_out(started)
+                        return PooledConnection(self, raw, created_at)
+                    self._stats[problem] += 1
+                    self._discard(raw)
+                continue
+            try:
+                raw = self._connect(**self._connect_args)
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats["connects"] += 1
+                self._checked_out(started)
+            return PooledConnection(self, raw, time.monotonic())
+
+    def _checked_out(self, started):
+        self._stats["checkouts"] += 1
+        self._stats["wait_seconds"] += time.monotonic() - started
+
+    def _check(self, raw, created_at):
+        """Return the stats key describing why an idle connection can't be reused, or None."""
+        if self.max_lifetime and time.monotonic() - created_at > self.max_lifetime:
+            return "recycled"
+        if self.health_check:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                return "health_check_failures"
+        return None
+
+    def _discard(self, raw):
+        self._open -= 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+        self._cond.notify()
+
+    def _release(self, raw, created_at):
+        # drop any transaction the caller left open, same as a real disconnect would
+        try:
+            raw.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._cond:
+            if not healthy:
+                self._discard(raw)
+            elif len(self._idle) >= self.pool_size:
+                self._stats["overflow_closes"] += 1
+                self._discard(raw)
+            else:
+                self._idle.append((raw, created_at))
+                self._cond.notify()
+
+    def dispose(self):
+        """Close every idle connection (checked-out ones are closed when returned)."""
+        with self._cond:
+            while self._idle:
+                raw, _ = self._idle.pop()
+                self._discard(raw)
+
+    def stats(self):
+        """Snapshot of pool counters for monitoring."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "waiting": self._waiting,
+            })
+        snapshot["wait_seconds"] = round(snapshot["wait_seconds"], 4)
+        return snapshot
+
+
+# --- Shared pools (one per distinct connect config) ---
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(connect_args):
+    """Return the process-wide pool for these connection arguments, creating it on first use."""
+    key = tuple(sorted(connect_args.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(connect_args, **POOL_CONFIG)
+            _pools[key] = pool
+        return pool
+
+
+def pool_stats():
+    """Stats for every pool in this process."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return [
+        dict(pool.stats(), database=dict(key).get("database"), host=dict(key).get("host"))
+        for key, pool in pools
+    ]
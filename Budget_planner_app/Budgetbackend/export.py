@@ -0,0 +1,130 @@
+"""Streaming export of earnings (daily_keep) and shift history as NDJSON or CSV.
+
+Rows are read through an unbuffered (server-side) cursor a chunk at a time and
+written out as they arrive, so memory stays flat however many rows an export
+covers. `stream_export()` owns its connection for the life of the generator and
+returns it to the pool when the generator finishes or is closed.
+
+    for chunk in stream_export("earnings", "employer", 3, "csv", start=date(2025, 4, 6)):
+        out.write(chunk)
+"""
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from storage import get_storage
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+SCOPES = ("user", "employer")
+
+# dataset -> output columns, SELECT list, FROM/WHERE per scope, (date, id) columns.
+# Rows come out in index order (employee, date, id) so the database never sorts the export.
+DATASETS = {
+    "earnings": {
+        "columns": ("id", "user_id", "date", "hours_worked", "amount"),
+        "select": "d.daily_keep_id, d.user_id, d.daily_keep_date, d.daily_hours_worked, d.daily_keep_amount",
+        "user": "FROM daily_keep d WHERE d.user_id = %s",
+        "employer": ("FROM users u JOIN daily_keep d ON d.user_id = u.user_id "
+                     "WHERE u.created_by = %s AND u.role = 'employee'"),
+        "date_col": "d.daily_keep_date",
+        "id_col": "d.daily_keep_id",
+    },
+    "shifts": {
+        "columns": ("id", "employee_id", "shift_name", "date", "start_time", "end_time", "hours_worked",
+                    "status", "shift_type", "earnings", "is_overtime", "approved_at"),
+        "select": ("s.shift_id, s.employee_id, s.shift_name, s.shift_date, s.start_time, s.end_time, "
+                   "s.hours_worked, s.status, s.shift_type, s.weekly_earning, s.is_overtime, s.approved_at"),
+        "user": "FROM shifts s WHERE s.employee_id = %s",
+        "employer": ("FROM users u JOIN shifts s ON s.employee_id = u.user_id "
+                     "WHERE u.created_by = %s AND u.role = 'employee'"),
+        "date_col": "s.shift_date",
+        "id_col": "s.shift_id",
+    },
+}
+
+
+def export_query(dataset, scope, owner_id, start=None, end=None):
+    """(sql, params, columns) for `dataset` of one user or all of an employer's employees.
+
+    `start` and `end` are inclusive dates; either may be None for an open range.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown export: {dataset}")
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown export scope: {scope}")
+    spec = DATASETS[dataset]
+    where, params = "", [owner_id]
+    if start:
+        where += f" AND {spec['date_col']} >= %s"
+        params.append(start)
+    if end:
+        where += f" AND {spec['date_col']} < %s"
+        params.append(end + timedelta(days=1))
+    order = f"{spec['date_col']}, {spec['id_col']}"
+    if scope == "employer":
+        order = "u.user_id, " + order
+    sql = f"SELECT {spec['select']} {spec[scope]}{where} ORDER BY {order}"
+    return sql, tuple(params), spec["columns"]
+
+
+def _value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):  # MySQL TIME columns
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return value
+
+
+def _ndjson_chunk(columns, rows):
+    return "".join(
+        json.dumps(dict(zip(columns, map(_value, row))), separators=(",", ":")) + "\n" for row in rows
+    )
+
+
+def _csv_chunk(rows):
+    buf = io.StringIO()
+    csv.writer(buf).writerows([map(_value, row) for row in rows])
+    return buf.getvalue()
+
+
+def stream_export(dataset, scope, owner_id, fmt="ndjson", start=None, end=None, chunk_size=None):
+    """Generator of text chunks for the export; each chunk is one fetchmany() of rows.
+
+    Bad arguments raise ValueError here; the query runs when the first chunk is read.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    sql, params, columns = export_query(dataset, scope, owner_id, start, end)
+    return _stream(sql, params, columns, fmt, max(1, int(chunk_size or EXPORT_CHUNK_SIZE)))
+
+
+def _stream(sql, params, columns, fmt, chunk_size):
+    conn = get_storage().connect()
+    cur = None
+    try:
+        # unbuffered: rows stay on the server until fetched instead of being read into memory at execute()
+        cur = conn.cursor(buffered=False)
+        cur.execute(sql, params)
+        if fmt == "csv":
+            buf = io.StringIO()
+            csv.writer(buf).writerow(columns)
+            yield buf.getvalue()
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield _ndjson_chunk(columns, rows) if fmt == "ndjson" else _csv_chunk(rows)
+    finally:
+        # an abandoned export leaves unread rows; the pool discards such a connection on release
+        if cur:
+            try:
+                cur.close()
+            except Exception as e:
+                print(f"Export cursor closed with unread rows: {e}")
+        conn.close()
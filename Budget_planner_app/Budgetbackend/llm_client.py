@@ -0,0 +1,435 @@
+"""Client for the assistant's language model: bounded concurrency, deadlines, retries and a response cache.
+
+Calls run on a shared thread pool of LLM_MAX_CONCURRENCY workers, so no more
+than that many upstream requests are ever open; callers queue for a worker in
+arrival order. The Flask thread waits only until the call's deadline (LLM_TIMEOUT
+seconds by default) and then gets LLMTimeout, so a slow upstream no longer pins a
+worker for as long as the upstream likes. Transient failures (timeouts,
+connection errors, HTTP 429/5xx) are retried with full-jitter exponential backoff
+while the deadline allows. Answers are cached by `cache_key()`: the normalized
+user message plus a hash of the user's financial snapshot.
+
+`LLMClient.stream()` gives the answer as it is generated. The first token must
+arrive within the deadline, and each later one within LLM_TIMEOUT of the one
+before. Time to first token is measured per stream and in `stats()`.
+
+The upstream is the openai package (`openai.ChatCompletion`), or any
+OpenAI-compatible HTTP endpoint when LLM_BASE_URL is set, such as the offline
+stub in benchmarks/llm_stub_server.py:
+
+    python benchmarks/llm_stub_server.py --port 8089 &
+    LLM_BASE_URL=http://127.0.0.1:8089/v1 python api_server.py
+"""
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4.1")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+COMPLETION_ARGS = {"temperature": 0.7, "max_tokens": 250}
+BACKOFF_BASE = 0.25
+
+# openai (pre-1.0) errors worth another attempt, matched by name so the package stays optional
+TRANSIENT_ERRORS = {"Timeout", "APIConnectionError", "RateLimitError", "ServiceUnavailableError", "APIError",
+                    "TryAgain"}
+
+
+class LLMError(Exception):
+    """The model could not produce an answer."""
+
+
+class LLMTimeout(LLMError):
+    """The call's deadline passed (queued for a worker or waiting on the upstream)."""
+
+
+class TransientError(LLMError):
+    """A failure that may succeed on retry."""
+
+
+# --- Cache ---
+def normalize_message(message):
+    """Lower-case, collapse whitespace and drop trailing punctuation, so trivial variants share a cache entry."""
+    return re.sub(r"\s+", " ", message.lower()).strip().rstrip("?!. ")
+
+
+def snapshot_hash(snapshot):
+    return hashlib.sha256(json.dumps(snapshot, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def cache_key(message, snapshot):
+    """Cache key for an answer to `message` given the user's financial `snapshot`."""
+    return hashlib.sha256(f"{normalize_message(message)}\n{snapshot_hash(snapshot)}".encode()).hexdigest()
+
+
+class ResponseCache:
+    """LRU of answers with a per-entry TTL."""
+
+    def __init__(self, size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, answer)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, answer):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+# --- Transports: one completion call, or its text deltas when stream=True ---
+def http_transport(base_url, api_key=None):
+    """Completion over an OpenAI-compatible `POST {base_url}/chat/completions`."""
+    url = base_url.rstrip("/") + "/chat/completions"
+
+    def post(messages, timeout, stream):
+        body = json.dumps({"model": LLM_MODEL, "messages": messages, "stream": stream, **COMPLETION_ARGS}).encode()
+        headers = {"Content-Type": "application/json"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        try:
+            return urllib.request.urlopen(urllib.request.Request(url, body, headers), timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                raise TransientError(f"HTTP {e.code} from model") from e
+            raise LLMError(f"HTTP {e.code} from model") from e
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise TransientError(str(e)) from e
+
+    def deltas(messages, timeout):
+        # server-sent events: `data: {chunk}` lines, ending with `data: [DONE]`
+        with post(messages, timeout, True) as resp:
+            try:
+                for line in resp:
+                    line = line.decode().strip()
+                    if not line.startswith("data:"):
+                        continue
+                    if line[5:].strip() == "[DONE]":
+                        return
+                    delta = json.loads(line[5:])["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+            except (TimeoutError, ConnectionError) as e:
+                raise TransientError(str(e)) from e
+
+    def complete(messages, timeout, stream=False):
+        if stream:
+            return deltas(messages, timeout)
+        with post(messages, timeout, False) as resp:
+            try:
+                data = json.loads(resp.read())
+            except (TimeoutError, ConnectionError) as e:
+                raise TransientError(str(e)) from e
+        return data["choices"][0]["message"]["content"].strip()
+
+    return complete
+
+
+def openai_transport():
+    """Completion through the openai package (`openai.api_key` is set by the caller)."""
+    import openai
+
+    def create(messages, timeout, stream):
+        try:
+            return openai.ChatCompletion.create(
+                model=LLM_MODEL, messages=messages, n=1, stop=None, request_timeout=timeout, stream=stream,
+                **COMPLETION_ARGS
+            )
+        except Exception as e:
+            if type(e).__name__ in TRANSIENT_ERRORS:
+                raise TransientError(str(e)) from e
+            raise
+
+    def deltas(messages, timeout):
+        for chunk in create(messages, timeout, True):
+            delta = chunk["choices"][0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+    def complete(messages, timeout, stream=False):
+        if stream:
+            return deltas(messages, timeout)
+        return create(messages, timeout, False)["choices"][0]["message"]["content"].strip()
+
+    return complete
+
+
+# --- Client ---
+class LLMClient:
+    def __init__(self, transport, max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT, retries=LLM_RETRIES,
+                 cache=None):
+        self.transport = transport
+        self.timeout = timeout
+        self.retries = retries
+        self.cache = cache if cache is not None else ResponseCache()
+        self.max_concurrency = max_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "cached": 0, "upstream": 0, "retries": 0, "timeouts": 0, "errors": 0,
+                         "in_flight": 0, "peak_in_flight": 0, "answered": 0, "latency_ms": 0.0,
+                         "streams": 0, "first_tokens": 0, "ttft_ms": 0.0, "max_ttft_ms": 0.0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.counters[name] += delta
+            self.counters["peak_in_flight"] = max(self.counters["peak_in_flight"], self.counters["in_flight"])
+
+    def _record_ttft(self, ttft_ms):
+        with self._lock:
+            self.counters["first_tokens"] += 1
+            self.counters["ttft_ms"] += ttft_ms
+            self.counters["max_ttft_ms"] = max(self.counters["max_ttft_ms"], round(ttft_ms, 1))
+
+    def complete(self, messages, key=None, timeout=None):
+        """(answer, info) for `messages`; info has cached, attempts and latency_ms.
+
+        Raises LLMTimeout when the deadline passes and LLMError when the model fails.
+        """
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout)
+        self._count(calls=1)
+        if key:
+            answer = self.cache.get(key)
+            if answer is not None:
+                self._count(cached=1)
+                return answer, {"cached": True, "attempts": 0, "latency_ms": 0.0}
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                answer = self._call(messages, deadline)
+                break
+            except LLMTimeout:
+                self._count(timeouts=1)
+                raise
+            except TransientError as e:
+                # full jitter: sleep a random part of the doubled backoff, if the deadline leaves room
+                pause = random.uniform(0, BACKOFF_BASE * 2 ** (attempt - 1))
+                if time.monotonic() + pause >= deadline:
+                    self._count(timeouts=1)
+                    raise LLMTimeout(f"Deadline passed after {attempt} attempts: {e}") from e
+                if attempt > self.retries:
+                    self._count(errors=1)
+                    raise LLMError(f"Model unavailable after {attempt} attempts: {e}") from e
+                self._count(retries=1)
+                time.sleep(pause)
+            except LLMError:
+                self._count(errors=1)
+                raise
+            except Exception as e:
+                self._count(errors=1)
+                raise LLMError(str(e)) from e
+
+        latency_ms = (time.monotonic() - started) * 1000
+        self._count(answered=1, latency_ms=latency_ms)
+        if key:
+            self.cache.put(key, answer)
+        return answer, {"cached": False, "attempts": attempt, "latency_ms": round(latency_ms, 1)}
+
+    def _call(self, messages, deadline):
+        """One upstream attempt on the pool; queued attempts are dropped at the deadline, running ones abandoned."""
+        future = self._pool.submit(self._attempt, messages, deadline)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            raise LLMTimeout("Model did not answer before the deadline") from None
+
+    def _attempt(self, messages, deadline):
+        # runs on a pool worker: the pool's size is the limit on concurrent upstream calls
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMTimeout("Deadline passed while queued for a model worker")
+        self._count(in_flight=1, upstream=1)
+        try:
+            return self.transport(messages, remaining)
+        finally:
+            self._count(in_flight=-1)
+
+    def stream(self, messages, key=None, timeout=None):
+        """A Stream of the answer's text deltas; iterate it to receive them as the model produces them."""
+        return Stream(self, messages, key, timeout or self.timeout)
+
+    def _stream_attempts(self, messages, deadline, chunks, cancel):
+        """Pool worker for one stream: put ('delta', text)... then ('done', attempts) or ('error', exc) on `chunks`.
+
+        Retries transient failures only until the first delta has been sent.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = deadline - time.monotonic()
+            if cancel.is_set() or remaining <= 0:
+                chunks.put(("error", LLMTimeout("Deadline passed while queued for a model worker")))
+                return
+            self._count(in_flight=1, upstream=1)
+            sent = False
+            try:
+                deltas = self.transport(messages, remaining, stream=True)
+                try:
+                    for delta in deltas:
+                        if cancel.is_set():
+                            return  # the reader went away; closing `deltas` drops the upstream request
+                        chunks.put(("delta", delta))
+                        sent = True
+                finally:
+                    deltas.close()
+                chunks.put(("done", attempt))
+                return
+            except TransientError as e:
+                pause = random.uniform(0, BACKOFF_BASE * 2 ** (attempt - 1))
+                if sent or attempt > self.retries:
+                    chunks.put(("error", LLMError(f"Model stream failed after {attempt} attempts: {e}")))
+                    return
+                if time.monotonic() + pause >= deadline:
+                    chunks.put(("error", LLMTimeout(f"Deadline passed after {attempt} attempts: {e}")))
+                    return
+                self._count(retries=1)
+            except LLMError as e:
+                chunks.put(("error", e))
+                return
+            except Exception as e:
+                chunks.put(("error", LLMError(str(e))))
+                return
+            finally:
+                self._count(in_flight=-1)
+            time.sleep(pause)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        answered, latency_ms = stats.pop("answered"), stats.pop("latency_ms")
+        first_tokens, ttft_ms = stats.pop("first_tokens"), stats.pop("ttft_ms")
+        stats["avg_latency_ms"] = round(latency_ms / answered, 1) if answered else 0.0
+        stats["avg_ttft_ms"] = round(ttft_ms / first_tokens, 1) if first_tokens else 0.0
+        stats.update(max_concurrency=self.max_concurrency, timeout=self.timeout, cache=self.cache.stats())
+        return stats
+
+
+class Stream:
+    """An answer's text as it arrives from the model.
+
+    Iterating yields text deltas and raises LLMTimeout or LLMError like
+    `LLMClient.complete()`. Once iteration ends, `text` holds the whole answer
+    and `info` has cached, attempts, ttft_ms and latency_ms. Closing the
+    iterator early (the HTTP client went away) stops the upstream call.
+    """
+
+    def __init__(self, client, messages, key, timeout):
+        self.client = client
+        self.messages = messages
+        self.key = key
+        self.timeout = timeout
+        self.text = ""
+        self.info = None
+
+    def __iter__(self):
+        client = self.client
+        started = time.monotonic()
+        client._count(calls=1, streams=1)
+        answer = client.cache.get(self.key) if self.key else None
+        if answer is not None:
+            client._count(cached=1)
+            self.text = answer
+            self.info = {"cached": True, "attempts": 0, "ttft_ms": 0.0, "latency_ms": 0.0}
+            yield answer
+            return
+
+        chunks, cancel = queue.Queue(), threading.Event()
+        deadline = started + self.timeout
+        future = client._pool.submit(client._stream_attempts, self.messages, deadline, chunks, cancel)
+        parts, ttft_ms = [], None
+        try:
+            while True:
+                try:
+                    kind, value = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    raise LLMTimeout("Model did not answer before the deadline" if not parts
+                                     else "Model stream stalled") from None
+                if kind == "error":
+                    raise value
+                if kind == "done":
+                    attempts = value
+                    break
+                if ttft_ms is None:
+                    ttft_ms = (time.monotonic() - started) * 1000
+                    client._record_ttft(ttft_ms)
+                parts.append(value)
+                deadline = time.monotonic() + self.timeout
+                yield value
+        except LLMTimeout:
+            client._count(timeouts=1)
+            raise
+        except LLMError:
+            client._count(errors=1)
+            raise
+        finally:
+            cancel.set()
+            future.cancel()
+
+        self.text = "".join(parts).strip()
+        if self.key and self.text:
+            client.cache.put(self.key, self.text)
+        self.info = {"cached": False, "attempts": attempts, "ttft_ms": round(ttft_ms or 0.0, 1),
+                     "latency_ms": round((time.monotonic() - started) * 1000, 1)}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def llm_configured():
+    """True when there is an upstream to call: LLM_BASE_URL, or an OpenAI key."""
+    return bool(LLM_BASE_URL or os.getenv("OPEN_AI_KEY"))
+
+
+def get_llm():
+    """The process's shared client (created on first use)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            transport = (http_transport(LLM_BASE_URL, os.getenv("OPEN_AI_KEY")) if LLM_BASE_URL
+                         else openai_transport())
+            _client = LLMClient(transport)
+        return _client
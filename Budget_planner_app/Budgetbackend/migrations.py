@@ -0,0 +1,532 @@
+"""Versioned schema migrations.
+
+init_db() creates the base tables; everything after that (indexes, new
+columns, new tables) is an ordered up-migration recorded in `schema_version`.
+Steps are applied on whichever storage backend the connection belongs to
+(MySQL or SQLite, see storage.py).
+
+Usage:
+    python migrations.py up       # apply pending migrations
+    python migrations.py status   # show applied / pending versions
+    python migrations.py check    # EXPLAIN the hot route queries, exit 1 on full scans
+"""
+import sys
+from datetime import date, timedelta
+from periods import Period
+from roster import ROSTER_SQL
+from export import export_query
+from pending_queue import QUEUE_COLUMNS, QUEUE_FROM
+from retention import ARCHIVE_SQL
+from chat_store import CHAT_COLUMNS
+from search import SEARCH_DDL, backfill_sql, rank_window_sql, search_sql
+
+# --- Migrations ---
+# (version, description, steps). Steps are data so they can be applied idempotently:
+#   ("column", table, column, definition)
+#   ("index", table, index_name, (col, ...))
+#   ("sql", statement)
+#   ("sql_on", dialect, statement)  run only on that backend, as written (no DDL translation)
+MIGRATIONS = [
+    (1, "add shifts.weekly_earning written by the approve routes", [
+        ("column", "shifts", "weekly_earning", "DECIMAL(10,2) DEFAULT 0.00"),
+    ]),
+    (2, "composite indexes for shift lookups", [
+        ("index", "shifts", "idx_shifts_employee_date", ("employee_id", "shift_date")),
+        ("index", "shifts", "idx_shifts_creator_status", ("created_by", "status", "shift_date")),
+        ("index", "shifts", "idx_shifts_type_status", ("shift_type", "status", "shift_date")),
+    ]),
+    (3, "composite indexes for daily_keep and notifications", [
+        ("index", "daily_keep", "idx_daily_keep_user_date", ("user_id", "daily_keep_date")),
+        ("index", "notifications", "idx_notifications_user_created", ("user_id", "created_at")),
+    ]),
+    # SQLite doesn't index foreign keys implicitly; on MySQL this replaces the implicit FK index
+    (4, "index bills.user_id", [
+        ("index", "bills", "idx_bills_user", ("user_id",)),
+    ]),
+    (5, "monthly_rollups table maintained by rollups.py", [
+        ("sql",
+         "CREATE TABLE IF NOT EXISTS monthly_rollups ("
+         "  user_id INT NOT NULL,"
+         "  year_num INT NOT NULL,"
+         "  month INT NOT NULL,"
+         "  gross_earnings DECIMAL(12,2) NOT NULL DEFAULT 0.00,"
+         "  net_earnings DECIMAL(12,2) NOT NULL DEFAULT 0.00,"
+         "  hours_worked DECIMAL(8,2) NOT NULL DEFAULT 0.00,"
+         "  bill_total DECIMAL(12,2) NOT NULL DEFAULT 0.00,"
+         "  net_after_bills DECIMAL(12,2) NOT NULL DEFAULT 0.00,"
+         "  percentage_after_bills DECIMAL(10,2) NOT NULL DEFAULT 0.00,"
+         "  PRIMARY KEY (user_id, year_num, month)"
+         ") ENGINE=InnoDB"),
+    ]),
+    # get_employee_salary_details always read this table but nothing created it
+    (6, "weekly_earnings ISO-week ledger", [
+        ("sql",
+         "CREATE TABLE IF NOT EXISTS weekly_earnings ("
+         "  user_id INT NOT NULL,"
+         "  year_num INT NOT NULL,"
+         "  week_number INT NOT NULL,"
+         "  earnings_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,"
+         "  PRIMARY KEY (user_id, year_num, week_number)"
+         ") ENGINE=InnoDB"),
+        ("column", "weekly_earnings", "hours_worked", "DECIMAL(8,2) NOT NULL DEFAULT 0.00"),
+    ]),
+    # roster.ROSTER_SQL: employees by employer, then a covering range per employee
+    (7, "indexes for the employer roster", [
+        ("index", "users", "idx_users_creator_role", ("created_by", "role")),
+        ("index", "shifts", "idx_shifts_employee_date_totals",
+         ("employee_id", "shift_date", "hours_worked", "weekly_earning")),
+    ]),
+    # payroll.pay_run re-prices approved shifts and needs to know which were overtime
+    (8, "shifts.is_overtime", [
+        ("column", "shifts", "is_overtime", "TINYINT(1) NOT NULL DEFAULT 0"),
+    ]),
+    # written once per month by payslips.close_month; payslip_runs marks closed employers
+    (9, "payslips and payslip_runs", [
+        ("sql",
+         "CREATE TABLE IF NOT EXISTS payslips ("
+         "  payslip_id INT AUTO_INCREMENT PRIMARY KEY,"
+         "  user_id INT NOT NULL,"
+         "  employer_id INT NOT NULL,"
+         "  year_num INT NOT NULL,"
+         "  month INT NOT NULL,"
+         "  tax_year INT NOT NULL,"
+         "  tax_period INT NOT NULL,"
+         "  shifts INT NOT NULL DEFAULT 0,"
+         "  hours_worked DECIMAL(8,2) NOT NULL DEFAULT 0.00,"
+         "  gross_pay DECIMAL(12,2) NOT NULL DEFAULT 0.00,"
+         "  tax DECIMAL(12,2) NOT NULL DEFAULT 0.00,"
+         "  net_pay DECIMAL(12,2) NOT NULL DEFAULT 0.00,"
+         "  bill_total DECIMAL(12,2) NOT NULL DEFAULT 0.00,"
+         "  net_after_bills DECIMAL(12,2) NOT NULL DEFAULT 0.00,"
+         "  generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,"
+         "  UNIQUE (user_id, year_num, month)"
+         ") ENGINE=InnoDB"),
+        ("sql",
+         "CREATE TABLE IF NOT EXISTS payslip_runs ("
+         "  employer_id INT NOT NULL,"
+         "  year_num INT NOT NULL,"
+         "  month INT NOT NULL,"
+         "  payslips INT NOT NULL DEFAULT 0,"
+         "  completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,"
+         "  PRIMARY KEY (employer_id, year_num, month)"
+         ") ENGINE=InnoDB"),
+    ]),
+    # keyset pages of an employee's submitted shifts; the other paged routes already have
+    # (filter..., date) indexes, and both engines append the primary key to secondary indexes
+    (10, "index for paging submitted shifts", [
+        ("index", "shifts", "idx_shifts_employee_type_date", ("employee_id", "shift_type", "shift_date")),
+    ]),
+    # pending_queue.py: an employer's queue is reached through users.created_by, then per employee
+    (11, "pending queue claims and index", [
+        ("column", "shifts", "claimed_by", "INT NULL"),
+        ("column", "shifts", "claimed_at", "DATETIME NULL"),
+        ("index", "shifts", "idx_shifts_employee_type_status",
+         ("employee_id", "shift_type", "status", "shift_date")),
+    ]),
+    # outbox.py: approvals write one event row; the dispatcher turns it into a notification
+    # and deletes it, so the table only ever holds the undispatched backlog
+    (12, "notification outbox", [
+        ("sql",
+         "CREATE TABLE IF NOT EXISTS notification_outbox ("
+         "  event_id INT AUTO_INCREMENT PRIMARY KEY,"
+         "  event_type VARCHAR(30) NOT NULL,"
+         "  user_id INT NOT NULL,"
+         "  shift_id INT NULL,"
+         "  shift_date DATE NULL,"
+         "  amount DECIMAL(10,2) NULL,"
+         "  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+         ") ENGINE=InnoDB"),
+    ]),
+    # notification streams read a user's rows newer than the last id they sent
+    (13, "index for notifications since an id", [
+        ("index", "notifications", "idx_notifications_user_id", ("user_id", "notification_id")),
+    ]),
+    # per-user unread badge, maintained by Storage.add_unread() / mark_notification(s)_read()
+    (14, "notification unread counters", [
+        ("sql",
+         "CREATE TABLE IF NOT EXISTS notification_counters ("
+         "  user_id INT PRIMARY KEY,"
+         "  unread INT NOT NULL DEFAULT 0"
+         ") ENGINE=InnoDB"),
+        ("sql",
+         "INSERT INTO notification_counters (user_id, unread) "
+         "SELECT user_id, COUNT(*) FROM notifications WHERE is_read = FALSE GROUP BY user_id"),
+    ]),
+    # retention.py walks old notifications by age and records each archive run
+    (15, "notification retention", [
+        ("index", "notifications", "idx_notifications_created", ("created_at",)),
+        ("sql",
+         "CREATE TABLE IF NOT EXISTS notification_archive_runs ("
+         "  run_id INT AUTO_INCREMENT PRIMARY KEY,"
+         "  started_at DATETIME NOT NULL,"
+         "  finished_at DATETIME NULL,"
+         "  cutoff DATETIME NOT NULL,"
+         "  archived INT NOT NULL DEFAULT 0,"
+         "  files INT NOT NULL DEFAULT 0,"
+         "  bytes BIGINT NOT NULL DEFAULT 0"
+         ") ENGINE=InnoDB"),
+    ]),
+    # chat_store.py: assistant history per user, replacing budget_assistant.txt
+    (16, "chat_messages", [
+        ("sql",
+         "CREATE TABLE IF NOT EXISTS chat_messages ("
+         "  message_id INT AUTO_INCREMENT PRIMARY KEY,"
+         "  user_id INT NOT NULL,"
+         "  user_message TEXT NOT NULL,"
+         "  assistant_response TEXT NOT NULL,"
+         "  created_at DATETIME NOT NULL,"
+         "  source VARCHAR(10) NOT NULL DEFAULT 'api'"
+         ") ENGINE=InnoDB"),
+        ("index", "chat_messages", "idx_chat_messages_user", ("user_id", "message_id")),
+    ]),
+    # assistant_context.py: per-user rolling summary of turns that left the prompt window
+    (17, "chat_summaries", [
+        ("sql",
+         "CREATE TABLE IF NOT EXISTS chat_summaries ("
+         "  user_id INT PRIMARY KEY,"
+         "  through_id INT NOT NULL DEFAULT 0,"
+         "  summary TEXT NOT NULL,"
+         "  updated_at DATETIME NULL"
+         ") ENGINE=InnoDB"),
+    ]),
+    # search.py: full-text index over chat turns and bill names, backfilled from both tables
+    (18, "search index", [
+        ("sql_on", "sqlite", SEARCH_DDL["sqlite"]),
+        ("sql_on", "mysql", SEARCH_DDL["mysql"]),
+        ("sql_on", "sqlite", backfill_sql("sqlite", "chat")),
+        ("sql_on", "sqlite", backfill_sql("sqlite", "bill")),
+        ("sql_on", "mysql", backfill_sql("mysql", "chat")),
+        ("sql_on", "mysql", backfill_sql("mysql", "bill")),
+    ]),
+]
+
+MIGRATION_LOCK = "salary_management_migrations"
+
+
+# --- Helpers ---
+def dialect_of(conn):
+    """'sqlite' for storage.SQLiteConnection, otherwise 'mysql'."""
+    return getattr(conn, "dialect", "mysql")
+
+
+def _ddl(dialect, statement):
+    if dialect == "sqlite":
+        from storage import translate_ddl
+        return translate_ddl(statement)
+    return statement
+
+
+def _ensure_version_table(cur, dialect="mysql"):
+    cur.execute(_ddl(dialect,
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "  version INT PRIMARY KEY,"
+        "  description VARCHAR(255) NOT NULL,"
+        "  applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+        ") ENGINE=InnoDB"
+    ))
+
+
+def applied_versions(cur, dialect="mysql"):
+    """Set of migration versions already recorded in schema_version."""
+    _ensure_version_table(cur, dialect)
+    cur.execute("SELECT version FROM schema_version")
+    return {int(r[0]) for r in cur.fetchall()}
+
+
+def _index_exists(cur, table, name, dialect="mysql"):
+    if dialect == "sqlite":
+        cur.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = %s", (name,))
+        return cur.fetchone()[0] > 0
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+        (table, name)
+    )
+    return cur.fetchone()[0] > 0
+
+
+def _column_exists(cur, table, column, dialect="mysql"):
+    if dialect == "sqlite":
+        cur.execute(f"PRAGMA table_info({table})")
+        return any(r[1] == column for r in cur.fetchall())
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    return cur.fetchone()[0] > 0
+
+
+def _apply_step(cur, step, dialect="mysql"):
+    kind = step[0]
+    if kind == "column":
+        _, table, column, definition = step
+        if not _column_exists(cur, table, column, dialect):
+            cur.execute(_ddl(dialect, f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+    elif kind == "index":
+        _, table, name, columns = step
+        if not _index_exists(cur, table, name, dialect):
+            cur.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+    elif kind == "sql":
+        cur.execute(_ddl(dialect, step[1]))
+    elif kind == "sql_on":
+        if step[1] == dialect:
+            cur.execute(step[2])
+    else:
+        raise ValueError(f"Unknown migration step: {kind}")
+
+
+# --- Runner ---
+def apply_migrations(conn, verbose=False):
+    """Apply pending migrations in order. Safe to call on every startup; returns versions applied."""
+    dialect = dialect_of(conn)
+    cur = conn.cursor()
+    applied = []
+    try:
+        # serialize concurrent workers starting at the same time (SQLite locks the whole file anyway)
+        if dialect == "mysql":
+            cur.execute("SELECT GET_LOCK(%s, 30)", (MIGRATION_LOCK,))
+            cur.fetchone()
+        try:
+            done = applied_versions(cur, dialect)
+            for version, description, steps in sorted(MIGRATIONS, key=lambda m: m[0]):
+                if version in done:
+                    continue
+                for step in steps:
+                    _apply_step(cur, step, dialect)
+                cur.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                conn.commit()
+                applied.append(version)
+                if verbose:
+                    print(f"Applied migration {version}: {description}")
+        finally:
+            if dialect == "mysql":
+                cur.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+                cur.fetchone()
+    finally:
+        cur.close()
+    return applied
+
+
+def migrate(verbose=False):
+    """Open a connection and apply pending migrations (used on API startup)."""
+    from budgetset import get_conn
+    conn = get_conn()
+    if not conn:
+        print("DB unavailable — skipping migrations")
+        return []
+    try:
+        return apply_migrations(conn, verbose=verbose)
+    except Exception as e:
+        print("Migration error:", e)
+        return []
+    finally:
+        conn.close()
+
+
+# --- Query plan check ---
+# The queries the hot routes run, with representative parameters. `check_query_plans`
+# EXPLAINs each one and reports any table read with a full scan (type ALL, no key),
+# and for the paged and streamed queries in INDEX_ORDER_QUERIES also any sort the index does not provide.
+_today = date.today()
+HOT_QUERIES = {
+    "get_bills": (
+        "SELECT bill_id, bill_name, bill_amount FROM bills WHERE user_id=%s",
+        (1,)
+    ),
+    "calc_daily_salary": (
+        "SELECT daily_keep_amount, daily_hours_worked FROM daily_keep "
+        "WHERE user_id = %s ORDER BY daily_keep_date DESC LIMIT 1",
+        (1,)
+    ),
+    # keyset pages (pagination.keyset_page), shown with a cursor
+    "get_daily_salaries": (
+        "SELECT daily_keep_date, daily_keep_amount, daily_keep_id FROM daily_keep WHERE user_id=%s"
+        " AND daily_keep_date <= %s AND (daily_keep_date < %s OR daily_keep_id < %s)"
+        " ORDER BY daily_keep_date DESC, daily_keep_id DESC LIMIT %s",
+        (1, _today, _today, 1000, 51)
+    ),
+    "get_pending_shifts": (
+        "SELECT s.shift_id, s.shift_name, s.shift_date, s.start_time, s.end_time, "
+        "s.hours_worked, s.status, u.username, u.user_id "
+        "FROM shifts s JOIN users u ON s.employee_id = u.user_id "
+        "WHERE s.created_by = %s AND s.status = 'pending'"
+        " AND s.shift_date <= %s AND (s.shift_date < %s OR s.shift_id < %s)"
+        " ORDER BY s.shift_date DESC, s.shift_id DESC LIMIT %s",
+        (1, _today, _today, 1000, 51)
+    ),
+    "get_pending_employee_shifts": (
+        f"SELECT {QUEUE_COLUMNS} {QUEUE_FROM}"
+        " AND s.shift_date <= %s AND (s.shift_date < %s OR s.shift_id < %s)"
+        " ORDER BY s.shift_date DESC, s.shift_id DESC LIMIT %s",
+        (1, _today, _today, 1000, 51)
+    ),
+    "pending_employee_count": (
+        f"SELECT COUNT(*) {QUEUE_FROM}",
+        (1,)
+    ),
+    "get_shifts": (
+        "SELECT shift_id, shift_name, shift_type, shift_date, start_time, end_time, "
+        "hours_worked, status, created_at FROM shifts WHERE employee_id = %s"
+        " AND shift_date <= %s AND (shift_date < %s OR shift_id < %s)"
+        " ORDER BY shift_date DESC, shift_id DESC LIMIT %s",
+        (1, _today, _today, 1000, 51)
+    ),
+    "get_employee_submitted_shifts": (
+        "SELECT shift_id, shift_name, shift_date, start_time, end_time, hours_worked, status, created_at "
+        "FROM shifts WHERE employee_id = %s AND shift_type = 'employee_submitted'"
+        " AND shift_date <= %s AND (shift_date < %s OR shift_id < %s)"
+        " ORDER BY shift_date DESC, shift_id DESC LIMIT %s",
+        (1, _today, _today, 1000, 51)
+    ),
+    "get_notifications": (
+        "SELECT notification_id, shift_id, notification_type, message, is_read, created_at "
+        "FROM notifications WHERE user_id = %s ORDER BY created_at DESC LIMIT 20",
+        (1,)
+    ),
+    "notifications_since": (
+        "SELECT notification_id, shift_id, notification_type, message, is_read, created_at "
+        "FROM notifications WHERE user_id = %s AND notification_id > %s ORDER BY notification_id LIMIT %s",
+        (1, 0, 100)
+    ),
+    "archive_notifications": (
+        ARCHIVE_SQL + " AND created_at >= %s AND (created_at > %s OR notification_id > %s)"
+        " ORDER BY created_at, notification_id LIMIT %s",
+        (_today, _today - timedelta(days=1), _today - timedelta(days=1), 0, 5000)
+    ),
+    "chat_history": (
+        f"SELECT {CHAT_COLUMNS} FROM chat_messages WHERE user_id = %s AND message_id < %s "
+        "ORDER BY message_id DESC LIMIT %s",
+        (1, 1000, 51)
+    ),
+    "unread_count": (
+        "SELECT unread FROM notification_counters WHERE user_id = %s",
+        (1,)
+    ),
+    "monthly_gross": (
+        "SELECT COALESCE(SUM(daily_keep_amount), 0) FROM daily_keep "
+        "WHERE daily_keep_date >= %s AND daily_keep_date < %s AND user_id = %s",
+        Period.month(_today).clause("daily_keep_date")[1] + (1,)
+    ),
+    "monthly_net": (
+        "SELECT COALESCE(SUM(weekly_earning), 0) FROM shifts "
+        "WHERE shift_date >= %s AND shift_date < %s AND employee_id = %s",
+        Period.month(_today).clause("shift_date")[1] + (1,)
+    ),
+    "monthly_rollup": (
+        "SELECT gross_earnings, net_earnings, hours_worked, bill_total, net_after_bills, percentage_after_bills "
+        "FROM monthly_rollups WHERE user_id = %s AND year_num = %s AND month = %s",
+        (1, _today.year, _today.month)
+    ),
+    "employer_roster": (
+        ROSTER_SQL.format(range_sql="s.shift_date >= %s AND s.shift_date < %s"),
+        Period.month(_today).clause("s.shift_date")[1] + (1,)
+    ),
+    "payslip": (
+        "SELECT gross_pay, tax, net_pay FROM payslips WHERE user_id = %s AND year_num = %s AND month = %s",
+        (1, _today.year, _today.month)
+    ),
+    # streamed exports (export.py) for a whole employer, the widest ones
+    "export_earnings": export_query("earnings", "employer", 1, _today.replace(day=1))[:2],
+    "export_shifts": export_query("shifts", "employer", 1, _today.replace(day=1))[:2],
+    "weekly_earnings": (
+        "SELECT earnings_amount, hours_worked FROM weekly_earnings "
+        "WHERE user_id = %s AND year_num = %s AND week_number = %s",
+        (1,) + tuple(_today.isocalendar())[:2]
+    ),
+}
+
+# Pages and exports must be read in index order; a sort would touch every matching row.
+# get_pending_employee_shifts merges the employer's employees and sorts only their pending items.
+INDEX_ORDER_QUERIES = {
+    "get_daily_salaries", "get_pending_shifts",
+    "get_shifts", "get_employee_submitted_shifts", "export_earnings", "export_shifts", "notifications_since",
+    "archive_notifications", "chat_history", "search_window", "search_older",
+}
+
+
+def hot_queries(dialect):
+    """HOT_QUERIES plus the queries whose SQL differs by backend (full-text search)."""
+    queries = dict(HOT_QUERIES, search=search_sql(dialect, 1, ["rent", "budget"], limit=21))
+    if dialect == "sqlite":
+        # search.search(): the rank window's boundary, and the older matches after it in index order
+        queries.update(search_window=rank_window_sql(1, ["rent", "budget"]),
+                       search_older=search_sql(dialect, 1, ["rent", "budget"], limit=21, boundary=1000, older=True))
+    return queries
+
+
+def _fts_match(detail):
+    # "SCAN search_index VIRTUAL TABLE INDEX 0:M6": FTS5 answers a MATCH (M) from its inverted index
+    return " VIRTUAL TABLE INDEX " in detail and "M" in detail.rsplit(":", 1)[-1]
+
+
+def check_query_plans(conn, queries=None):
+    """EXPLAIN each hot query; returns a list of (query_name, table, plan_row) full scans and page sorts."""
+    dialect = dialect_of(conn)
+    failures = []
+    cur = conn.cursor(dictionary=True)
+    try:
+        for name, (sql, params) in (queries or hot_queries(dialect)).items():
+            if dialect == "sqlite":
+                cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+                for row in cur.fetchall():
+                    detail = row.get("detail", "")
+                    # "SCAN shifts" is a table scan; "SCAN s USING INDEX ..." walks an index
+                    if detail.startswith("SCAN ") and " USING " not in detail and not _fts_match(detail):
+                        failures.append((name, detail.split()[1], row))
+                    elif name in INDEX_ORDER_QUERIES and "TEMP B-TREE FOR ORDER BY" in detail:
+                        failures.append((name, "sort", row))
+                continue
+            cur.execute("EXPLAIN " + sql, params)
+            for row in cur.fetchall():
+                if row.get("type") == "ALL" and not row.get("key"):
+                    failures.append((name, row.get("table"), row))
+                elif name in INDEX_ORDER_QUERIES and "filesort" in (row.get("Extra") or ""):
+                    failures.append((name, row.get("table"), row))
+    finally:
+        cur.close()
+    return failures
+
+
+def main(argv):
+    from budgetset import get_conn
+    command = argv[1] if len(argv) > 1 else "up"
+    conn = get_conn()
+    if not conn:
+        print("DB unavailable")
+        return 1
+    try:
+        if command == "up":
+            applied = apply_migrations(conn, verbose=True)
+            if not applied:
+                print("Schema is up to date")
+        elif command == "status":
+            cur = conn.cursor()
+            try:
+                done = applied_versions(cur, dialect_of(conn))
+            finally:
+                cur.close()
+            for version, description, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+                state = "applied" if version in done else "pending"
+                print(f"{version:>4}  {state:<8} {description}")
+        elif command == "check":
+            failures = check_query_plans(conn)
+            for name, table, row in failures:
+                kind = "SORT" if table == "sort" or "filesort" in (row.get("Extra") or "") else "FULL SCAN"
+                print(f"{kind} in {name}: table {table} ({row.get('rows', row.get('detail'))})")
+            if failures:
+                return 1
+            print(f"All {len(hot_queries(dialect_of(conn)))} hot queries use an index")
+        else:
+            print(__doc__)
+            return 2
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,272 @@
+"""Transactional outbox for shift notifications, drained by a background dispatcher.
+
+Approval and rejection transactions only write a compact event row to
+`notification_outbox` with `enqueue_events()`; the notification text is formatted
+and the `notifications` rows are written later, in batches, by `dispatch_batch()`.
+A dispatched event is deleted in the same transaction that writes its notification,
+so every committed event produces exactly one notification row (and one count
+on the recipient's unread counter). Push channels
+registered with `register_channel()` are called after that commit; the first one,
+pubsub.publish_notifications, wakes the recipients' notification streams.
+
+The dispatcher runs as a thread inside the API process (OUTBOX_DISPATCHER=thread,
+the default) or as its own process, with the API side switched off:
+
+    OUTBOX_DISPATCHER=off python api_server.py
+    python outbox.py run          # dispatcher process; several may run side by side
+    python outbox.py drain        # dispatch everything pending, then exit
+    python outbox.py status
+    python outbox.py rebuild-unread [--user 42]   # recount notification_counters
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pubsub import publish_notifications
+from storage import get_storage
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_DISPATCHER = os.getenv("OUTBOX_DISPATCHER", "thread").lower()
+
+# event_type -> (notification_type, message template)
+EVENTS = {
+    "shift_approved": ("shift_approved", "Your shift on {shift_date} has been approved! Earned: £{amount:.2f}"),
+    "shift_rejected": ("shift_rejected", "Your shift on {shift_date} has been rejected."),
+}
+
+_channels = [publish_notifications]
+
+
+# --- Write side ---
+def shift_approved(employee_id, shift_id, shift_date, amount):
+    return ("shift_approved", employee_id, shift_id, shift_date, amount)
+
+
+def shift_rejected(employee_id, shift_id, shift_date):
+    return ("shift_rejected", employee_id, shift_id, shift_date, None)
+
+
+def enqueue_events(cur, events):
+    """Record (event_type, user_id, shift_id, shift_date, amount) events in the caller's transaction.
+
+    Call wake_dispatcher() once the transaction has committed.
+    """
+    events = list(events)
+    for event in events:
+        if event[0] not in EVENTS:
+            raise ValueError(f"Unknown outbox event: {event[0]}")
+    if events:
+        cur.executemany(
+            "INSERT INTO notification_outbox (event_type, user_id, shift_id, shift_date, amount) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            events
+        )
+    return len(events)
+
+
+# --- Dispatch ---
+def register_channel(fn):
+    """Call fn(notifications) with each dispatched batch, after it has been committed.
+
+    `notifications` is a list of dicts with user_id, shift_id, notification_type,
+    message and created_at. A failing channel is logged and does not stop dispatch.
+    """
+    if fn not in _channels:
+        _channels.append(fn)
+    return fn
+
+
+def _notification(row):
+    event_id, event_type, user_id, shift_id, shift_date, amount, created_at = row
+    notification_type, template = EVENTS[event_type]
+    message = template.format(shift_date=shift_date, amount=float(amount or 0))
+    return {'user_id': user_id, 'shift_id': shift_id, 'notification_type': notification_type,
+            'message': message, 'created_at': created_at}
+
+
+def dispatch_batch(conn, batch_size=None):
+    """Turn up to `batch_size` of the oldest events into notification rows; returns how many.
+
+    Events locked by a concurrent dispatcher are skipped rather than waited for.
+    """
+    batch_size = max(1, int(batch_size or OUTBOX_BATCH_SIZE))
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT event_id, event_type, user_id, shift_id, shift_date, amount, created_at "
+            "FROM notification_outbox ORDER BY event_id LIMIT %s FOR UPDATE SKIP LOCKED",
+            (batch_size,)
+        )
+        rows = cur.fetchall()
+        if not rows:
+            conn.rollback()
+            return 0
+        notifications = [_notification(row) for row in rows]
+        cur.executemany(
+            "INSERT INTO notifications (user_id, shift_id, notification_type, message, created_at) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(n['user_id'], n['shift_id'], n['notification_type'], n['message'], n['created_at'])
+             for n in notifications]
+        )
+        get_storage().add_unread(cur, Counter(n['user_id'] for n in notifications))
+        cur.executemany("DELETE FROM notification_outbox WHERE event_id = %s", [(row[0],) for row in rows])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    for channel in list(_channels):
+        try:
+            channel(notifications)
+        except Exception as e:
+            print(f"Notification channel {getattr(channel, '__name__', channel)} failed: {e}")
+    return len(rows)
+
+
+def drain(batch_size=None):
+    """Dispatch batches until the outbox is empty; returns the number of events dispatched."""
+    total = 0
+    conn = get_storage().connect()
+    try:
+        while True:
+            count = dispatch_batch(conn, batch_size)
+            total += count
+            if count < max(1, int(batch_size or OUTBOX_BATCH_SIZE)):
+                return total
+    finally:
+        conn.close()
+
+
+def outbox_stats(cur):
+    """{'pending': events waiting, 'oldest': created_at of the oldest one or None, ...}."""
+    cur.execute("SELECT COUNT(*), MIN(created_at) FROM notification_outbox")
+    pending, oldest = cur.fetchone()
+    stats = {'pending': int(pending), 'oldest': str(oldest) if oldest else None}
+    if _dispatcher:
+        stats.update(_dispatcher.stats())
+    return stats
+
+
+class Dispatcher:
+    """Background thread that drains the outbox when woken, and every `poll_seconds` regardless."""
+
+    def __init__(self, batch_size=OUTBOX_BATCH_SIZE, poll_seconds=OUTBOX_POLL_SECONDS):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.dispatched = 0
+        self.errors = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.dispatched += drain(self.batch_size)
+            except Exception as e:
+                self.errors += 1
+                print(f"Outbox dispatch failed: {e}")
+            self._wake.wait(self.poll_seconds)
+
+    def stats(self):
+        return {'dispatcher': 'running' if self._thread and self._thread.is_alive() else 'stopped',
+                'dispatched': self.dispatched, 'errors': self.errors}
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def start_dispatcher():
+    """Start this process's dispatcher thread unless OUTBOX_DISPATCHER=off; returns it or None."""
+    global _dispatcher
+    if OUTBOX_DISPATCHER == "off":
+        return None
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = Dispatcher()
+        return _dispatcher.start()
+
+
+def wake_dispatcher():
+    """Tell the dispatcher new events were committed (starts it on first use)."""
+    dispatcher = start_dispatcher()
+    if dispatcher:
+        dispatcher.wake()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Notification outbox dispatcher")
+    parser.add_argument("command", choices=("run", "drain", "status", "rebuild-unread"))
+    parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE)
+    parser.add_argument("--poll-seconds", type=float, default=OUTBOX_POLL_SECONDS)
+    parser.add_argument("--user", type=int, help="rebuild-unread: only this user")
+    args = parser.parse_args(argv[1:])
+
+    if args.command == "rebuild-unread":
+        storage = get_storage()
+        conn = storage.connect()
+        cur = conn.cursor()
+        try:
+            users = storage.rebuild_unread_counts(cur, args.user)
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        print(f"Rebuilt unread counters for {users} users")
+        return 0
+
+    if args.command == "status":
+        conn = get_storage().connect()
+        cur = conn.cursor()
+        try:
+            stats = outbox_stats(cur)
+        finally:
+            cur.close()
+            conn.close()
+        print(f"{stats['pending']} events pending, oldest {stats['oldest'] or '-'}")
+        return 0
+    if args.command == "drain":
+        print(f"Dispatched {drain(args.batch_size)} events")
+        return 0
+
+    print(f"Dispatching outbox events every {args.poll_seconds}s in batches of {args.batch_size} (Ctrl+C stops)")
+    dispatched = 0
+    try:
+        while True:
+            try:
+                count = drain(args.batch_size)
+            except Exception as e:
+                print(f"Outbox dispatch failed: {e}")
+                count = 0
+            dispatched += count
+            if not count:
+                time.sleep(args.poll_seconds)
+    except KeyboardInterrupt:
+        print(f"Stopped after dispatching {dispatched} events")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,68 @@
+"""Keyset (cursor) pagination for list routes ordered newest first by (date, id).
+
+A page is the next `limit` rows strictly after the last row of the previous page
+in (date DESC, id DESC) order, so each page is one index range read however long
+the history is. The cursor handed back to the client encodes that last (date, id).
+
+    limit, cursor = page_args(request.args)
+    rows, next_cursor = keyset_page(cur, sql, params, "s.shift_date", "s.shift_id", limit, cursor, key=(2, 0))
+"""
+import base64
+import binascii
+from datetime import date
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(day, row_id):
+    """Opaque cursor for the row at (day, row_id)."""
+    raw = f"{str(day)[:10]}|{int(row_id)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """(date, id) from a cursor made by encode_cursor(); raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        day, row_id = raw.split("|")
+        return date.fromisoformat(day), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+
+
+def page_args(args):
+    """(limit, cursor) from request args `limit` and `cursor`; raises ValueError on bad values."""
+    limit = args.get('limit', DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be a number") from None
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    token = args.get('cursor')
+    return min(limit, MAX_PAGE_SIZE), (decode_cursor(token) if token else None)
+
+
+def keyset_page(cur, select_sql, params, date_col, id_col, limit, cursor=None, key=(0, 1)):
+    """One page of `select_sql` (a SELECT ... WHERE without ORDER BY or LIMIT).
+
+    `key` gives the positions of the date and id columns in each row. Returns
+    (rows, next_cursor); next_cursor is None on the last page.
+    """
+    after, after_params = "", ()
+    if cursor:
+        day, row_id = cursor
+        # the leading `date <=` bound is what both engines turn into an index range seek;
+        # the OR only filters rows sharing the cursor's date
+        after = f" AND {date_col} <= %s AND ({date_col} < %s OR {id_col} < %s)"
+        after_params = (day, day, row_id)
+    cur.execute(
+        f"{select_sql}{after} ORDER BY {date_col} DESC, {id_col} DESC LIMIT %s",
+        tuple(params) + after_params + (limit + 1,)
+    )
+    rows = cur.fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][key[0]], rows[-1][key[1]])
@@ -0,0 +1,175 @@
+"""Vectorised payroll: shift pay, per-employee totals and income tax over NumPy arrays.
+
+One set of rules serves a single approval (`shift_earnings`), a batch of approvals
+and a whole-employer pay run (`pay_run`), so every path pays a shift the same way.
+
+    shift_earnings_array(hours, rates, overtime)  pay per shift after the unpaid break
+    employee_totals(employee_ids, hours, pay)     shifts / hours / gross per employee
+    compute_payroll(...)                          the above plus PAYE (tax_engine) per employee
+    pay_run(cur, employer_id, period)             all of the above for an employer's approved shifts
+"""
+import numpy as np
+from periods import Period
+from rollups import year_to_date
+from tax_engine import month1_tax, paye_batch, tax_period_of_month
+
+# Unpaid break by shift length: under 6h none, from 6h a quarter hour, from 8h half an hour
+BREAK_THRESHOLDS = np.array([6.0, 8.0])
+BREAK_HOURS = np.array([0.0, 0.25, 0.5])
+OVERTIME_MULTIPLIER = 1.5
+
+LOAD_CHUNK_SIZE = 50000
+
+
+def round_pence(values):
+    """Round to the penny, halves away from zero.
+
+    np.round() rounds halves to even and Python's round() follows the binary value,
+    so 194.265 could come out either way; the small nudge absorbs float error on
+    amounts that are exactly half a penny in decimal.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return np.sign(values) * np.floor(np.abs(values) * 100 + 0.5 + 1e-7) / 100
+
+
+# --- Shift pay ---
+def break_hours_array(hours):
+    """Unpaid break for each shift length in `hours`."""
+    return BREAK_HOURS[np.searchsorted(BREAK_THRESHOLDS, np.round(hours, 2), side="right")]
+
+
+def shift_earnings_array(hours, rates, overtime=None):
+    """Pay per shift: (hours - break) * rate, times 1.5 where `overtime` is set, rounded to the penny."""
+    hours = np.asarray(hours, dtype=np.float64)
+    rates = np.nan_to_num(np.asarray(rates, dtype=np.float64))
+    multiplier = 1.0 if overtime is None else np.where(np.asarray(overtime, dtype=bool), OVERTIME_MULTIPLIER, 1.0)
+    return round_pence((hours - break_hours_array(hours)) * rates * multiplier)
+
+
+def shift_earnings(hours_worked, hourly_rate, overtime=False):
+    """Scalar form of shift_earnings_array() for one shift."""
+    if not hourly_rate:
+        return 0.0
+    return float(shift_earnings_array([float(hours_worked)], [float(hourly_rate)], [overtime])[0])
+
+
+# --- Tax ---
+def monthly_tax_array(gross, tax_year=None):
+    """Income tax on each month's gross taken on its own (month 1 basis); see tax_engine for PAYE."""
+    if tax_year is None:
+        tax_year = Period.tax_year().start.year
+    return month1_tax(np.asarray(gross, dtype=np.float64), tax_year)
+
+
+def monthly_tax(gross_salary):
+    return float(monthly_tax_array(np.array([float(gross_salary)]))[0])
+
+
+# --- Aggregation ---
+def employee_totals(employee_ids, hours, earnings):
+    """Per-employee shift count, hours and gross; returns arrays keyed by the sorted unique ids."""
+    ids, inverse = np.unique(np.asarray(employee_ids), return_inverse=True)
+    return {
+        "employee_id": ids,
+        "shifts": np.bincount(inverse, minlength=len(ids)),
+        "hours": round_pence(np.bincount(inverse, weights=hours, minlength=len(ids))),
+        "gross": round_pence(np.bincount(inverse, weights=earnings, minlength=len(ids))),
+    }
+
+
+def compute_payroll(employee_ids, hours, rates, overtime=None, ytd_before=None, period=1, tax_year=None,
+                    recorded=None):
+    """Per-employee gross, tax and net for a set of shifts given as parallel arrays.
+
+    `ytd_before` maps employee_id to gross paid earlier in the tax year; with it, tax is
+    cumulative PAYE for tax `period`, otherwise each employee is taxed on month 1 basis.
+    `recorded` is the pay already recorded per shift (NaN where none); those shifts
+    keep it instead of being re-priced at `rates`.
+    """
+    earnings = shift_earnings_array(hours, rates, overtime)
+    if recorded is not None:
+        recorded = np.asarray(recorded, dtype=np.float64)
+        earnings = np.where(np.isnan(recorded), earnings, recorded)
+    totals = employee_totals(employee_ids, np.asarray(hours, dtype=np.float64), earnings)
+    if tax_year is None:
+        tax_year = Period.tax_year().start.year
+    if ytd_before is None:
+        totals["tax"] = np.asarray(monthly_tax_array(totals["gross"], tax_year))
+    else:
+        before = np.array([ytd_before.get(int(e), 0.0) for e in totals["employee_id"]], dtype=np.float64)
+        totals["tax"] = np.asarray(paye_batch(before, totals["gross"], np.full(len(before), period), tax_year))
+    totals["net"] = round_pence(totals["gross"] - totals["tax"])
+    return totals
+
+
+# --- Pay run ---
+def load_approved_shifts(cur, employer_id, period, chunk_size=LOAD_CHUNK_SIZE):
+    """Approved shifts of the employer's employees in `period` as arrays (employee_id, hours, rate, overtime, recorded).
+
+    `recorded` is the shift's weekly_earning, the pay recorded at approval, or NaN
+    where none was recorded (0); only those shifts are priced at the current rate.
+    """
+    range_sql, range_params = period.clause("s.shift_date")
+    cur.execute(
+        "SELECT s.employee_id, s.hours_worked, u.hourly_rate, s.is_overtime, s.weekly_earning "
+        "FROM users u JOIN shifts s ON s.employee_id = u.user_id "
+        f"WHERE u.created_by = %s AND u.role = 'employee' AND s.status = 'approved' AND {range_sql}",
+        (employer_id,) + tuple(range_params)
+    )
+    chunks = []
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        chunks.append(np.array([tuple(float(v or 0) for v in row) for row in rows], dtype=np.float64))
+    data = np.concatenate(chunks) if chunks else np.empty((0, 5))
+    return {
+        "employee_id": data[:, 0].astype(np.int64),
+        "hours": data[:, 1],
+        "rate": data[:, 2],
+        "overtime": data[:, 3] != 0,
+        "recorded": np.where(data[:, 4] != 0, data[:, 4], np.nan),
+    }
+
+
+def pay_run(cur, employer_id, period=None):
+    """Gross, tax and net for every employee of `employer_id` from their approved shifts in `period` (a month).
+
+    Shifts are paid what was recorded at approval (shifts.weekly_earning), so a later
+    rate change does not re-price them. Tax is cumulative PAYE: earlier months of the
+    tax year come from the recorded shift earnings in monthly_rollups.
+    """
+    period = period or Period.month()
+    tax_year, tax_period = tax_period_of_month(period.start.year, period.start.month)
+    ytd_before = year_to_date(cur, period.start.year, period.start.month, "net_earnings", employer_id=employer_id)
+    shifts = load_approved_shifts(cur, employer_id, period)
+    totals = compute_payroll(shifts["employee_id"], shifts["hours"], shifts["rate"], shifts["overtime"],
+                             ytd_before, tax_period, tax_year, shifts["recorded"])
+    cur.execute("SELECT user_id, username FROM users WHERE created_by = %s AND role = 'employee'", (employer_id,))
+    names = dict(cur.fetchall())
+    employees = [
+        {
+            'id': int(employee_id),
+            'name': names.get(int(employee_id)),
+            'shifts': int(count),
+            'hours': float(hours),
+            'gross': float(gross),
+            'tax': float(tax),
+            'net': float(net),
+        }
+        for employee_id, count, hours, gross, tax, net in zip(
+            totals["employee_id"], totals["shifts"], totals["hours"], totals["gross"], totals["tax"], totals["net"])
+    ]
+    return {
+        'employer_id': int(employer_id),
+        'period': {'start': period.start.isoformat(), 'end': period.end.isoformat(),
+                   'tax_year': tax_year, 'tax_period': tax_period},
+        'employees': employees,
+        'totals': {
+            'shifts': int(totals["shifts"].sum()),
+            'hours': round(float(totals["hours"].sum()), 2),
+            'gross': round(float(totals["gross"].sum()), 2),
+            'tax': round(float(totals["tax"].sum()), 2),
+            'net': round(float(totals["net"].sum()), 2),
+        },
+    }
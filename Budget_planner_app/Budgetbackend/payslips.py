@@ -0,0 +1,215 @@
+"""Month-end payslips: an immutable row per employee per month, written by a close job.
+
+The close job prices every employer's month with payroll.pay_run() (shift pay and
+cumulative PAYE), adds each employee's bill total, and writes `payslips` rows plus
+a `payslip_runs` marker per employer in one transaction. Employers are split into
+shards and the shards run across a ProcessPoolExecutor. An employer that already
+has a marker is skipped, so an interrupted job is resumed by running it again.
+
+    python payslips.py close                          # last month, one worker per CPU
+    python payslips.py close --year 2026 --month 9 --workers 4
+    python payslips.py status --year 2026 --month 9
+
+Payslip reads (`get_payslip`) are a single-row lookup on (user_id, year_num, month).
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from payroll import pay_run
+from periods import Period
+from storage import configure_storage, get_storage
+
+PAYSLIP_COLUMNS = (
+    "user_id", "employer_id", "year_num", "month", "tax_year", "tax_period", "shifts",
+    "hours_worked", "gross_pay", "tax", "net_pay", "bill_total", "net_after_bills",
+)
+
+
+# --- Close job ---
+def list_employers(cur):
+    """Every user_id that has employees."""
+    cur.execute("SELECT DISTINCT created_by FROM users WHERE role = 'employee' AND created_by IS NOT NULL")
+    return sorted(row[0] for row in cur.fetchall())
+
+
+def close_employer(cur, employer_id, period):
+    """Write the employer's payslips for `period`; returns how many, or None if it was already closed.
+
+    The caller commits; payslips and the run marker land in the same transaction.
+    """
+    year_num, month = period.start.year, period.start.month
+    cur.execute(
+        "SELECT payslips FROM payslip_runs WHERE employer_id = %s AND year_num = %s AND month = %s",
+        (employer_id, year_num, month)
+    )
+    if cur.fetchone():
+        return None
+    run = pay_run(cur, employer_id, period)
+    employees = run['employees']
+    bills = {}
+    if employees:
+        ids = [e['id'] for e in employees]
+        cur.execute(
+            "SELECT user_id, IFNULL(SUM(bill_amount), 0) FROM bills "
+            f"WHERE user_id IN ({', '.join(['%s'] * len(ids))}) GROUP BY user_id",
+            tuple(ids)
+        )
+        bills = {row[0]: float(row[1]) for row in cur.fetchall()}
+    storage = get_storage()
+    tax_year, tax_period = run['period']['tax_year'], run['period']['tax_period']
+    rows = [
+        (e['id'], employer_id, year_num, month, tax_year, tax_period, e['shifts'], e['hours'],
+         e['gross'], e['tax'], e['net'], round(bills.get(e['id'], 0.0), 2),
+         round(e['net'] - bills.get(e['id'], 0.0), 2))
+        for e in employees
+    ]
+    if rows:
+        cur.executemany(storage.insert_ignore_sql("payslips", PAYSLIP_COLUMNS), rows)
+    cur.execute(
+        storage.insert_ignore_sql("payslip_runs", ("employer_id", "year_num", "month", "payslips")),
+        (employer_id, year_num, month, len(rows))
+    )
+    return len(rows)
+
+
+def close_shard(employer_ids, year_num, month):
+    """Close the month for each employer in the shard, one transaction each. Returns a summary dict."""
+    period = Period.month(year_num, month)
+    summary = {'closed': 0, 'skipped': 0, 'payslips': 0, 'failed': []}
+    conn = get_storage().connect()
+    try:
+        for employer_id in employer_ids:
+            cur = conn.cursor()
+            try:
+                written = close_employer(cur, employer_id, period)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                summary['failed'].append((employer_id, str(e)))
+                continue
+            finally:
+                cur.close()
+            if written is None:
+                summary['skipped'] += 1
+            else:
+                summary['closed'] += 1
+                summary['payslips'] += written
+    finally:
+        conn.close()
+    return summary
+
+
+def _init_worker(backend, sqlite_path):
+    configure_storage(backend, sqlite_path)
+
+
+def close_month(year_num, month, workers=None, shards=None, employer_ids=None):
+    """Close `month` of `year_num` for the given (default: all) employers across a process pool."""
+    storage = get_storage()
+    if employer_ids is None:
+        conn = storage.connect()
+        cur = conn.cursor()
+        try:
+            employer_ids = list_employers(cur)
+        finally:
+            cur.close()
+            conn.close()
+    workers = max(1, workers or os.cpu_count() or 1)
+    shards = max(1, min(shards or workers * 4, len(employer_ids) or 1))
+    batches = [employer_ids[i::shards] for i in range(shards)]
+    total = {'employers': len(employer_ids), 'closed': 0, 'skipped': 0, 'payslips': 0, 'failed': []}
+
+    def merge(summary):
+        for key in ('closed', 'skipped', 'payslips'):
+            total[key] += summary[key]
+        total['failed'].extend(summary['failed'])
+
+    if workers == 1 or len(batches) == 1:
+        for batch in batches:
+            merge(close_shard(batch, year_num, month))
+        return total
+    if getattr(storage, "in_memory", False):
+        raise ValueError("An in-memory SQLite database cannot be shared with worker processes; use workers=1")
+    # spawn, not fork: children must not inherit the parent's pooled connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker,
+                             initargs=(storage.dialect, getattr(storage, "path", None))) as pool:
+        futures = [pool.submit(close_shard, batch, year_num, month) for batch in batches if batch]
+        for future in as_completed(futures):
+            merge(future.result())
+    return total
+
+
+# --- Reads ---
+def get_payslip(cur, user_id, year_num, month):
+    """The user's payslip for the month as a dict, or None if the month has not been closed."""
+    cur.execute(
+        f"SELECT {', '.join(PAYSLIP_COLUMNS)}, generated_at FROM payslips "
+        "WHERE user_id = %s AND year_num = %s AND month = %s",
+        (user_id, year_num, month)
+    )
+    row = cur.fetchone()
+    return _payslip(row) if row else None
+
+
+def list_payslips(cur, user_id, limit=12):
+    """The user's most recent payslips, newest first."""
+    cur.execute(
+        f"SELECT {', '.join(PAYSLIP_COLUMNS)}, generated_at FROM payslips "
+        "WHERE user_id = %s ORDER BY year_num DESC, month DESC LIMIT %s",
+        (user_id, int(limit))
+    )
+    return [_payslip(row) for row in cur.fetchall()]
+
+
+def _payslip(row):
+    slip = dict(zip(PAYSLIP_COLUMNS + ("generated_at",), row))
+    for key in ("hours_worked", "gross_pay", "tax", "net_pay", "bill_total", "net_after_bills"):
+        slip[key] = float(slip[key] or 0)
+    slip['generated_at'] = str(slip['generated_at']) if slip['generated_at'] else None
+    return slip
+
+
+def main(argv):
+    last_month = date.today().replace(day=1) - timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Month-end payslip generation")
+    parser.add_argument("command", choices=("close", "status"))
+    parser.add_argument("--year", type=int, default=last_month.year)
+    parser.add_argument("--month", type=int, default=last_month.month)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--shards", type=int)
+    parser.add_argument("--employer", type=int, action="append", help="only close these employers")
+    parser.add_argument("--force", action="store_true", help="close a month that has not ended yet")
+    args = parser.parse_args(argv[1:])
+    period = Period.month(args.year, args.month)
+
+    if args.command == "status":
+        conn = get_storage().connect()
+        cur = conn.cursor()
+        try:
+            employers = list_employers(cur)
+            cur.execute("SELECT COUNT(*), IFNULL(SUM(payslips), 0) FROM payslip_runs WHERE year_num = %s AND month = %s",
+                        (args.year, args.month))
+            closed, slips = cur.fetchone()
+        finally:
+            cur.close()
+            conn.close()
+        print(f"{args.year}-{args.month:02d}: {closed}/{len(employers)} employers closed, {slips} payslips")
+        return 0
+
+    if period.end > date.today() and not args.force:
+        print(f"{args.year}-{args.month:02d} has not ended yet; pass --force to close it anyway")
+        return 2
+    total = close_month(args.year, args.month, args.workers, args.shards, args.employer)
+    print(f"{args.year}-{args.month:02d}: closed {total['closed']} employers ({total['payslips']} payslips), "
+          f"{total['skipped']} already closed, {len(total['failed'])} failed")
+    for employer_id, error in total['failed']:
+        print(f"  employer {employer_id}: {error}")
+    return 1 if total['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,117 @@
+"""The employer's queue of pending employee-submitted shifts, with claims for concurrent managers.
+
+The queue is every pending `employee_submitted` shift of the employer's employees
+(users.created_by). A manager claims a batch of the oldest unclaimed items before
+working on them; a claim is a conditional UPDATE per shift, so two managers can
+never hold the same shift, and it lapses after PENDING_CLAIM_TTL seconds so items
+held by a manager who walked away return to the queue. approvals.decide_shifts()
+skips shifts claimed by someone else.
+"""
+import os
+from datetime import datetime, timedelta
+from pagination import keyset_page
+
+PENDING_CLAIM_TTL = int(os.getenv("PENDING_CLAIM_TTL", "300"))
+MAX_CLAIM = 100
+
+QUEUE_FROM = (
+    "FROM users u JOIN shifts s ON s.employee_id = u.user_id "
+    "WHERE u.created_by = %s AND u.role = 'employee' "
+    "AND s.shift_type = 'employee_submitted' AND s.status = 'pending'"
+)
+QUEUE_COLUMNS = (
+    "s.shift_id, s.shift_name, s.shift_date, s.start_time, s.end_time, "
+    "s.hours_worked, s.status, u.username, u.user_id, s.claimed_by, s.claimed_at"
+)
+UNCLAIMED = " AND (s.claimed_by IS NULL OR s.claimed_at < %s)"
+
+
+def claim_cutoff(now=None):
+    """Claims made before this moment have lapsed."""
+    return (now or datetime.now()) - timedelta(seconds=PENDING_CLAIM_TTL)
+
+
+def is_claimed_by_other(claimed_by, claimed_at, manager_id, now=None):
+    """True when someone other than `manager_id` holds a live claim (any live claim when `manager_id` is None)."""
+    if claimed_by is None or (manager_id is not None and int(claimed_by) == int(manager_id)):
+        return False
+    if isinstance(claimed_at, str):  # SQLite returns DATETIME columns as text
+        claimed_at = datetime.fromisoformat(claimed_at)
+    return claimed_at is not None and claimed_at >= claim_cutoff(now)
+
+
+# --- Reads ---
+def queue_page(cur, employer_id, limit, cursor=None, unclaimed_only=False):
+    """A keyset page of the queue, newest first; returns (rows, next_cursor)."""
+    sql, params = f"SELECT {QUEUE_COLUMNS} {QUEUE_FROM}", (employer_id,)
+    if unclaimed_only:
+        sql, params = sql + UNCLAIMED, params + (claim_cutoff(),)
+    return keyset_page(cur, sql, params, "s.shift_date", "s.shift_id", limit, cursor, key=(2, 0))
+
+
+def queue_counts(cur, employer_id):
+    """{'pending': all items in the queue, 'unclaimed': those no manager holds}."""
+    cur.execute(
+        "SELECT COUNT(*), COALESCE(SUM(CASE WHEN s.claimed_by IS NULL OR s.claimed_at < %s THEN 1 ELSE 0 END), 0) "
+        + QUEUE_FROM,
+        (claim_cutoff(), employer_id)
+    )
+    pending, unclaimed = cur.fetchone()
+    return {'pending': int(pending), 'unclaimed': int(unclaimed)}
+
+
+# --- Claims ---
+def claim_shifts(cur, employer_id, manager_id, limit=10):
+    """Claim up to `limit` of the oldest unclaimed items for `manager_id`; returns their rows, oldest first.
+
+    Each claim is an UPDATE that only succeeds while the shift is still pending and
+    unclaimed, so a shift taken by a concurrent manager in between is just skipped.
+    The caller commits.
+    """
+    limit = max(1, min(int(limit), MAX_CLAIM))
+    now = datetime.now()
+    cutoff = claim_cutoff(now)
+    claimed, after = [], None
+    while len(claimed) < limit:
+        # walk the queue oldest first past the candidates already tried, which
+        # concurrent managers may have taken since
+        sql, params = f"SELECT s.shift_id, s.shift_date {QUEUE_FROM}{UNCLAIMED}", (employer_id, cutoff)
+        if after:
+            sql += " AND s.shift_date >= %s AND (s.shift_date > %s OR s.shift_id > %s)"
+            params += (after[0], after[0], after[1])
+        cur.execute(sql + " ORDER BY s.shift_date, s.shift_id LIMIT %s", params + (limit * 2,))
+        candidates = cur.fetchall()
+        if not candidates:
+            break
+        for shift_id, shift_date in candidates:
+            after = (shift_date, shift_id)
+            cur.execute(
+                "UPDATE shifts SET claimed_by = %s, claimed_at = %s "
+                "WHERE shift_id = %s AND status = 'pending' AND (claimed_by IS NULL OR claimed_at < %s)",
+                (manager_id, now, shift_id, cutoff)
+            )
+            if cur.rowcount == 1:
+                claimed.append(shift_id)
+                if len(claimed) == limit:
+                    break
+    if not claimed:
+        return []
+    cur.execute(
+        f"SELECT {QUEUE_COLUMNS} {QUEUE_FROM} AND s.shift_id IN ({', '.join(['%s'] * len(claimed))}) "
+        "ORDER BY s.shift_date, s.shift_id",
+        (employer_id,) + tuple(claimed)
+    )
+    return cur.fetchall()
+
+
+def release_shifts(cur, manager_id, shift_ids):
+    """Drop `manager_id`'s claims on `shift_ids`; returns how many were released. The caller commits."""
+    shift_ids = [int(i) for i in shift_ids]
+    if not shift_ids:
+        return 0
+    cur.execute(
+        "UPDATE shifts SET claimed_by = NULL, claimed_at = NULL "
+        f"WHERE claimed_by = %s AND shift_id IN ({', '.join(['%s'] * len(shift_ids))})",
+        (manager_id,) + tuple(shift_ids)
+    )
+    return cur.rowcount
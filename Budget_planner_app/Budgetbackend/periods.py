@@ -0,0 +1,93 @@
+from datetime import date, datetime, timedelta
+
+# UK tax years run 6 April to 5 April
+TAX_YEAR_START_MONTH = 4
+TAX_YEAR_START_DAY = 6
+
+
+def _as_date(value):
+    if value is None:
+        return date.today()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+class Period:
+    """Half-open date range [start, end) used to build index-friendly range predicates.
+
+    Filtering with `col >= start AND col < end` lets MySQL range-scan an index on
+    `col`, where MONTH(col)/YEAR(col)/YEARWEEK(col) force it to evaluate every row.
+    """
+
+    def __init__(self, start, end, kind="range"):
+        start, end = _as_date(start), _as_date(end)
+        if end <= start:
+            raise ValueError("Period end must be after start")
+        self.start = start
+        self.end = end
+        self.kind = kind
+
+    @classmethod
+    def week(cls, day=None):
+        """ISO week (Monday to Sunday) containing `day`."""
+        day = _as_date(day)
+        monday = day - timedelta(days=day.weekday())
+        return cls(monday, monday + timedelta(days=7), "week")
+
+    @classmethod
+    def month(cls, day=None, month=None):
+        """Calendar month containing `day`, or `month` of year `day` when given as ints."""
+        if isinstance(day, int):
+            first = date(day, month, 1)
+        else:
+            first = _as_date(day).replace(day=1)
+        following = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+        return cls(first, following, "month")
+
+    @classmethod
+    def tax_year(cls, day=None):
+        """UK tax year (6 April to 5 April) containing `day`."""
+        day = _as_date(day)
+        start = date(day.year, TAX_YEAR_START_MONTH, TAX_YEAR_START_DAY)
+        if day < start:
+            start = start.replace(year=day.year - 1)
+        return cls(start, start.replace(year=start.year + 1), "tax_year")
+
+    @classmethod
+    def between(cls, start, end_inclusive):
+        """Arbitrary range including both `start` and `end_inclusive` days."""
+        return cls(_as_date(start), _as_date(end_inclusive) + timedelta(days=1), "range")
+
+    def contains(self, day):
+        return self.start <= _as_date(day) < self.end
+
+    def clause(self, column):
+        """SQL fragment and params selecting rows whose `column` falls in the period."""
+        return f"{column} >= %s AND {column} < %s", (self.start, self.end)
+
+    def __eq__(self, other):
+        return isinstance(other, Period) and (self.start, self.end) == (other.start, other.end)
+
+    def __hash__(self):
+        return hash((self.start, self.end))
+
+    def __repr__(self):
+        return f"Period({self.kind}, {self.start} -> {self.end})"
+
+
+def period_total(cur, table, expr, date_column, period, where="", params=()):
+    """SUM `expr` over the rows of `table` in `period`, with an optional extra `where` filter.
+
+    `where` is ANDed onto the range predicate, e.g. period_total(cur, "daily_keep",
+    "daily_keep_amount", "daily_keep_date", Period.month(), "user_id = %s", (uid,)).
+    """
+    range_sql, range_params = period.clause(date_column)
+    sql = f"SELECT COALESCE(SUM({expr}), 0) FROM {table} WHERE {range_sql}"
+    if where:
+        sql += f" AND {where}"
+    cur.execute(sql, tuple(range_params) + tuple(params))
+    row = cur.fetchone()
+    return float(row[0]) if row and row[0] is not None else 0.0
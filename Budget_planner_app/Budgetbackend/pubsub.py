@@ -0,0 +1,159 @@
+"""Publish/subscribe for waking notification streams when new rows are committed.
+
+Messages are wake-ups, not data: a subscriber that wakes re-reads what it needs
+from the database, so a dropped or duplicated message costs at most one query.
+
+    NOTIFY_BROKER=memory  (default) in-process; publishers and subscribers must share the process
+    NOTIFY_BROKER=redis   Redis pub/sub at NOTIFY_REDIS_URL, for several API workers or a
+                          separate outbox dispatcher process (needs the `redis` package)
+
+    sub = get_broker().subscribe(user_topic(7))
+    try:
+        while sub.wait(timeout=15):
+            ...  # query for rows newer than the last one sent
+    finally:
+        sub.close()
+"""
+import os
+import threading
+
+NOTIFY_BROKER = os.getenv("NOTIFY_BROKER", "memory").lower()
+NOTIFY_REDIS_URL = os.getenv("NOTIFY_REDIS_URL", "redis://localhost:6379/0")
+# notification streams (api_server.py): SSE keep-alive interval and lifetime, long-poll cap
+NOTIFY_HEARTBEAT_SECONDS = float(os.getenv("NOTIFY_HEARTBEAT_SECONDS", "15"))
+NOTIFY_STREAM_SECONDS = float(os.getenv("NOTIFY_STREAM_SECONDS", "300"))
+NOTIFY_POLL_TIMEOUT = float(os.getenv("NOTIFY_POLL_TIMEOUT", "30"))
+NOTIFY_RETRY_MS = 3000
+
+
+def user_topic(user_id):
+    return f"notifications:{int(user_id)}"
+
+
+class Subscription:
+    """One subscriber's view of a topic; wait() returns True once something was published since the last wait."""
+
+    def __init__(self, broker, topic):
+        self.broker = broker
+        self.topic = topic
+        self._event = threading.Event()
+
+    def notify(self):
+        self._event.set()
+
+    def wait(self, timeout=None):
+        fired = self._event.wait(timeout)
+        self._event.clear()
+        return fired
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class MemoryBroker:
+    """In-process broker: topic -> live subscriptions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics = {}
+        self.published = 0
+
+    def subscribe(self, topic):
+        sub = Subscription(self, topic)
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._topics.get(sub.topic)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._topics[sub.topic]
+
+    def publish(self, topic):
+        """Wake every subscriber of `topic`; returns how many there were."""
+        with self._lock:
+            subs = list(self._topics.get(topic, ()))
+            self.published += 1
+        for sub in subs:
+            sub.notify()
+        return len(subs)
+
+    def stats(self):
+        with self._lock:
+            return {'broker': 'memory', 'topics': len(self._topics),
+                    'subscribers': sum(len(s) for s in self._topics.values()), 'published': self.published}
+
+
+class RedisSubscription(Subscription):
+    def __init__(self, broker, topic):
+        super().__init__(broker, topic)
+        self._pubsub = broker.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(topic)
+
+    def wait(self, timeout=None):
+        message = self._pubsub.get_message(timeout=timeout)
+        # drain anything else already queued so a burst counts as one wake-up
+        while message and self._pubsub.get_message(timeout=0):
+            pass
+        return message is not None
+
+    def close(self):
+        try:
+            self._pubsub.close()
+        except Exception as e:
+            print(f"Closing Redis subscription failed: {e}")
+
+
+class RedisBroker:
+    """Redis pub/sub, shared by every process pointed at the same server."""
+
+    def __init__(self, url=NOTIFY_REDIS_URL):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("NOTIFY_BROKER=redis needs the redis package (pip install redis)")
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    def subscribe(self, topic):
+        return RedisSubscription(self, topic)
+
+    def unsubscribe(self, sub):
+        sub.close()
+
+    def publish(self, topic):
+        return self.client.publish(topic, b"1")
+
+    def stats(self):
+        return {'broker': 'redis', 'url': self.url}
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The configured broker (created on first use)."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = RedisBroker() if NOTIFY_BROKER == "redis" else MemoryBroker()
+        return _broker
+
+
+def set_broker(broker):
+    """Replace the process's broker (e.g. with another implementation of subscribe/publish)."""
+    global _broker
+    with _broker_lock:
+        _broker = broker
+    return broker
+
+
+def publish_notifications(notifications):
+    """Outbox channel: wake the streams of every user in a dispatched batch."""
+    broker = get_broker()
+    for user_id in {n['user_id'] for n in notifications}:
+        broker.publish(user_topic(user_id))
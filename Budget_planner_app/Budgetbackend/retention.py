@@ -0,0 +1,184 @@
+"""Notification retention: move old read notifications out of the hot table into compressed monthly archives.
+
+`notifications` keeps what the app shows (unread rows and recent history). The
+archive job copies read notifications older than NOTIFICATION_RETENTION_DAYS to
+gzip'd NDJSON files, one per month of `created_at`
+(`<NOTIFICATION_ARCHIVE_DIR>/notifications-2025-07.ndjson.gz`), then deletes them
+in the same batch. Each batch is flushed to disk before its delete commits, so a
+crash can at worst archive a row twice (dedupe on `notification_id`), never lose
+it. Every run is recorded in `notification_archive_runs` for purge statistics.
+
+Run it from cron, e.g. nightly:
+
+    15 3 * * *  cd /srv/Budgetbackend && python retention.py archive
+    python retention.py archive --days 30 --dry-run
+    python retention.py status
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from storage import get_storage
+
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+NOTIFICATION_ARCHIVE_DIR = os.getenv(
+    "NOTIFICATION_ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive")
+)
+NOTIFICATION_ARCHIVE_BATCH = int(os.getenv("NOTIFICATION_ARCHIVE_BATCH", "5000"))
+
+ARCHIVE_COLUMNS = ("notification_id", "user_id", "shift_id", "notification_type", "message", "is_read", "created_at")
+ARCHIVE_SQL = (
+    f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM notifications "
+    "WHERE created_at < %s AND is_read = TRUE"
+)
+
+
+def archive_path(month, archive_dir=None):
+    """The archive file for a 'YYYY-MM' month."""
+    return os.path.join(archive_dir or NOTIFICATION_ARCHIVE_DIR, f"notifications-{month}.ndjson.gz")
+
+
+def _record(row):
+    record = dict(zip(ARCHIVE_COLUMNS, row))
+    record['is_read'] = bool(record['is_read'])
+    record['created_at'] = str(record['created_at'])
+    return record
+
+
+def _write_batch(rows, archive_dir):
+    """Append rows to their months' archives (each append is a new gzip member); returns {path: bytes added}."""
+    by_month = {}
+    for row in rows:
+        record = _record(row)
+        by_month.setdefault(record['created_at'][:7], []).append(record)
+    written = {}
+    for month, records in by_month.items():
+        path = archive_path(month, archive_dir)
+        before = os.path.getsize(path) if os.path.exists(path) else 0
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                gz.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode())
+            raw.flush()
+            os.fsync(raw.fileno())
+        written[path] = os.path.getsize(path) - before
+    return written
+
+
+def archive_notifications(days=None, batch_size=None, archive_dir=None, dry_run=False):
+    """Archive and delete read notifications older than `days`; returns the run's statistics.
+
+    Rows are read in (created_at, notification_id) order a batch at a time, so unread
+    old rows are stepped over rather than re-read by every batch.
+    """
+    days = NOTIFICATION_RETENTION_DAYS if days is None else int(days)
+    batch_size = max(1, int(batch_size or NOTIFICATION_ARCHIVE_BATCH))
+    archive_dir = archive_dir or NOTIFICATION_ARCHIVE_DIR
+    cutoff = datetime.now().replace(microsecond=0) - timedelta(days=days)
+    stats = {'cutoff': str(cutoff), 'archived': 0, 'bytes': 0, 'files': [], 'dry_run': dry_run}
+    started = time.perf_counter()
+    if not dry_run:
+        os.makedirs(archive_dir, exist_ok=True)
+
+    conn = get_storage().connect()
+    cur = conn.cursor()
+    try:
+        run_id = None
+        if not dry_run:
+            cur.execute(
+                "INSERT INTO notification_archive_runs (started_at, cutoff) VALUES (%s, %s)",
+                (datetime.now().replace(microsecond=0), cutoff)
+            )
+            run_id = cur.lastrowid
+            conn.commit()
+        after = None
+        files = set()
+        while True:
+            sql, params = ARCHIVE_SQL, (cutoff,)
+            if after:
+                sql += " AND created_at >= %s AND (created_at > %s OR notification_id > %s)"
+                params += (after[0], after[0], after[1])
+            cur.execute(sql + " ORDER BY created_at, notification_id LIMIT %s", params + (batch_size,))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            after = (rows[-1][6], rows[-1][0])
+            stats['archived'] += len(rows)
+            if dry_run:
+                continue
+            written = _write_batch(rows, archive_dir)
+            files.update(written)
+            stats['bytes'] += sum(written.values())
+            cur.executemany("DELETE FROM notifications WHERE notification_id = %s", [(row[0],) for row in rows])
+            conn.commit()
+        stats['files'] = sorted(files)
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        if run_id:
+            cur.execute(
+                "UPDATE notification_archive_runs SET finished_at = %s, archived = %s, files = %s, bytes = %s "
+                "WHERE run_id = %s",
+                (datetime.now().replace(microsecond=0), stats['archived'], len(files), stats['bytes'], run_id)
+            )
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    return stats
+
+
+def retention_stats(cur, runs=10):
+    """Retention settings, totals across every run and the latest `runs` runs, newest first."""
+    cur.execute("SELECT COUNT(*), COALESCE(SUM(archived), 0), COALESCE(SUM(bytes), 0) FROM notification_archive_runs")
+    count, archived, size = cur.fetchone()
+    cur.execute(
+        "SELECT run_id, started_at, finished_at, cutoff, archived, files, bytes FROM notification_archive_runs "
+        "ORDER BY run_id DESC LIMIT %s",
+        (int(runs),)
+    )
+    recent = [
+        {'run_id': r[0], 'started_at': str(r[1]), 'finished_at': str(r[2]) if r[2] else None,
+         'cutoff': str(r[3]), 'archived': int(r[4]), 'files': int(r[5]), 'bytes': int(r[6])}
+        for r in cur.fetchall()
+    ]
+    return {'retention_days': NOTIFICATION_RETENTION_DAYS, 'archive_dir': NOTIFICATION_ARCHIVE_DIR,
+            'runs': int(count), 'archived': int(archived), 'bytes': int(size), 'recent': recent}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Notification retention and archiving")
+    parser.add_argument("command", choices=("archive", "status"))
+    parser.add_argument("--days", type=int, default=NOTIFICATION_RETENTION_DAYS,
+                        help="archive read notifications older than this many days")
+    parser.add_argument("--batch-size", type=int, default=NOTIFICATION_ARCHIVE_BATCH)
+    parser.add_argument("--archive-dir", default=NOTIFICATION_ARCHIVE_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="count what would be archived, change nothing")
+    args = parser.parse_args(argv[1:])
+
+    if args.command == "status":
+        conn = get_storage().connect()
+        cur = conn.cursor()
+        try:
+            stats = retention_stats(cur)
+        finally:
+            cur.close()
+            conn.close()
+        print(f"{stats['runs']} runs archived {stats['archived']} notifications ({stats['bytes']} bytes compressed)")
+        for run in stats['recent']:
+            print(f"  run {run['run_id']} at {run['started_at']}: {run['archived']} older than {run['cutoff']}, "
+                  f"{run['files']} files, {run['bytes']} bytes{'' if run['finished_at'] else ' (unfinished)'}")
+        return 0
+
+    stats = archive_notifications(args.days, args.batch_size, args.archive_dir, args.dry_run)
+    verb = "Would archive" if args.dry_run else "Archived"
+    print(f"{verb} {stats['archived']} read notifications older than {stats['cutoff']}"
+          + ("" if args.dry_run else f" into {len(stats['files'])} files ({stats['bytes']} bytes)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,320 @@
+"""Per-user monthly earnings rollups and the weekly earnings ledger.
+
+`monthly_rollups` (migration 5) holds one row per (user_id, year_num, month) with gross
+(daily_keep), net (approved shift earnings), hours and the bill position.
+`weekly_earnings` (migration 6) holds one row per (user_id, ISO year, ISO week)
+with the daily_keep amount and hours. Both are kept current by the write paths
+so the salary endpoints read a single row:
+
+    record_earnings()       called with every daily_keep insert / shift approval
+    record_earnings_many()  the same for a batch of approvals
+    refresh_bills()         called with bill add/delete
+
+Backfill or repair from the raw tables:
+    python rollups.py rebuild [--user USER_ID]
+    python rollups.py rebuild-weekly [--user USER_ID]
+"""
+import argparse
+import sys
+from datetime import date, datetime
+from storage import get_storage
+from tax_engine import tax_period_of_month
+
+# net_after_bills is rounded to whole pounds, matching the salary-after-bills route
+_DERIVED_SQL = (
+    "UPDATE monthly_rollups SET "
+    "  net_after_bills = ROUND(net_earnings - bill_total, 0),"
+    "  percentage_after_bills = CASE WHEN net_earnings <> 0 "
+    "    THEN ROUND(ROUND(net_earnings - bill_total, 0) * 100.0 / net_earnings, 2) ELSE 0 END"
+)
+
+
+def _as_date(day):
+    if isinstance(day, datetime):
+        return day.date()
+    if isinstance(day, date):
+        return day
+    return datetime.strptime(str(day), "%Y-%m-%d").date()
+
+
+def _year_month(day):
+    day = _as_date(day)
+    return day.year, day.month
+
+
+def iso_week(day=None):
+    """(ISO year, ISO week number) for `day` (default today) — the weekly_earnings key."""
+    iso = _as_date(day or date.today()).isocalendar()
+    return iso[0], iso[1]
+
+
+def _upsert_week(cur, user_id, iso_year, week_number, amount, hours):
+    cur.execute(
+        get_storage().upsert_sql(
+            "weekly_earnings", ("user_id", "year_num", "week_number"),
+            ("earnings_amount", "hours_worked"), increment_cols=("earnings_amount", "hours_worked"),
+        ),
+        (user_id, iso_year, week_number, round(float(amount), 2), round(float(hours), 2))
+    )
+
+
+def _upsert(cur, user_id, year_num, month, gross, net, hours, bill_total):
+    storage = get_storage()
+    cur.execute(
+        storage.upsert_sql(
+            "monthly_rollups", ("user_id", "year_num", "month"),
+            ("gross_earnings", "net_earnings", "hours_worked", "bill_total"),
+            increment_cols=("gross_earnings", "net_earnings", "hours_worked"),
+        ),
+        (user_id, year_num, month, round(float(gross), 2), round(float(net), 2), round(float(hours), 2),
+         round(float(bill_total), 2))
+    )
+    cur.execute(_DERIVED_SQL + " WHERE user_id = %s AND year_num = %s AND month = %s", (user_id, year_num, month))
+
+
+# --- Incremental maintenance ---
+def record_earnings(cur, user_id, day, gross=0.0, net=0.0, hours=0.0):
+    """Add earnings for `day` to the user's monthly rollup and weekly ledger (same transaction as the caller).
+
+    `gross` and `hours` mirror the daily_keep row being written; `net` is approved shift earnings.
+    """
+    year_num, month = _year_month(day)
+    _upsert(cur, user_id, year_num, month, gross, net, hours, get_storage().bills_total(cur, user_id))
+    if gross or hours:
+        _upsert_week(cur, user_id, *iso_week(day), gross, hours)
+
+
+def record_earnings_many(cur, entries):
+    """Batch form of record_earnings() for (user_id, day, gross, net, hours) entries.
+
+    Entries are summed per month and per ISO week first, so each touched rollup row
+    gets one upsert no matter how many entries fall into it.
+    """
+    months, weeks = {}, {}
+    for user_id, day, gross, net, hours in entries:
+        key = (user_id,) + _year_month(day)
+        total = months.get(key, (0.0, 0.0, 0.0))
+        months[key] = (total[0] + float(gross), total[1] + float(net), total[2] + float(hours))
+        if gross or hours:
+            key = (user_id,) + iso_week(day)
+            total = weeks.get(key, (0.0, 0.0))
+            weeks[key] = (total[0] + float(gross), total[1] + float(hours))
+    if not months:
+        return
+    storage = get_storage()
+    user_ids = sorted({key[0] for key in months})
+    cur.execute(
+        "SELECT user_id, IFNULL(SUM(bill_amount), 0) FROM bills "
+        f"WHERE user_id IN ({', '.join(['%s'] * len(user_ids))}) GROUP BY user_id",
+        tuple(user_ids)
+    )
+    bills = {row[0]: float(row[1]) for row in cur.fetchall()}
+    cur.executemany(
+        storage.upsert_sql(
+            "monthly_rollups", ("user_id", "year_num", "month"),
+            ("gross_earnings", "net_earnings", "hours_worked", "bill_total"),
+            increment_cols=("gross_earnings", "net_earnings", "hours_worked"),
+        ),
+        [key + (round(g, 2), round(n, 2), round(h, 2), round(bills.get(key[0], 0.0), 2))
+         for key, (g, n, h) in months.items()]
+    )
+    cur.executemany(_DERIVED_SQL + " WHERE user_id = %s AND year_num = %s AND month = %s", list(months))
+    if weeks:
+        cur.executemany(
+            storage.upsert_sql(
+                "weekly_earnings", ("user_id", "year_num", "week_number"),
+                ("earnings_amount", "hours_worked"), increment_cols=("earnings_amount", "hours_worked"),
+            ),
+            [key + (round(a, 2), round(h, 2)) for key, (a, h) in weeks.items()]
+        )
+
+
+def refresh_bills(cur, user_id, day=None):
+    """Re-read the user's bill total into the rollup for `day`'s month (default: this month)."""
+    year_num, month = _year_month(day or date.today())
+    _upsert(cur, user_id, year_num, month, 0, 0, 0, get_storage().bills_total(cur, user_id))
+
+
+# --- Reads ---
+def get_rollup(cur, user_id, year_num, month):
+    """The rollup row as a dict, or None if the user has no activity that month."""
+    cur.execute(
+        "SELECT gross_earnings, net_earnings, hours_worked, bill_total, net_after_bills, percentage_after_bills "
+        "FROM monthly_rollups WHERE user_id = %s AND year_num = %s AND month = %s",
+        (user_id, year_num, month)
+    )
+    row = cur.fetchone()
+    if not row:
+        return None
+    keys = ("gross", "net", "hours", "bill_total", "net_after_bills", "percentage_after_bills")
+    return {k: float(v or 0) for k, v in zip(keys, row)}
+
+
+def get_weekly(cur, user_id, iso_year, week_number):
+    """(earnings, hours) from the weekly ledger; zeros when nothing was earned that week."""
+    cur.execute(
+        "SELECT earnings_amount, hours_worked FROM weekly_earnings "
+        "WHERE user_id = %s AND year_num = %s AND week_number = %s",
+        (user_id, iso_year, week_number)
+    )
+    row = cur.fetchone()
+    if not row:
+        return 0.0, 0.0
+    return float(row[0] or 0), float(row[1] or 0)
+
+
+def year_to_date(cur, year_num, month, column="gross_earnings", user_id=None, employer_id=None):
+    """{user_id: SUM(column)} over the tax year's rollup months before (year_num, month).
+
+    Scoped to one user, or to every employee of `employer_id`.
+    """
+    tax_year, _ = tax_period_of_month(year_num, month)
+    months_sql = "(r.year_num * 12 + r.month) >= %s AND (r.year_num * 12 + r.month) < %s"
+    params = (tax_year * 12 + 4, year_num * 12 + month)
+    if user_id is not None:
+        cur.execute(
+            f"SELECT r.user_id, SUM(r.{column}) FROM monthly_rollups r "
+            f"WHERE r.user_id = %s AND r.year_num IN (%s, %s) AND {months_sql} GROUP BY r.user_id",
+            (user_id, tax_year, tax_year + 1) + params
+        )
+    else:
+        cur.execute(
+            f"SELECT r.user_id, SUM(r.{column}) FROM users u JOIN monthly_rollups r ON r.user_id = u.user_id "
+            f"WHERE u.created_by = %s AND u.role = 'employee' AND r.year_num IN (%s, %s) AND {months_sql} "
+            "GROUP BY r.user_id",
+            (employer_id, tax_year, tax_year + 1) + params
+        )
+    return {row[0]: float(row[1] or 0) for row in cur.fetchall()}
+
+
+# --- Bulk rebuild ---
+def rebuild(conn, user_id=None):
+    """Recompute rollups from daily_keep, shifts and bills in bulk. Returns the number of rows written."""
+    storage = get_storage()
+    if storage.dialect == "sqlite":
+        year_of = lambda col: f"CAST(strftime('%Y', {col}) AS INTEGER)"
+        month_of = lambda col: f"CAST(strftime('%m', {col}) AS INTEGER)"
+    else:
+        year_of = lambda col: f"YEAR({col})"
+        month_of = lambda col: f"MONTH({col})"
+    user_filter = " AND user_id = %s" if user_id else ""
+    params = (user_id,) if user_id else ()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM monthly_rollups WHERE 1 = 1" + user_filter, params)
+        # gross and hours from daily_keep
+        cur.execute(
+            "INSERT INTO monthly_rollups (user_id, year_num, month, gross_earnings, hours_worked) "
+            f"SELECT user_id, {year_of('daily_keep_date')}, {month_of('daily_keep_date')}, "
+            "SUM(daily_keep_amount), SUM(daily_hours_worked) FROM daily_keep "
+            "WHERE user_id IS NOT NULL" + user_filter + " "
+            f"GROUP BY user_id, {year_of('daily_keep_date')}, {month_of('daily_keep_date')}",
+            params
+        )
+        # net from approved shift earnings
+        cur.execute(
+            f"SELECT employee_id, {year_of('shift_date')}, {month_of('shift_date')}, SUM(weekly_earning) "
+            "FROM shifts WHERE weekly_earning <> 0" + user_filter.replace("user_id", "employee_id") + " "
+            f"GROUP BY employee_id, {year_of('shift_date')}, {month_of('shift_date')}",
+            params
+        )
+        net_rows = [(r[0], r[1], r[2], round(float(r[3]), 2)) for r in cur.fetchall()]
+        if net_rows:
+            cur.executemany(
+                storage.upsert_sql("monthly_rollups", ("user_id", "year_num", "month"), ("net_earnings",)),
+                net_rows
+            )
+        cur.execute(
+            "UPDATE monthly_rollups SET bill_total = "
+            "(SELECT IFNULL(SUM(bill_amount), 0) FROM bills WHERE bills.user_id = monthly_rollups.user_id) "
+            "WHERE 1 = 1" + user_filter,
+            params
+        )
+        cur.execute(_DERIVED_SQL + " WHERE 1 = 1" + user_filter, params)
+        cur.execute("SELECT COUNT(*) FROM monthly_rollups WHERE 1 = 1" + user_filter, params)
+        written = cur.fetchone()[0]
+        conn.commit()
+        return written
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def rebuild_weekly(conn, user_id=None, batch_size=5000):
+    """Recompute the weekly ledger from daily_keep. Returns the number of weeks written.
+
+    Works one user at a time (an index range on daily_keep (user_id, daily_keep_date)),
+    so memory stays bounded by the longest single history.
+    """
+    storage = get_storage()
+    upsert = storage.upsert_sql(
+        "weekly_earnings", ("user_id", "year_num", "week_number"), ("earnings_amount", "hours_worked")
+    )
+    cur = conn.cursor()
+    written = 0
+    try:
+        if user_id:
+            user_ids = [user_id]
+            cur.execute("DELETE FROM weekly_earnings WHERE user_id = %s", (user_id,))
+        else:
+            cur.execute("SELECT DISTINCT user_id FROM daily_keep WHERE user_id IS NOT NULL")
+            user_ids = [r[0] for r in cur.fetchall()]
+            cur.execute("DELETE FROM weekly_earnings")
+        batch = []
+        for uid in user_ids:
+            cur.execute(
+                "SELECT daily_keep_date, SUM(daily_keep_amount), SUM(daily_hours_worked) "
+                "FROM daily_keep WHERE user_id = %s GROUP BY daily_keep_date",
+                (uid,)
+            )
+            weeks = {}
+            for day, amount, hours in cur.fetchall():
+                key = iso_week(day)
+                total = weeks.get(key, (0.0, 0.0))
+                weeks[key] = (total[0] + float(amount or 0), total[1] + float(hours or 0))
+            batch.extend(
+                (uid, iso_year, week_number, round(amount, 2), round(hours, 2))
+                for (iso_year, week_number), (amount, hours) in weeks.items()
+            )
+            if len(batch) >= batch_size:
+                cur.executemany(upsert, batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            cur.executemany(upsert, batch)
+            written += len(batch)
+        conn.commit()
+        return written
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def main(argv):
+    from budgetset import get_conn
+    parser = argparse.ArgumentParser(description="Monthly earnings rollups and weekly ledger")
+    parser.add_argument("command", choices=("rebuild", "rebuild-weekly"))
+    parser.add_argument("--user", type=int, help="only rebuild this user's rows")
+    args = parser.parse_args(argv[1:])
+    conn = get_conn()
+    if not conn:
+        print("DB unavailable")
+        return 1
+    try:
+        if args.command == "rebuild-weekly":
+            written = rebuild_weekly(conn, args.user)
+            print(f"Rebuilt {written} weekly earnings rows")
+        else:
+            written = rebuild(conn, args.user)
+            print(f"Rebuilt {written} monthly rollup rows")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,124 @@
+"""Employer roster: every employee of an employer with their current-month shift totals.
+
+The roster is one grouped query (users LEFT JOIN this month's shifts) instead of three
+correlated subqueries per employee, and the shaped result is cached per employer.
+Write paths that change an employer's shifts or employees call `invalidate_employer()`
+or `invalidate_employee()` after committing. The cache is per process, so with several
+workers `ROSTER_CACHE_TTL` bounds how stale another worker's copy can be.
+"""
+import os
+import threading
+import time
+from periods import Period
+
+ROSTER_CACHE_TTL = float(os.getenv("ROSTER_CACHE_TTL", "60"))
+
+ROSTER_SQL = (
+    "SELECT u.user_id, u.username, u.hourly_rate, COUNT(s.shift_id), "
+    "IFNULL(SUM(s.hours_worked), 0), COALESCE(SUM(s.weekly_earning), 0) "
+    "FROM users u LEFT JOIN shifts s ON s.employee_id = u.user_id AND {range_sql} "
+    "WHERE u.role = 'employee' AND u.created_by = %s "
+    "GROUP BY u.user_id, u.username, u.hourly_rate "
+    "ORDER BY u.username"
+)
+
+
+def fetch_roster(cur, employer_id, period=None):
+    """Roster rows for `employer_id` over `period` (default: this month), straight from the database."""
+    period = period or Period.month()
+    range_sql, range_params = period.clause("s.shift_date")
+    cur.execute(ROSTER_SQL.format(range_sql=range_sql), tuple(range_params) + (employer_id,))
+    result = []
+    for user_id, username, rate, total_shifts, total_hours, monthly_salary in cur.fetchall():
+        total_hours = float(total_hours) if total_hours else 0
+        hourly_rate = float(rate) if rate else 0
+        result.append({
+            'id': user_id,
+            'name': username,
+            'email': f"{username}@company.com",
+            'status': 'active',
+            'department': 'Operations',
+            'hoursWorked': total_hours,
+            'joinDate': '2025-06-15',
+            'totalShifts': total_shifts,
+            'hourlyRate': hourly_rate,
+            'monthlySalary': float(monthly_salary or 0),
+            'calculatedSalary': total_hours * hourly_rate
+        })
+    return result
+
+
+class RosterCache:
+    """Roster results keyed by employer, with a reverse employee -> employer map for invalidation."""
+
+    def __init__(self, ttl=ROSTER_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}      # employer_id -> (expires_at, period, rows)
+        self._employer_of = {}  # employee_id -> employer_id, from cached rosters
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, employer_id, period):
+        with self._lock:
+            entry = self._entries.get(employer_id)
+            if entry and entry[0] > time.monotonic() and entry[1] == period:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def put(self, employer_id, period, rows):
+        with self._lock:
+            self._entries[employer_id] = (time.monotonic() + self.ttl, period, rows)
+            for row in rows:
+                self._employer_of[row['id']] = employer_id
+
+    def invalidate_employer(self, employer_id):
+        with self._lock:
+            self._entries.pop(employer_id, None)
+
+    def invalidate_employee(self, employee_id):
+        with self._lock:
+            employer_id = self._employer_of.pop(employee_id, None)
+            if employer_id is not None:
+                self._entries.pop(employer_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._employer_of.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"employers": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+_cache = RosterCache()
+
+
+def get_roster(cur, employer_id, period=None):
+    """Cached roster for `employer_id`; reads through to `fetch_roster()` on a miss or expiry."""
+    period = period or Period.month()
+    employer_id = int(employer_id)
+    rows = _cache.get(employer_id, period)
+    if rows is None:
+        rows = fetch_roster(cur, employer_id, period)
+        _cache.put(employer_id, period, rows)
+    return rows
+
+
+def invalidate_employer(employer_id):
+    """Drop the employer's cached roster (call after committing a change to it)."""
+    if employer_id is not None:
+        _cache.invalidate_employer(int(employer_id))
+
+
+def invalidate_employee(employee_id):
+    """Drop the cached roster that lists `employee_id`, if any."""
+    if employee_id is not None:
+        _cache.invalidate_employee(int(employee_id))
+
+
+def roster_cache_stats():
+    return _cache.stats()
@@ -0,0 +1,241 @@
+"""Bulk shift import from a CSV file or a JSON array of shift objects.
+
+Rows are read one at a time from the stream, validated a batch at a time and
+inserted with executemany, one commit per batch, so memory stays flat however
+large the roster file is. A file that turns out to be malformed part way through
+stops the import; the report still counts the batches already committed. Each row needs shift_name, shift_date (YYYY-MM-DD),
+start_time and end_time (HH:MM) and employee_id; description is optional. A shift
+whose end time is earlier than its start runs past midnight.
+
+    python roster_import.py roster.csv --employer 3
+    python roster_import.py roster.json --employer 3 --batch-size 5000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+from datetime import date
+from functools import lru_cache
+from assistant_context import invalidate_snapshot
+from budgetset import db_cursor
+from roster import invalidate_employer, invalidate_employee
+
+IMPORT_BATCH_SIZE = int(os.getenv("ROSTER_IMPORT_BATCH_SIZE", "1000"))
+MAX_REPORTED_REJECTS = 100
+# a JSON element still undecoded after this many characters is malformed (or not a shift)
+MAX_ITEM_BYTES = int(os.getenv("ROSTER_MAX_ITEM_BYTES", str(2 ** 20)))
+REQUIRED_FIELDS = ("shift_name", "shift_date", "start_time", "end_time", "employee_id")
+
+INSERT_SQL = (
+    "INSERT INTO shifts (shift_name, shift_date, start_time, end_time, description, "
+    "employee_id, created_by, shift_type, hours_worked) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+# --- Readers ---
+def iter_csv_rows(stream):
+    """(row_number, dict) for each data row of a CSV stream with a header line."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+_LEADING = re.compile(r"\s*")
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def iter_json_rows(stream, chunk_size=65536):
+    """(index, item) for each element of a top-level JSON array, decoded incrementally."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started, index = "", 0, False, False, 0
+    while True:
+        pos = (_SEPARATORS if started else _LEADING).match(buf, pos).end()
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("JSON roster must be an array of shift objects")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                if len(buf) - pos > MAX_ITEM_BYTES:
+                    raise ValueError(f"JSON roster element {index + 1} is malformed or over "
+                                     f"{MAX_ITEM_BYTES} characters") from None
+            else:
+                index += 1
+                yield index, item
+                continue
+        elif eof:
+            raise ValueError("Unexpected end of JSON roster")
+        # need more input: keep the undecoded tail and append the next chunk
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+
+def open_rows(stream, fmt):
+    """Row iterator for a text stream in `fmt` ('csv' or 'json')."""
+    if fmt == "csv":
+        return iter_csv_rows(stream)
+    if fmt == "json":
+        return iter_json_rows(stream)
+    raise ValueError(f"Unsupported roster format: {fmt}")
+
+
+# --- Validation ---
+@lru_cache(maxsize=4096)
+def _minutes(value):
+    """Minutes after midnight for 'HH:MM' or 'HH:MM:SS'."""
+    parts = value.split(":")
+    if len(parts) not in (2, 3) or not all(p.isdigit() for p in parts):
+        raise ValueError(f"invalid time {value!r}")
+    hours, minutes = int(parts[0]), int(parts[1])
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"invalid time {value!r}")
+    return hours * 60 + minutes
+
+
+@lru_cache(maxsize=4096)
+def _shift_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"invalid shift_date {value!r}") from None
+
+
+def _validate(row):
+    """Insert values (minus created_by and shift_type) for one row; raises ValueError with the reason."""
+    if not isinstance(row, dict):
+        raise ValueError("row is not an object")
+    missing = [f for f in REQUIRED_FIELDS if row.get(f) in (None, "")]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    start_time, end_time = str(row["start_time"]).strip(), str(row["end_time"]).strip()
+    start, end = _minutes(start_time), _minutes(end_time)
+    if end == start:
+        raise ValueError("start_time and end_time are equal")
+    if end < start:
+        end += 24 * 60  # overnight shift
+    try:
+        employee_id = int(row["employee_id"])
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid employee_id {row['employee_id']!r}") from None
+    return (str(row["shift_name"]).strip(), _shift_date(str(row["shift_date"]).strip()), start_time, end_time,
+            row.get("description") or None, employee_id, round((end - start) / 60.0, 2))
+
+
+def _known_employees(cur, employee_ids, employer_id):
+    """The ids in `employee_ids` that are employees of `employer_id`."""
+    if not employee_ids:
+        return set()
+    ids = sorted(employee_ids)
+    cur.execute(
+        f"SELECT user_id FROM users WHERE user_id IN ({', '.join(['%s'] * len(ids))}) "
+        "AND created_by = %s AND role = 'employee'",
+        tuple(ids) + (employer_id,)
+    )
+    return {row[0] for row in cur.fetchall()}
+
+
+# --- Import ---
+def import_shifts(rows, employer_id, batch_size=None):
+    """Insert shifts from `rows` ((row_number, row) pairs) for `employer_id`, committing per batch.
+
+    Returns {'inserted', 'rejected', 'batches', 'rejected_rows'}; rejected_rows lists the
+    first MAX_REPORTED_REJECTS rejects as {'row', 'reason'}. Rows for ids that are not
+    employees of `employer_id` are rejected. If reading `rows` raises ValueError (a
+    malformed file), the import stops there and the report gets an 'error'; the rows
+    before it are still inserted and counted in 'inserted'.
+    """
+    batch_size = max(1, int(batch_size or IMPORT_BATCH_SIZE))
+    report = {'inserted': 0, 'rejected': 0, 'batches': 0, 'rejected_rows': []}
+
+    def reject(row_number, reason):
+        report['rejected'] += 1
+        if len(report['rejected_rows']) < MAX_REPORTED_REJECTS:
+            report['rejected_rows'].append({'row': row_number, 'reason': reason})
+
+    def flush(batch):
+        params = []
+        with db_cursor(commit=True) as cur:
+            known = _known_employees(cur, {values[5] for _, values in batch}, employer_id)
+            for row_number, values in batch:
+                if values[5] not in known:
+                    reject(row_number, f"unknown employee_id {values[5]}")
+                    continue
+                params.append(values[:6] + (employer_id, 'employer_created', values[6]))
+            if params:
+                cur.executemany(INSERT_SQL, params)
+        report['inserted'] += len(params)
+        for employee_id in {p[5] for p in params}:
+            invalidate_employee(employee_id)
+            invalidate_snapshot(employee_id)
+        report['batches'] += 1
+
+    try:
+        batch = []
+        rows = iter(rows)
+        while True:
+            try:
+                row_number, row = next(rows)
+            except StopIteration:
+                break
+            except ValueError as e:
+                report['error'] = str(e)
+                break
+            try:
+                batch.append((row_number, _validate(row)))
+            except ValueError as e:
+                reject(row_number, str(e))
+                continue
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        invalidate_employer(employer_id)
+    return report
+
+
+def detect_format(filename=None, content_type=None, explicit=None):
+    """'csv' or 'json' from an explicit choice, the file extension or the content type."""
+    if explicit:
+        return explicit.lower()
+    if filename and filename.lower().endswith((".csv", ".json")):
+        return filename.lower().rsplit(".", 1)[1]
+    if content_type and "json" in content_type:
+        return "json"
+    return "csv"
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Import a roster of shifts from CSV or JSON")
+    parser.add_argument("path")
+    parser.add_argument("--employer", type=int, required=True, help="employer user_id recorded as created_by")
+    parser.add_argument("--format", choices=("csv", "json"))
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args(argv[1:])
+    with io.open(args.path, encoding="utf-8", newline="") as stream:
+        rows = open_rows(stream, detect_format(args.path, explicit=args.format))
+        report = import_shifts(rows, args.employer, args.batch_size)
+    print(f"Imported {report['inserted']} shifts in {report['batches']} batches, rejected {report['rejected']}")
+    for rejected in report['rejected_rows']:
+        print(f"  row {rejected['row']}: {rejected['reason']}")
+    if 'error' in report:
+        print(f"Stopped early, invalid roster file: {report['error']}")
+        return 1
+    return 0 if report['inserted'] or not report['rejected'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
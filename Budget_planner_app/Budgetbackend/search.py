@@ -0,0 +1,314 @@
+"""Per-user full-text search over assistant history and bill names.
+
+Every chat turn and bill is a document in `search_index`, an FTS5 table on the
+SQLite backend and an InnoDB table with a FULLTEXT key on MySQL. A document's
+`owner` column holds a token for its user ("usr000000042"), so a search is one
+inverted-index lookup for the owner token AND the query terms instead of a scan
+of the user's history. Documents are written in the same transaction as the turn
+or bill (chat_store.save_chat, the bill routes), so results are current without
+a rebuild.
+
+Chats use doc id message_id * 2 and bills bill_id * 2 + 1. Results come best
+first, a page at a time; the cursor encodes the last (score, doc id). On SQLite
+the ranking covers bills and the user's newest SEARCH_RANK_WINDOW chat matches,
+which bounds the cost for users with a long history (benchmarks/bench_search.py);
+older chat matches follow them newest first, and the cursor also carries the
+window's boundary.
+
+    python search.py rebuild    # re-index every chat turn and bill
+    python search.py status
+"""
+import argparse
+import base64
+import binascii
+import os
+import re
+import sys
+from pagination import MAX_PAGE_SIZE
+from storage import get_storage
+
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "500"))
+
+KINDS = ("chat", "bill")
+MAX_TERMS = 8
+MIN_TERM_LENGTH = {"sqlite": 1, "mysql": 3}  # InnoDB does not index tokens shorter than innodb_ft_min_token_size
+SNIPPET_TOKENS = 12
+TITLE_TOKENS = 16
+
+SEARCH_DDL = {
+    "sqlite": (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "owner, title, body, kind UNINDEXED, ref_id UNINDEXED, user_id UNINDEXED, created_at UNINDEXED, "
+        "detail=column, tokenize='porter unicode61')"
+    ),
+    "mysql": (
+        "CREATE TABLE IF NOT EXISTS search_index ("
+        "  doc_id BIGINT PRIMARY KEY,"
+        "  owner CHAR(12) NOT NULL,"
+        "  title TEXT NOT NULL,"
+        "  body TEXT NOT NULL,"
+        "  kind VARCHAR(8) NOT NULL,"
+        "  ref_id INT NOT NULL,"
+        "  user_id INT NOT NULL,"
+        "  created_at DATETIME NULL,"
+        "  FULLTEXT KEY ft_search_index (owner, title, body)"
+        ") ENGINE=InnoDB"
+    ),
+}
+DOC_ID = {"sqlite": "rowid", "mysql": "doc_id"}
+OWNER_SQL = {"sqlite": "'usr' || printf('%09d', user_id)", "mysql": "CONCAT('usr', LPAD(user_id, 9, '0'))"}
+INDEX_COLUMNS = "owner, title, body, kind, ref_id, user_id, created_at"
+
+
+def backfill_sql(dialect, kind):
+    """INSERT ... SELECT that indexes every chat_messages row or bill (append a WHERE to narrow it)."""
+    if kind == "chat":
+        select = (f"SELECT message_id * 2, {OWNER_SQL[dialect]}, user_message, assistant_response, 'chat', "
+                  "message_id, user_id, created_at FROM chat_messages")
+    else:
+        select = (f"SELECT bill_id * 2 + 1, {OWNER_SQL[dialect]}, bill_name, '', 'bill', "
+                  "bill_id, user_id, NULL FROM bills")
+    return f"INSERT INTO search_index ({DOC_ID[dialect]}, {INDEX_COLUMNS}) {select}"
+
+
+def owner_token(user_id):
+    return f"usr{int(user_id):09d}"
+
+
+# --- Writes ---
+def _index(cur, doc_id, user_id, title, body, kind, ref_id, created_at):
+    dialect = get_storage().dialect
+    cur.execute(
+        f"INSERT INTO search_index ({DOC_ID[dialect]}, {INDEX_COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+        (doc_id, owner_token(user_id), title, body, kind, ref_id, user_id, created_at)
+    )
+
+
+def index_chat(cur, user_id, message_id, message, response, created_at):
+    """Index one stored chat turn. The caller commits, together with the turn."""
+    _index(cur, message_id * 2, user_id, message, response, "chat", message_id, created_at)
+
+
+def index_chats_after(cur, after_id):
+    """Index the chat_messages rows with message_id > after_id (a bulk import); returns how many."""
+    cur.execute(backfill_sql(get_storage().dialect, "chat") + " WHERE message_id > %s", (after_id,))
+    return cur.rowcount
+
+
+def index_bill(cur, user_id, bill_id, name):
+    _index(cur, bill_id * 2 + 1, user_id, name, "", "bill", bill_id, None)
+
+
+def unindex_bill(cur, bill_id):
+    cur.execute(f"DELETE FROM search_index WHERE {DOC_ID[get_storage().dialect]} = %s", (bill_id * 2 + 1,))
+
+
+# --- Queries ---
+def query_terms(q, dialect="sqlite"):
+    """The distinct words of a search string (at most MAX_TERMS); raises ValueError if there are none.
+
+    A word written with a trailing `*` ("subscr*") is kept as a prefix. Prefixes
+    cost several times an exact word (every indexed word they cover is read), and
+    porter stemming already matches "saving" with "savings", so they are opt-in.
+    """
+    terms = []
+    for word in re.findall(r"[^\W_]+\*?", (q or "").lower()):
+        if len(word.rstrip("*")) >= MIN_TERM_LENGTH[dialect] and word not in terms:
+            terms.append(word)
+    if not terms:
+        raise ValueError("q must contain at least one word"
+                         + (f" of {MIN_TERM_LENGTH[dialect]} or more characters" if MIN_TERM_LENGTH[dialect] > 1 else ""))
+    return terms[:MAX_TERMS]
+
+
+def encode_search_cursor(score, doc_id, boundary=0):
+    raw = f"{'' if score is None else repr(score)}|{int(doc_id)}|{int(boundary)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_search_cursor(token):
+    """(score, doc_id, boundary) from a cursor made by encode_search_cursor(); raises ValueError if it is malformed.
+
+    score is None once the pages have moved on to the older matches (see search()).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        score, doc_id, boundary = raw.split("|")
+        return (float(score) if score else None), int(doc_id), int(boundary)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+
+
+def search_args(args, dialect="sqlite"):
+    """(terms, kind, limit, cursor) from request args q, kind, limit and cursor; raises ValueError on bad values."""
+    terms = query_terms(args.get('q'), dialect)
+    kind = args.get('kind') or None
+    if kind and kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    try:
+        limit = int(args.get('limit', SEARCH_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise ValueError("limit must be a number") from None
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    token = args.get('cursor')
+    return terms, kind, min(limit, MAX_PAGE_SIZE), (decode_search_cursor(token) if token else None)
+
+
+def _match_expr(user_id, terms):
+    # detail=column keeps the index small but allows no phrases, so every term is one token
+    words = [f'"{t.rstrip("*")}"' + ("*" if t.endswith("*") else "") for t in terms]
+    # the owner column filter keeps a message that quotes another user's token out of that user's results
+    return f"owner:{owner_token(user_id)} AND " + " AND ".join(words)
+
+
+def rank_window_sql(user_id, terms):
+    """(sql, params) for the doc id of the user's SEARCH_RANK_WINDOW-th newest chat match (SQLite); no row if fewer.
+
+    Chats have even doc ids, so the window is read newest first from the index
+    without touching the stored documents.
+    """
+    return ("SELECT rowid FROM search_index WHERE search_index MATCH %s AND rowid % 2 = 0 "
+            "ORDER BY rowid DESC LIMIT 1 OFFSET %s", (_match_expr(user_id, terms), SEARCH_RANK_WINDOW - 1))
+
+
+def search_sql(dialect, user_id, terms, kind=None, cursor=None, limit=SEARCH_PAGE_SIZE, boundary=0, older=False):
+    """(sql, params) for one page of the user's documents matching every term (query_terms()).
+
+    Rows are (doc_id, kind, ref_id, title, body, score, created_at) in page order.
+    On SQLite title and body are FTS5 snippets and a lower score is better (bm25);
+    on MySQL title and body are the stored text and a higher score is better.
+
+    On SQLite chats with a doc id below `boundary` (rank_window_sql()) are left out
+    of the ranking; `older=True` pages through just those instead, newest first.
+    cursor is the last row's (score, doc_id), or its doc_id alone when `older`.
+    """
+    kind_sql, kind_params = (" AND kind = %s", (kind,)) if kind else ("", ())
+    if dialect == "sqlite":
+        rank = "bm25(search_index, 0.0, 2.0, 1.0)"
+        sql = (f"SELECT rowid, kind, ref_id, snippet(search_index, 1, '[', ']', '…', {TITLE_TOKENS}), "
+               f"snippet(search_index, 2, '[', ']', '…', {SNIPPET_TOKENS}), {rank}, created_at "
+               f"FROM search_index WHERE search_index MATCH %s{kind_sql}")
+        params = (_match_expr(user_id, terms),) + kind_params
+        if older:
+            sql += " AND rowid % 2 = 0 AND rowid < %s"
+            params += (min(boundary, cursor) if cursor else boundary,)
+            return f"{sql} ORDER BY rowid DESC LIMIT %s", params + (limit,)
+        if boundary:
+            sql += " AND (rowid >= %s OR rowid % 2 = 1)"  # bills (odd doc ids) are always ranked
+            params += (boundary,)
+        after, order = f"({rank} > %s OR ({rank} = %s AND rowid > %s))", f"{rank}, rowid"
+    else:
+        match = "MATCH(owner, title, body) AGAINST (%s IN BOOLEAN MODE)"
+        against = " ".join([f"+{owner_token(user_id)}"] + [f"+{t}" for t in terms])
+        sql = (f"SELECT doc_id, kind, ref_id, title, body, {match} AS score, created_at FROM search_index "
+               f"WHERE {match} AND user_id = %s{kind_sql}")
+        params = (against, against, user_id) + kind_params
+        after, order = f"({match} < %s OR ({match} = %s AND doc_id > %s))", "score DESC, doc_id"
+    if cursor:
+        score, doc_id = cursor
+        sql += f" AND {after}"
+        params += (score, score, doc_id) if dialect == "sqlite" else (against, score, against, score, doc_id)
+    return f"{sql} ORDER BY {order} LIMIT %s", params + (limit,)
+
+
+def make_snippet(text, terms, size=SNIPPET_TOKENS):
+    """Up to `size` words of `text` around the first match, matches in [brackets] (the FTS5 snippet() format)."""
+    words = (text or "").split()
+    matches = [any(re.sub(r"\W", "", w.lower()).startswith(t.rstrip("*")) for t in terms) for w in words]
+    first = matches.index(True) if True in matches else 0
+    start = max(0, min(first - size // 4, len(words) - size))
+    shown = [f"[{w}]" if m else w for w, m in zip(words[start:start + size], matches[start:start + size])]
+    return ("…" if start else "") + " ".join(shown) + ("…" if start + size < len(words) else "")
+
+
+def search(cur, user_id, terms, kind=None, limit=SEARCH_PAGE_SIZE, cursor=None):
+    """One page of the user's matching chats and bills, best first; returns (results, next_cursor).
+
+    On SQLite bm25 costs a little per match, so only bills and the newest
+    SEARCH_RANK_WINDOW chat matches are ranked. Once those are paged through, the
+    older chat matches follow newest first. The window's boundary is fixed by the
+    first page and carried in the cursor.
+    """
+    dialect = get_storage().dialect
+    score, doc_id, boundary = cursor or (None, None, None)
+    if boundary is None:
+        boundary = 0
+        if dialect == "sqlite" and kind != "bill":
+            cur.execute(*rank_window_sql(user_id, terms))
+            row = cur.fetchone()
+            boundary = row[0] if row else 0
+    rows = []
+    if cursor is None or score is not None:
+        cur.execute(*search_sql(dialect, user_id, terms, kind, cursor and (score, doc_id), limit + 1, boundary))
+        rows = cur.fetchall()
+    ranked = len(rows)
+    if ranked <= limit and boundary:
+        cur.execute(*search_sql(dialect, user_id, terms, kind, doc_id if score is None else None,
+                                limit + 1 - ranked, boundary, older=True))
+        rows += cur.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_search_cursor(last[5] if limit <= ranked else None, last[0], boundary)
+    results = []
+    for doc_id, doc_kind, ref_id, title, body, score, created_at in rows[:limit]:
+        if dialect == "mysql":
+            title, body = make_snippet(title, terms, TITLE_TOKENS), make_snippet(body, terms)
+        results.append({
+            "kind": doc_kind,
+            "id": int(ref_id),
+            "title": title,
+            "snippet": body,
+            "score": float(f"{-score if dialect == 'sqlite' else float(score):.4g}"),
+            "created_at": str(created_at)[:19] if created_at else None,
+        })
+    return results, next_cursor
+
+
+# --- Rebuild ---
+def rebuild(conn):
+    """Re-index every chat turn and bill; returns (chats, bills) indexed."""
+    dialect = get_storage().dialect
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM search_index")
+        cur.execute(backfill_sql(dialect, "chat"))
+        chats = cur.rowcount
+        cur.execute(backfill_sql(dialect, "bill"))
+        bills = cur.rowcount
+        conn.commit()
+        return chats, bills
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Full-text search index over assistant history and bills")
+    parser.add_argument("command", choices=("rebuild", "status"))
+    args = parser.parse_args(argv[1:])
+
+    conn = get_storage().connect()
+    try:
+        if args.command == "rebuild":
+            chats, bills = rebuild(conn)
+            print(f"Indexed {chats} chat turns and {bills} bills")
+            return 0
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT kind, COUNT(*) FROM search_index GROUP BY kind")
+            counts = dict(cur.fetchall())
+        finally:
+            cur.close()
+        print(f"{counts.get('chat', 0)} chat turns and {counts.get('bill', 0)} bills indexed")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
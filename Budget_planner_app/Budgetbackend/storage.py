@@ -0,0 +1,501 @@
+"""Storage backends.
+
+The API talks to a `Storage` object picked by configuration:
+
+    DB_BACKEND=mysql   (default) pooled mysql.connector connections, see db_pool.py
+    DB_BACKEND=sqlite  embedded SQLite file, or SQLITE_PATH=:memory: for a throwaway DB
+
+Both hand out DB-API connections that accept the MySQL-flavoured SQL used in
+api_server.py (`%s` placeholders, INSERT IGNORE, NOW() ...); the SQLite backend
+rewrites it on the fly. The repository methods on `Storage` cover users, bills,
+daily_keep, shifts and notifications (with their unread counters) and take a
+cursor, so callers decide the transaction boundaries.
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+STORAGE_CONFIG = {
+    "backend": os.getenv("DB_BACKEND", "mysql").lower(),
+    "sqlite_path": os.getenv(
+        "SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "salary_management.db")
+    ),
+}
+
+
+class Storage:
+    """Backend interface: connections, schema bootstrap, dialect helpers and repositories."""
+
+    dialect = None
+
+    def connect(self):
+        """Return a new DB-API connection (close() releases it)."""
+        raise NotImplementedError
+
+    def init_schema(self):
+        """Create tables if missing and apply pending migrations."""
+        raise NotImplementedError
+
+    # --- Dialect helpers ---
+    def upsert_sql(self, table, key_cols, cols, increment_cols=()):
+        """INSERT ... that updates `cols` on a key clash; `increment_cols` are added to instead of replaced."""
+        raise NotImplementedError
+
+    def insert_ignore_sql(self, table, cols):
+        raise NotImplementedError
+
+    # --- Users ---
+    def add_user(self, cur, username, password, hourly_rate, date_of_birth=None):
+        """Insert a user unless the username exists; returns the user_id either way."""
+        cur.execute(
+            self.insert_ignore_sql("users", ("username", "password", "hourly_rate", "date_of_birth")),
+            (username, password, float(hourly_rate), date_of_birth)
+        )
+        return self.find_user_id(cur, username)
+
+    def find_user_id(self, cur, username):
+        cur.execute("SELECT user_id FROM users WHERE username=%s LIMIT 1", (username,))
+        row = cur.fetchone()
+        return int(row[0]) if row else None
+
+    def get_credentials(self, cur, username):
+        """(user_id, password) for `username`, or None."""
+        cur.execute("SELECT user_id, password FROM users WHERE username=%s LIMIT 1", (username,))
+        return cur.fetchone()
+
+    def get_user(self, cur, user_id):
+        """(user_id, username, hourly_rate, date_of_birth, role, created_by) or None."""
+        cur.execute(
+            "SELECT user_id, username, hourly_rate, date_of_birth, role, created_by FROM users WHERE user_id=%s",
+            (user_id,)
+        )
+        return cur.fetchone()
+
+    # --- Bills ---
+    def list_bills(self, cur, user_id):
+        cur.execute("SELECT bill_id, bill_name, bill_amount FROM bills WHERE user_id=%s", (user_id,))
+        return [{"bill_id": r[0], "name": r[1], "amount": float(r[2])} for r in cur.fetchall()]
+
+    def add_bill(self, cur, user_id, name, amount):
+        cur.execute("INSERT INTO bills (bill_name, bill_amount, user_id) VALUES (%s,%s,%s)", (name, amount, user_id))
+        return cur.lastrowid
+
+    def delete_bill(self, cur, user_id, bill_id):
+        cur.execute("DELETE FROM bills WHERE bill_id=%s AND user_id=%s", (bill_id, user_id))
+        return cur.rowcount > 0
+
+    def bills_total(self, cur, user_id):
+        cur.execute("SELECT IFNULL(SUM(bill_amount),0) FROM bills WHERE user_id=%s", (user_id,))
+        return float(cur.fetchone()[0] or 0.0)
+
+    # --- Daily keep ---
+    def add_daily_keep(self, cur, user_id, day, hours_worked, amount):
+        cur.execute(
+            "INSERT INTO daily_keep (daily_keep_date, daily_hours_worked, daily_keep_amount, user_id) "
+            "VALUES (%s, %s, %s, %s)",
+            (day, float(hours_worked), float(amount), user_id)
+        )
+        return cur.lastrowid
+
+    def latest_daily_keep(self, cur, user_id):
+        """(amount, hours) of the most recent daily_keep row, or None."""
+        cur.execute(
+            "SELECT daily_keep_amount, daily_hours_worked FROM daily_keep "
+            "WHERE user_id = %s ORDER BY daily_keep_date DESC LIMIT 1",
+            (user_id,)
+        )
+        return cur.fetchone()
+
+    # --- Shifts ---
+    def add_shift(self, cur, shift_name, shift_date, start_time, end_time, description,
+                  employee_id, created_by, shift_type, hours_worked):
+        cur.execute(
+            "INSERT INTO shifts (shift_name, shift_date, start_time, end_time, description, "
+            "employee_id, created_by, shift_type, hours_worked) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            (shift_name, shift_date, start_time, end_time, description, employee_id, created_by,
+             shift_type, hours_worked)
+        )
+        return cur.lastrowid
+
+    def get_shift_for_pay(self, cur, shift_id):
+        """(employee_id, shift_date, hours_worked, hourly_rate) for a shift, or None."""
+        cur.execute(
+            "SELECT s.employee_id, s.shift_date, s.hours_worked, u.hourly_rate "
+            "FROM shifts s JOIN users u ON s.employee_id = u.user_id WHERE s.shift_id = %s",
+            (shift_id,)
+        )
+        return cur.fetchone()
+
+    def set_shift_status(self, cur, shift_id, status):
+        if status == "approved":
+            cur.execute("UPDATE shifts SET status = 'approved', approved_at = NOW() WHERE shift_id = %s", (shift_id,))
+        else:
+            cur.execute("UPDATE shifts SET status = %s WHERE shift_id = %s", (status, shift_id))
+        return cur.rowcount > 0
+
+    # --- Notifications ---
+    # notification_counters.unread is kept in step with unread rows: every insert adds to
+    # it and every read flag set subtracts, in the same transaction as the row change.
+    def add_notification(self, cur, user_id, shift_id, notification_type, message):
+        cur.execute(
+            "INSERT INTO notifications (user_id, shift_id, notification_type, message) VALUES (%s, %s, %s, %s)",
+            (user_id, shift_id, notification_type, message)
+        )
+        notification_id = cur.lastrowid
+        self.add_unread(cur, {user_id: 1})
+        return notification_id
+
+    def add_unread(self, cur, counts):
+        """Add {user_id: new unread notifications} to the users' counters."""
+        if counts:
+            cur.executemany(
+                self.upsert_sql("notification_counters", ("user_id",), ("unread",), increment_cols=("unread",)),
+                [(user_id, int(n)) for user_id, n in sorted(counts.items())]
+            )
+
+    def _sub_unread(self, cur, user_id, n):
+        if n:
+            cur.execute(
+                "UPDATE notification_counters SET unread = CASE WHEN unread > %s THEN unread - %s ELSE 0 END "
+                "WHERE user_id = %s",
+                (n, n, user_id)
+            )
+
+    def unread_count(self, cur, user_id):
+        cur.execute("SELECT unread FROM notification_counters WHERE user_id = %s", (user_id,))
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+
+    def list_notifications(self, cur, user_id, limit=20):
+        cur.execute(
+            "SELECT notification_id, shift_id, notification_type, message, is_read, created_at "
+            "FROM notifications WHERE user_id = %s ORDER BY created_at DESC LIMIT %s",
+            (user_id, int(limit))
+        )
+        return cur.fetchall()
+
+    def list_notifications_since(self, cur, user_id, since_id, limit=100):
+        """Notifications newer than `since_id`, oldest first."""
+        cur.execute(
+            "SELECT notification_id, shift_id, notification_type, message, is_read, created_at "
+            "FROM notifications WHERE user_id = %s AND notification_id > %s ORDER BY notification_id LIMIT %s",
+            (user_id, int(since_id), int(limit))
+        )
+        return cur.fetchall()
+
+    def mark_notification_read(self, cur, notification_id):
+        cur.execute(
+            "UPDATE notifications SET is_read = TRUE WHERE notification_id = %s AND is_read = FALSE",
+            (notification_id,)
+        )
+        changed = cur.rowcount
+        if changed:
+            cur.execute("SELECT user_id FROM notifications WHERE notification_id = %s", (notification_id,))
+            self._sub_unread(cur, cur.fetchone()[0], changed)
+        return changed
+
+    def mark_notifications_read(self, cur, user_id, ids=None, before_id=None):
+        """Mark the user's notifications in `ids`, or all up to and including `before_id`, read in one UPDATE.
+
+        Returns how many were unread before.
+        """
+        if ids is not None:
+            ids = [int(i) for i in ids]
+            if not ids:
+                return 0
+            where, params = f"notification_id IN ({', '.join(['%s'] * len(ids))})", tuple(ids)
+        elif before_id is not None:
+            where, params = "notification_id <= %s", (int(before_id),)
+        else:
+            raise ValueError("Pass ids or before_id")
+        cur.execute(
+            f"UPDATE notifications SET is_read = TRUE WHERE user_id = %s AND is_read = FALSE AND {where}",
+            (user_id,) + params
+        )
+        changed = cur.rowcount
+        self._sub_unread(cur, user_id, changed)
+        return changed
+
+    def rebuild_unread_counts(self, cur, user_id=None):
+        """Recount notification_counters from the notifications table (all users, or one)."""
+        where, params = ("WHERE user_id = %s", (user_id,)) if user_id is not None else ("", ())
+        cur.execute(f"DELETE FROM notification_counters {where}", params)
+        cur.execute(
+            "INSERT INTO notification_counters (user_id, unread) "
+            f"SELECT user_id, SUM(CASE WHEN is_read THEN 0 ELSE 1 END) FROM notifications {where} GROUP BY user_id",
+            params
+        )
+        return cur.rowcount
+
+
+# --- MySQL ---
+class MySQLStorage(Storage):
+    dialect = "mysql"
+
+    def __init__(self, connect_args):
+        self.connect_args = dict(connect_args)
+
+    def connect(self):
+        from db_pool import get_pool
+        return get_pool(self.connect_args).connect()
+
+    def init_schema(self):
+        from database_and_table import create_mysql_schema
+        create_mysql_schema()
+
+    def upsert_sql(self, table, key_cols, cols, increment_cols=()):
+        all_cols = tuple(key_cols) + tuple(cols)
+        # row alias (MySQL 8.0.19+): VALUES(col) is deprecated from 8.0.20 and its warning 1287
+        # is raised as an error under raise_on_warnings
+        updates = [
+            f"{c} = {c} + new.{c}" if c in increment_cols else f"{c} = new.{c}"
+            for c in cols
+        ]
+        return (f"INSERT INTO {table} ({', '.join(all_cols)}) VALUES ({', '.join(['%s'] * len(all_cols))}) "
+                f"AS new ON DUPLICATE KEY UPDATE {', '.join(updates)}")
+
+    def insert_ignore_sql(self, table, cols):
+        return f"INSERT IGNORE INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})"
+
+
+# --- SQLite ---
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()[:10]))
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+
+_SQL_REWRITES = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bNOW\(\)", re.I), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\bCURDATE\(\)", re.I), "DATE('now')"),
+    (re.compile(r"\s+FOR\s+UPDATE(\s+SKIP\s+LOCKED)?", re.I), ""),
+]
+
+_DDL_REWRITES = [
+    (re.compile(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bENUM\([^)]*\)", re.I), "TEXT"),
+    (re.compile(r"\)\s*ENGINE\s*=\s*\w+", re.I), ")"),
+]
+
+
+@lru_cache(maxsize=512)
+def translate_sql(sql):
+    """Rewrite the MySQL-flavoured SQL used by the routes into SQLite syntax."""
+    for pattern, replacement in _SQL_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def translate_ddl(ddl):
+    for pattern, replacement in _DDL_REWRITES:
+        ddl = pattern.sub(replacement, ddl)
+    return translate_sql(ddl)
+
+
+class SQLiteCursor:
+    """sqlite3 cursor that accepts MySQL-style statements and `dictionary=True` rows."""
+
+    def __init__(self, raw, dictionary=False):
+        self._cur = raw.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        self._cur.execute(translate_sql(sql), tuple(params or ()))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._cur.executemany(translate_sql(sql), seq_of_params)
+        return self
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {d[0]: v for d, v in zip(self._cur.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cur.fetchone())
+
+    def fetchmany(self, size=None):
+        rows = self._cur.fetchmany(size) if size else self._cur.fetchmany()
+        return [self._row(r) for r in rows]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cur.fetchall()]
+
+    def __iter__(self):
+        for row in self._cur:
+            yield self._row(row)
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self):
+        self._cur.close()
+
+
+class SQLiteConnection:
+    """Connection wrapper; close() either closes the file connection or releases the shared in-memory one."""
+
+    dialect = "sqlite"
+
+    def __init__(self, raw, release=None):
+        self._raw = raw
+        self._release = release
+
+    def cursor(self, dictionary=False, **_ignored):
+        return SQLiteCursor(self._raw, dictionary=dictionary)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def is_connected(self):
+        return self._raw is not None
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is None:
+            return
+        if self._release:
+            self._release()
+        else:
+            raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class SQLiteStorage(Storage):
+    dialect = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self.in_memory = path == ":memory:"
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        # an in-memory DB lives as long as its connection, so every caller shares one
+        # and takes turns via this lock
+        self._shared = None
+        self._shared_lock = threading.RLock()
+        self._shared_depth = 0
+
+    def _open(self):
+        raw = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES
+        )
+        raw.execute("PRAGMA foreign_keys = ON")
+        if not self.in_memory:
+            raw.execute("PRAGMA journal_mode = WAL")
+            raw.execute("PRAGMA synchronous = NORMAL")
+        return raw
+
+    def _connect_raw(self):
+        if not self.in_memory:
+            return SQLiteConnection(self._open())
+        self._shared_lock.acquire()
+        if self._shared is None:
+            self._shared = self._open()
+        self._shared_depth += 1
+        return SQLiteConnection(self._shared, release=self._release_shared)
+
+    def _release_shared(self):
+        # nested checkouts on the same thread share the transaction; only the outermost
+        # release discards uncommitted work, like closing a real connection would
+        self._shared_depth -= 1
+        if self._shared_depth == 0:
+            self._shared.rollback()
+        self._shared_lock.release()
+
+    def connect(self):
+        if not self._schema_ready:
+            self.init_schema()
+        return self._connect_raw()
+
+    def init_schema(self):
+        from database_and_table import TABLES
+        from migrations import apply_migrations
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn = self._connect_raw()
+            try:
+                cur = conn.cursor()
+                for ddl in TABLES.values():
+                    cur.execute(translate_ddl(ddl))
+                cur.execute("INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)", ("admin", "password123"))
+                conn.commit()
+                cur.close()
+                apply_migrations(conn)
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    def upsert_sql(self, table, key_cols, cols, increment_cols=()):
+        all_cols = tuple(key_cols) + tuple(cols)
+        updates = [
+            f"{c} = {c} + excluded.{c}" if c in increment_cols else f"{c} = excluded.{c}"
+            for c in cols
+        ]
+        return (f"INSERT INTO {table} ({', '.join(all_cols)}) VALUES ({', '.join(['%s'] * len(all_cols))}) "
+                f"ON CONFLICT ({', '.join(key_cols)}) DO UPDATE SET {', '.join(updates)}")
+
+    def insert_ignore_sql(self, table, cols):
+        return f"INSERT OR IGNORE INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})"
+
+
+# --- Selection ---
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """The configured storage backend (created on first use)."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = _build_storage(STORAGE_CONFIG)
+        return _storage
+
+
+def configure_storage(backend=None, sqlite_path=None):
+    """Switch backends at runtime (tests, benchmarks). Returns the new storage."""
+    global _storage
+    config = dict(STORAGE_CONFIG)
+    if backend:
+        config["backend"] = backend.lower()
+    if sqlite_path:
+        config["sqlite_path"] = sqlite_path
+    with _storage_lock:
+        _storage = _build_storage(config)
+        return _storage
+
+
+def _build_storage(config):
+    if config["backend"] == "sqlite":
+        return SQLiteStorage(config["sqlite_path"])
+    if config["backend"] == "mysql":
+        from database_and_table import DB_CONFIG, DB_NAME
+        return MySQLStorage(dict(DB_CONFIG, database=DB_NAME))
+    raise ValueError(f"Unknown DB_BACKEND: {config['backend']}")
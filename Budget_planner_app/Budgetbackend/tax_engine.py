@@ -0,0 +1,188 @@
+"""UK income tax (England, Wales and Northern Ireland rates) over precomputed band tables.
+
+Each tax year's bands are turned once into a table of band floors, rates and the
+tax already due at each floor, so taxing an amount is one searchsorted lookup and
+works the same on a single value or an array of thousands of employees.
+
+    annual_tax(income, tax_year)                          a year's tax, with the allowance taper
+    paye_due(ytd_gross, period, tax_year)                 cumulative PAYE due to date
+    paye_batch(ytd_before, gross, period, tax_year)       this period's PAYE for arrays of employees
+    month1_tax(gross, tax_year)                           non-cumulative (month 1 basis) tax on one month
+
+PAYE follows the cumulative method for monthly pay: tax period 1 is paid in April
+and 12 in March; the allowance and bands to date are the annual figures x period / 12,
+taxable pay to date is rounded down to the pound and tax to the penny. The allowance
+is the standard one (tax code 1257L without the +9); the over-100k taper is applied by
+annual_tax() only, as it is through tax codes in practice.
+
+    python tax_engine.py check      # verify GOLDEN_CASES
+"""
+import sys
+import numpy as np
+
+# Start year of the tax year (2025 = 6 April 2025 to 5 April 2026) -> rules
+TAX_YEARS = {
+    year: {
+        "personal_allowance": 12570,
+        "taper_threshold": 100000,
+        # (floor of taxable income, rate)
+        "bands": ((0, 0.20), (37700, 0.40), (125140, 0.45)),
+    }
+    for year in (2022, 2023, 2024, 2025, 2026)
+}
+PERIODS_PER_YEAR = 12
+
+
+class BandTable:
+    """One tax year's bands with the cumulative tax due at each band floor."""
+
+    def __init__(self, tax_year, rules):
+        self.tax_year = tax_year
+        self.personal_allowance = float(rules["personal_allowance"])
+        self.taper_threshold = float(rules["taper_threshold"])
+        self.floors = np.array([b[0] for b in rules["bands"]], dtype=np.float64)
+        self.rates = np.array([b[1] for b in rules["bands"]], dtype=np.float64)
+        widths = np.diff(self.floors)
+        self.tax_at_floor = np.concatenate(([0.0], np.cumsum(widths * self.rates[:-1])))
+
+    def tax_on_taxable(self, taxable, scale=1.0):
+        """Tax on `taxable` income with every band scaled by `scale` (period / 12 for PAYE to date)."""
+        taxable = np.maximum(np.asarray(taxable, dtype=np.float64), 0.0)
+        scale = np.asarray(scale, dtype=np.float64)
+        band = np.searchsorted(self.floors, taxable / scale, side="right") - 1
+        return self.tax_at_floor[band] * scale + (taxable - self.floors[band] * scale) * self.rates[band]
+
+    def allowance(self, income):
+        """Personal allowance after the taper (1 lost per 2 of income over the threshold)."""
+        income = np.asarray(income, dtype=np.float64)
+        lost = np.maximum(income - self.taper_threshold, 0.0) // 2
+        return np.maximum(self.personal_allowance - lost, 0.0)
+
+
+TABLES = {year: BandTable(year, rules) for year, rules in TAX_YEARS.items()}
+
+
+def band_table(tax_year):
+    """The table for `tax_year`, falling back to the nearest earlier (or the earliest) known year."""
+    if tax_year in TABLES:
+        return TABLES[tax_year]
+    earlier = [y for y in TABLES if y <= tax_year]
+    return TABLES[max(earlier) if earlier else min(TABLES)]
+
+
+def tax_period_of_month(year, month):
+    """(tax year, period 1-12) for pay dated at the end of calendar month `month` of `year`."""
+    return (year if month >= 4 else year - 1), (month - 4) % 12 + 1
+
+
+def _floor_pence(values):
+    return np.floor(np.asarray(values, dtype=np.float64) * 100 + 1e-6) / 100
+
+
+def _scalar_or_array(result, *inputs):
+    return float(result) if all(np.ndim(i) == 0 for i in inputs) else result
+
+
+# --- Annual ---
+def annual_tax(income, tax_year):
+    """Tax on a whole year's income, including the personal allowance taper."""
+    table = band_table(tax_year)
+    income_arr = np.asarray(income, dtype=np.float64)
+    taxable = np.floor(income_arr - table.allowance(income_arr))
+    return _scalar_or_array(_floor_pence(table.tax_on_taxable(taxable)), income)
+
+
+# --- PAYE ---
+def paye_due(ytd_gross, period, tax_year):
+    """Cumulative PAYE due on `ytd_gross` paid up to and including tax `period` (1-12)."""
+    table = band_table(tax_year)
+    period_arr = np.asarray(period, dtype=np.float64)
+    scale = period_arr / PERIODS_PER_YEAR
+    taxable = np.floor(np.asarray(ytd_gross, dtype=np.float64) - table.personal_allowance * scale)
+    return _scalar_or_array(_floor_pence(table.tax_on_taxable(taxable, scale)), ytd_gross, period)
+
+
+def paye_batch(ytd_before, gross, period, tax_year):
+    """PAYE for this period: tax due to date minus tax due at the end of the previous period.
+
+    `ytd_before` is each employee's gross earlier in the tax year, `gross` this period's pay;
+    both arrays (or scalars). Negative results are refunds of tax paid earlier in the year.
+    """
+    ytd_before = np.asarray(ytd_before, dtype=np.float64)
+    gross = np.asarray(gross, dtype=np.float64)
+    period = np.asarray(period)
+    due_now = np.asarray(paye_due(ytd_before + gross, period, tax_year))
+    due_before = np.where(period > 1, paye_due(ytd_before, np.maximum(period - 1, 1), tax_year), 0.0)
+    return _scalar_or_array(np.round(due_now - due_before, 2), ytd_before, gross, period)
+
+
+def month1_tax(gross, tax_year):
+    """Tax on one month's pay in isolation (month 1 / non-cumulative basis)."""
+    return paye_due(gross, 1, tax_year)
+
+
+# --- Golden values ---
+# (function, args, expected) at band edges for 2025/26
+GOLDEN_CASES = (
+    (annual_tax, (0, 2025), 0.00),
+    (annual_tax, (12570, 2025), 0.00),
+    (annual_tax, (12571, 2025), 0.20),
+    (annual_tax, (50270, 2025), 7540.00),
+    (annual_tax, (50271, 2025), 7540.40),
+    (annual_tax, (100000, 2025), 27432.00),
+    (annual_tax, (100002, 2025), 27433.20),
+    (annual_tax, (125140, 2025), 42516.00),
+    (annual_tax, (125141, 2025), 42516.45),
+    (annual_tax, (150000, 2025), 53703.00),
+    (month1_tax, (1047.50, 2025), 0.00),
+    (month1_tax, (1048.50, 2025), 0.20),
+    (month1_tax, (3000, 2025), 390.40),
+    (month1_tax, (4189.17, 2025), 628.20),
+    (month1_tax, (10000, 2025), 2952.46),
+    (month1_tax, (11475.00, 2025), 3542.46),
+    (paye_due, (6000, 2, 2025), 781.00),
+    (paye_due, (36000, 12, 2025), 4686.00),
+    (paye_due, (150000, 12, 2025), 48046.50),  # no taper through PAYE
+    (paye_batch, (3000, 3000, 2, 2025), 390.60),
+    (paye_batch, (5000, 0, 2, 2025), -371.46),
+    (paye_batch, (0, 3000, 1, 2025), 390.40),
+)
+
+
+def check_golden(cases=GOLDEN_CASES):
+    """[(name, args, expected, got)] for every golden case the engine gets wrong.
+
+    Each function is checked one value at a time and again with all of its cases
+    as one batch of arrays, so the scalar and batch paths must agree.
+    """
+    failures = []
+    for fn, args, expected in cases:
+        got = fn(*args)
+        if abs(got - expected) > 0.001:
+            failures.append((fn.__name__, args, expected, got))
+    for fn in dict.fromkeys(case[0] for case in cases):
+        rows = [(args, expected) for f, args, expected in cases if f is fn]
+        columns = [np.array(col) for col in zip(*(args[:-1] for args, _ in rows))]
+        tax_year = rows[0][0][-1]
+        got = fn(*columns, tax_year)
+        for (args, expected), value in zip(rows, np.atleast_1d(got)):
+            if args[-1] == tax_year and abs(value - expected) > 0.001:
+                failures.append((fn.__name__ + "[batch]", args, expected, float(value)))
+    return failures
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] != "check":
+        print(__doc__)
+        return 2
+    failures = check_golden()
+    for name, args, expected, got in failures:
+        print(f"MISMATCH {name}{args}: expected {expected:.2f}, got {got:.2f}")
+    if failures:
+        return 1
+    print(f"All {len(GOLDEN_CASES)} golden tax cases match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))